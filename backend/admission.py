@@ -0,0 +1,243 @@
+"""
+Admission control for the LLM-backed endpoints
+
+Every /api/chat and /api/travel/plan request holds a worker thread and one or
+more model-gateway calls for seconds. Without a bound, a slow gateway lets work
+pile up until every request times out after having spent its tokens.
+AdmissionController puts a fixed number of in-flight slots in front of the
+graphs and a bounded wait queue per priority class:
+
+- a request runs immediately while a slot is free (and its class is under its
+  own in-flight cap), otherwise it waits in its class queue
+- freed slots go to the highest-priority class with waiters, FIFO within a class
+- a request is rejected right away with 429 + Retry-After when its class queue
+  is full or when the queue ahead of it would not drain within max_wait, and
+  after max_wait seconds if it is still queued
+
+A request that fans out to several concurrent gateway calls (parallel travel
+sections) acquires one slot per concurrent call, so the bound is on gateway calls
+rather than requests.
+
+Retry-After is estimated from the recent mean service time and the queue ahead.
+Queue depth, in-flight counts, wait times and rejections are exported as
+Prometheus metrics and returned by stats().
+
+The controller is asyncio-based and must be used from a single event loop.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from prometheus_client import Counter, Gauge, Histogram
+
+QUEUE_DEPTH = Gauge("admission_queue_depth", "Requests waiting for an in-flight slot", ["controller", "priority_class"])
+IN_FLIGHT = Gauge("admission_in_flight", "In-flight slots held by admitted requests", ["controller", "priority_class"])
+WAIT_SECONDS = Histogram(
+    "admission_wait_seconds",
+    "Time spent queued before admission or rejection",
+    ["controller", "priority_class", "outcome"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+REJECTED = Counter("admission_rejected_total", "Requests rejected by admission control", ["controller", "priority_class", "reason"])
+
+
+class PriorityClass(NamedTuple):
+    """A request class: lower priority value is served first"""
+
+    priority: int
+    max_queue: int
+    max_in_flight: Optional[int] = None  # cap within the shared slots, None = no extra cap
+
+
+class AdmissionRejected(HTTPException):
+    """Raised when a request is not admitted; FastAPI turns it into 429 + Retry-After"""
+
+    def __init__(self, priority_class: str, reason: str, retry_after: int):
+        super().__init__(
+            status_code=429,
+            detail=f"Server busy ({reason}), retry after {retry_after}s",
+            headers={"Retry-After": str(retry_after)},
+        )
+        self.priority_class = priority_class
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _ClassState:
+    __slots__ = ("spec", "waiters", "in_flight", "admitted", "rejected")
+
+    def __init__(self, spec: PriorityClass):
+        self.spec = spec
+        # (future, slots) in arrival order
+        self.waiters: Deque[Tuple[asyncio.Future, int]] = deque()
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "overloaded": 0, "timeout": 0}
+
+    def has_capacity(self, slots: int = 1) -> bool:
+        return self.spec.max_in_flight is None or self.in_flight + slots <= self.spec.max_in_flight
+
+
+class AdmissionController:
+    """Bounded in-flight slots with per-class priority queues
+
+    Args:
+        name: label for metrics
+        max_in_flight: slots shared by all classes
+        classes: class name -> PriorityClass
+        max_wait: seconds a request may stay queued before it is rejected
+        service_time_hint: initial estimate of request duration for Retry-After
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        max_in_flight: int,
+        classes: Dict[str, PriorityClass],
+        max_wait: float = 10.0,
+        service_time_hint: float = 1.0,
+    ):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_wait = max_wait
+        self._classes = {
+            cls: _ClassState(spec) for cls, spec in sorted(classes.items(), key=lambda item: item[1].priority)
+        }
+        self._in_flight = 0
+        self._service_time = service_time_hint  # EWMA of admitted request duration
+
+    def _queued(self) -> int:
+        return sum(len(state.waiters) for state in self._classes.values())
+
+    def _expected_wait(self, ahead: int) -> float:
+        return self._service_time * (ahead + 1) / self.max_in_flight
+
+    def _ahead_of(self, cls: str) -> int:
+        """Queued requests that will be served before a new request of this class"""
+        priority = self._classes[cls].spec.priority
+        return sum(len(state.waiters) for state in self._classes.values() if state.spec.priority <= priority)
+
+    def _retry_after(self, ahead: int) -> int:
+        return max(1, math.ceil(self._expected_wait(ahead)))
+
+    def max_slots(self, cls: str) -> int:
+        """Most slots one request of this class can hold"""
+        cap = self._classes[cls].spec.max_in_flight
+        return self.max_in_flight if cap is None else min(cap, self.max_in_flight)
+
+    def _fits(self, state: _ClassState, slots: int) -> bool:
+        return self._in_flight + slots <= self.max_in_flight and state.has_capacity(slots)
+
+    def _grant(self, cls: str, slots: int) -> None:
+        self._in_flight += slots
+        state = self._classes[cls]
+        state.in_flight += slots
+        state.admitted += 1
+        IN_FLIGHT.labels(self.name, cls).inc(slots)
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiters, highest priority class first"""
+        for cls, state in self._classes.items():
+            # FIFO within a class: a waiter needing more slots than are free holds back the ones behind it
+            while state.waiters and self._fits(state, state.waiters[0][1]):
+                waiter, slots = state.waiters.popleft()
+                QUEUE_DEPTH.labels(self.name, cls).dec()
+                self._grant(cls, slots)
+                waiter.set_result(None)
+            if self._in_flight >= self.max_in_flight:
+                return
+
+    async def acquire(self, cls: str, slots: int = 1) -> float:
+        """Wait for ``slots`` slots (at most max_slots(cls)); returns the time spent queued in seconds"""
+        state = self._classes[cls]
+        slots = max(1, min(slots, self.max_slots(cls)))
+        if self._fits(state, slots) and not state.waiters:
+            self._grant(cls, slots)
+            WAIT_SECONDS.labels(self.name, cls, "admitted").observe(0.0)
+            return 0.0
+
+        if len(state.waiters) >= state.spec.max_queue:
+            self._reject(cls, "queue_full", 0.0)
+        if self._expected_wait(self._ahead_of(cls)) > self.max_wait:
+            self._reject(cls, "overloaded", 0.0)
+
+        start = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        state.waiters.append((waiter, slots))
+        QUEUE_DEPTH.labels(self.name, cls).inc()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                self._abandon(cls, waiter)
+                self._reject(cls, "timeout", time.perf_counter() - start)
+        except asyncio.CancelledError:
+            # client went away: give the slot back if it was granted meanwhile
+            if waiter.done():
+                self.release(cls, slots=slots)
+            else:
+                self._abandon(cls, waiter)
+            raise
+        waited = time.perf_counter() - start
+        WAIT_SECONDS.labels(self.name, cls, "admitted").observe(waited)
+        return waited
+
+    def _abandon(self, cls: str, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        state = self._classes[cls]
+        state.waiters = deque(entry for entry in state.waiters if entry[0] is not waiter)
+        QUEUE_DEPTH.labels(self.name, cls).dec()
+        # the abandoned waiter may have been holding back smaller requests behind it
+        self._dispatch()
+
+    def _reject(self, cls: str, reason: str, waited: float) -> None:
+        self._classes[cls].rejected[reason] += 1
+        REJECTED.labels(self.name, cls, reason).inc()
+        WAIT_SECONDS.labels(self.name, cls, "rejected").observe(waited)
+        raise AdmissionRejected(cls, reason, self._retry_after(self._queued()))
+
+    def release(self, cls: str, duration: Optional[float] = None, slots: int = 1) -> None:
+        """Free a request's slots; duration (seconds) updates the service-time estimate"""
+        slots = max(1, min(slots, self.max_slots(cls)))
+        self._in_flight -= slots
+        self._classes[cls].in_flight -= slots
+        IN_FLIGHT.labels(self.name, cls).dec(slots)
+        if duration is not None:
+            self._service_time = 0.9 * self._service_time + 0.1 * duration
+        self._dispatch()
+
+    @asynccontextmanager
+    async def admit(self, cls: str, slots: int = 1) -> AsyncIterator[float]:
+        """``async with controller.admit("chat"): ...``; raises AdmissionRejected when not admitted"""
+        waited = await self.acquire(cls, slots)
+        start = time.perf_counter()
+        try:
+            yield waited
+        finally:
+            self.release(cls, time.perf_counter() - start, slots)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self._in_flight,
+            "queued": self._queued(),
+            "max_wait_s": self.max_wait,
+            "service_time_s": round(self._service_time, 3),
+            "classes": {
+                cls: {
+                    "priority": state.spec.priority,
+                    "in_flight": state.in_flight,
+                    "queued": len(state.waiters),
+                    "max_queue": state.spec.max_queue,
+                    "max_in_flight": state.spec.max_in_flight,
+                    "admitted": state.admitted,
+                    "rejected": dict(state.rejected),
+                }
+                for cls, state in self._classes.items()
+            },
+        }
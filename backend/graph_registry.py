@@ -0,0 +1,156 @@
+"""
+Lazy graph registry
+
+Graph modules build their LLM and compile their StateGraph at import time, and
+importing them pulls in langgraph and langchain_openai. Importing them eagerly
+from backend/main.py put all of that on the cold-start path of every pod.
+The registry maps a graph name to the module that defines it and imports
+(i.e. compiles) the module on first use. warm_up() can do the same in a background
+thread right after startup, so pods start serving health checks immediately and
+the first real request usually finds the graph ready.
+
+Per graph it records how long the import/compile and the model construction took
+and how long the first request took; status() reports them together with the
+process start-up time.
+"""
+import importlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+WARMUP_MODES = ("lazy", "background", "eager")
+
+
+class _Entry:
+    __slots__ = ("module_path", "module", "lock", "load_ms", "model_ms", "first_request_ms", "error")
+
+    def __init__(self, module_path: str):
+        self.module_path = module_path
+        self.module: Optional[ModuleType] = None
+        self.lock = threading.Lock()
+        self.load_ms: Optional[float] = None
+        self.model_ms: Optional[float] = None
+        self.first_request_ms: Optional[float] = None
+        self.error: Optional[str] = None
+
+
+class GraphRegistry:
+    """Import graph modules on first use and keep timings for each one"""
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, _Entry] = {}
+        self._created = time.perf_counter()
+        self.startup_ms: Optional[float] = None
+        self.warmup_mode: Optional[str] = None
+
+    def register(self, name: str, module_path: str) -> None:
+        """Register a graph module, e.g. register("customer_support", "customer_support_agent_langgraph")"""
+        self._entries[name] = _Entry(module_path)
+
+    def names(self) -> List[str]:
+        return list(self._entries)
+
+    def load(self, name: str, *, with_models: bool = False) -> ModuleType:
+        """Import (and thereby compile) the graph module; concurrent callers wait for one import
+
+        Args:
+            name: registered graph name
+            with_models: also build lazily-constructed models defined in the module
+        """
+        entry = self._entries[name]
+        if entry.module is None:
+            with entry.lock:
+                if entry.module is None:
+                    start = time.perf_counter()
+                    try:
+                        module = importlib.import_module(entry.module_path)
+                    except Exception as exc:
+                        entry.error = f"{type(exc).__name__}: {exc}"
+                        raise
+                    entry.load_ms = (time.perf_counter() - start) * 1000
+                    entry.module = module
+                    logger.info("Loaded graph %s in %.0f ms", name, entry.load_ms)
+        if with_models and entry.model_ms is None:
+            self._load_models(entry)
+        return entry.module
+
+    def _load_models(self, entry: _Entry) -> None:
+        # Lazily-built objects (LazyRunnable models, local classifiers) expose
+        # `loaded` and `load()`; build them now instead of on the first request.
+        start = time.perf_counter()
+        for value in list(vars(entry.module).values()):
+            if getattr(value, "loaded", None) is False:
+                value.load()
+        entry.model_ms = (time.perf_counter() - start) * 1000
+
+    def mark_ready(self) -> None:
+        """Record the time from registry creation (backend import) until the app is ready to serve"""
+        self.startup_ms = (time.perf_counter() - self._created) * 1000
+
+    def warm_up(self, mode: str = "background") -> Optional[threading.Thread]:
+        """Load all registered graphs and their models
+
+        Args:
+            mode: "lazy" does nothing (graphs load on first request), "eager" loads them
+                before returning, "background" loads them in a daemon thread
+        """
+        if mode not in WARMUP_MODES:
+            raise ValueError(f"Unknown warm-up mode {mode!r}, expected one of {WARMUP_MODES}")
+        self.warmup_mode = mode
+        if mode == "lazy":
+            return None
+        if mode == "eager":
+            self._warm_all()
+            return None
+        thread = threading.Thread(target=self._warm_all, name="graph-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def _warm_all(self) -> None:
+        for name in self._entries:
+            try:
+                self.load(name, with_models=True)
+            except Exception:
+                logger.exception("Warm-up of graph %s failed", name)
+
+    @contextmanager
+    def request_timer(self, name: str) -> Iterator[None]:
+        """Time a request; the first one per graph is kept as first_request_ms"""
+        entry = self._entries[name]
+        if entry.first_request_ms is not None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if entry.first_request_ms is None:
+                entry.first_request_ms = (time.perf_counter() - start) * 1000
+
+    def status(self) -> Dict[str, Any]:
+        def rounded(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value, 1)
+
+        return {
+            "startup_ms": rounded(self.startup_ms),
+            "warmup_mode": self.warmup_mode,
+            "graphs": {
+                name: {
+                    "module": entry.module_path,
+                    "loaded": entry.module is not None,
+                    "load_ms": rounded(entry.load_ms),
+                    "model_ms": rounded(entry.model_ms),
+                    "first_request_ms": rounded(entry.first_request_ms),
+                    "error": entry.error,
+                }
+                for name, entry in self._entries.items()
+            },
+        }
+
+
+registry = GraphRegistry()
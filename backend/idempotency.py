@@ -0,0 +1,169 @@
+"""
+Request coalescing and idempotency keys for the LLM-backed endpoints
+
+Double-clicks and client retries send the same /api/chat or /api/travel/plan
+request again within seconds, and each copy used to run the whole graph (and pay
+for its tokens). IdempotencyCache sits in front of admission control and
+identifies a request by:
+
+- its ``Idempotency-Key`` header, scoped to the endpoint; the same key with a
+  different body is rejected with 422
+- otherwise a SHA-256 hash of the request body, scoped to the endpoint
+
+While a request is running, identical requests await the same execution instead
+of starting their own ("coalesced"). After it succeeds, its result is kept for
+IDEMPOTENCY_KEY_TTL seconds for keyed requests and IDEMPOTENCY_BODY_TTL seconds
+for hashed ones, and repeats get it back without running the graph ("replayed").
+The hash window is short on purpose: asking the same question again a minute
+later should produce a fresh answer. Failures are shared with the requests that
+were waiting on them but are never stored.
+
+The execution runs as its own task, so a client that disconnects does not cancel
+it for the others (and its retry can pick the result up). Each response carries
+``Idempotency-Status: executed|coalesced|replayed``. Outcomes are exported as
+Prometheus metrics and returned by stats().
+
+The cache is asyncio-based and must be used from a single event loop.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple, TypeVar
+
+from fastapi import HTTPException
+from prometheus_client import Counter, Gauge
+
+REQUESTS = Counter("idempotency_requests_total", "Requests by idempotency outcome", ["endpoint", "outcome"])
+IN_FLIGHT = Gauge("idempotency_in_flight", "Distinct executions in progress", ["endpoint"])
+
+OUTCOMES = ("executed", "coalesced", "replayed")
+MAX_KEY_LENGTH = 255
+
+T = TypeVar("T")
+
+
+class IdempotencyConflict(HTTPException):
+    """Raised when an Idempotency-Key is reused with a different request body"""
+
+    def __init__(self, endpoint: str):
+        super().__init__(
+            status_code=422,
+            detail=f"Idempotency-Key was already used for a different {endpoint} request",
+        )
+
+
+class RequestKey(NamedTuple):
+    endpoint: str
+    key: str
+    fingerprint: str
+    ttl: float
+
+
+def fingerprint(body: Any) -> str:
+    """SHA-256 of the body as canonical JSON (sorted keys, no whitespace)"""
+    if hasattr(body, "model_dump"):
+        body = body.model_dump(mode="json")
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class _Entry(NamedTuple):
+    fingerprint: str
+    expires: float
+    result: Any
+
+
+class IdempotencyCache:
+    """Coalesce identical in-flight requests and replay recent results
+
+    Args:
+        key_ttl: seconds a result is replayed for requests with an Idempotency-Key
+        body_ttl: seconds a result is replayed for requests identified by body hash
+            (0 still coalesces concurrent duplicates but keeps nothing afterwards)
+        max_entries: stored results; the oldest are dropped first
+        hash_body: identify requests without an Idempotency-Key by body hash
+    """
+
+    def __init__(self, key_ttl: float = 3600, body_ttl: float = 10, max_entries: int = 1000, hash_body: bool = True):
+        self.key_ttl = key_ttl
+        self.body_ttl = body_ttl
+        self.max_entries = max_entries
+        self.hash_body = hash_body
+        self._in_flight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self._done: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def request_key(self, endpoint: str, body: Any, idempotency_key: Optional[str] = None) -> Optional[RequestKey]:
+        """Identity of one request, or None when it should always run on its own"""
+        digest = fingerprint(body)
+        if idempotency_key is not None:
+            idempotency_key = idempotency_key.strip()
+            if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+                raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+            return RequestKey(endpoint, f"{endpoint}:key:{idempotency_key}", digest, self.key_ttl)
+        if not self.hash_body:
+            return None
+        return RequestKey(endpoint, f"{endpoint}:body:{digest}", digest, self.body_ttl)
+
+    async def run(self, key: Optional[RequestKey], factory: Callable[[], Awaitable[T]]) -> Tuple[T, str]:
+        """Result of factory() for this request and how it was obtained (see OUTCOMES)"""
+        if key is None:
+            return await factory(), "executed"
+        self._purge(time.monotonic())
+
+        entry = self._done.get(key.key)
+        if entry is not None:
+            self._check(key, entry.fingerprint)
+            self._record(key.endpoint, "replayed")
+            return entry.result, "replayed"
+
+        running = self._in_flight.get(key.key)
+        if running is not None:
+            self._check(key, running[0])
+            task, outcome = running[1], "coalesced"
+        else:
+            task, outcome = asyncio.ensure_future(factory()), "executed"
+            self._in_flight[key.key] = (key.fingerprint, task)
+            IN_FLIGHT.labels(key.endpoint).inc()
+            task.add_done_callback(partial(self._finished, key))
+        self._record(key.endpoint, outcome)
+        return await asyncio.shield(task), outcome
+
+    def _check(self, key: RequestKey, stored: str) -> None:
+        if stored != key.fingerprint:
+            raise IdempotencyConflict(key.endpoint)
+
+    def _finished(self, key: RequestKey, task: asyncio.Future) -> None:
+        del self._in_flight[key.key]
+        IN_FLIGHT.labels(key.endpoint).dec()
+        # Retrieve the exception even when every waiter has gone, so it is not logged as unhandled
+        if task.cancelled() or task.exception() is not None or key.ttl <= 0:
+            return
+        self._done[key.key] = _Entry(key.fingerprint, time.monotonic() + key.ttl, task.result())
+        self._done.move_to_end(key.key)
+        while len(self._done) > self.max_entries:
+            self._done.popitem(last=False)
+
+    def _purge(self, now: float) -> None:
+        expired = [key for key, entry in self._done.items() if entry.expires <= now]
+        for key in expired:
+            del self._done[key]
+
+    def _record(self, endpoint: str, outcome: str) -> None:
+        REQUESTS.labels(endpoint, outcome).inc()
+        counts = self._counts.setdefault(endpoint, dict.fromkeys(OUTCOMES, 0))
+        counts[outcome] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "key_ttl_s": self.key_ttl,
+            "body_ttl_s": self.body_ttl,
+            "hash_body": self.hash_body,
+            "in_flight": len(self._in_flight),
+            "stored": len(self._done),
+            "max_entries": self.max_entries,
+            "endpoints": {endpoint: dict(counts) for endpoint, counts in self._counts.items()},
+        }
@@ -0,0 +1,273 @@
+"""
+Background jobs with progress streaming
+
+Analytics graphs such as mapreduce.py take seconds to minutes on a real corpus;
+running them inside a request would hold an API worker (and the client's
+connection) for the whole job. JobManager runs them on its own thread pool
+instead. Submitting returns a job id right away and the job's progress events are
+kept so any number of clients can follow them over SSE, including clients that
+connect after the job started (they get the events so far, then live ones).
+
+Events are plain dicts with an "event" name:
+
+- queued / started
+- split      the corpus was cut into shards ({"shards": n, "documents_total": n})
+- shard      one map task finished ({"shard": i, "shards_done": k, "documents": n, ...})
+- succeeded  the final result is stored on the job ({"result": ...})
+- failed     ({"error": "..."})
+
+Finished jobs (result or error) are kept in memory for retrieval; the oldest are
+dropped once more than max_finished have accumulated.
+
+Corpora are referenced by name relative to MAPREDUCE_CORPUS_DIR (default ./corpora):
+a .txt file (one document per non-empty line), a .jsonl file (one {"text": ...}
+object per line) or a directory of .txt files (one document per file). The name
+"sample" refers to the demo documents in mapreduce.py.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+TERMINAL_EVENTS = ("succeeded", "failed")
+# Event fields that also update Job.progress (the latest value wins)
+PROGRESS_KEYS = ("shards", "shards_done", "documents_total", "documents_done")
+
+CORPUS_DIR = os.getenv("MAPREDUCE_CORPUS_DIR", "corpora")
+
+
+class JobRejected(HTTPException):
+    """Raised when too many jobs are already waiting; FastAPI turns it into 429 + Retry-After"""
+
+    def __init__(self, pending: int, retry_after: int = 30):
+        super().__init__(
+            status_code=429,
+            detail=f"Too many pending jobs ({pending}), retry after {retry_after}s",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class Job:
+    """One submitted job: state, progress events and the stored result"""
+
+    def __init__(self, kind: str, params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.status = "queued"
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.progress: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.events: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+        self.subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_EVENTS
+
+    def snapshot(self, *, with_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "params": self.params,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "progress": dict(self.progress),
+            "error": self.error,
+        }
+        if with_result:
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    """Run jobs on a bounded thread pool and fan their progress out to subscribers
+
+    Args:
+        max_workers: jobs running at once
+        max_pending: queued (not yet started) jobs before submit() rejects with 429
+        max_finished: finished jobs kept for retrieval
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 32, max_finished: int = 100):
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        # Jobs run in the context they were submitted from, so a traced request's job joins its trace
+        self._executor = ContextThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, params: Dict[str, Any], fn: Callable[[Job, Callable[[Dict[str, Any]], None]], Any]) -> Job:
+        """Queue fn(job, publish); its return value becomes the job result"""
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if job.status == "queued")
+            if pending >= self.max_pending:
+                raise JobRejected(pending)
+            job = Job(kind, params)
+            self._jobs[job.id] = job
+        self.publish(job, {"event": "queued"})
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        return list(self._jobs.values())
+
+    def publish(self, job: Job, event: Dict[str, Any]) -> None:
+        """Record an event and hand it to live subscribers (callable from any thread)"""
+        event = {"job_id": job.id, "time": time.time(), **event}
+        with job.lock:
+            job.events.append(event)
+            job.progress.update((key, event[key]) for key in PROGRESS_KEYS if key in event)
+            subscribers = list(job.subscribers)
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    async def events(self, job: Job, heartbeat: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Past events, then live ones until the job finishes; yields None as a keep-alive"""
+        queue: asyncio.Queue = asyncio.Queue()
+        subscriber = (asyncio.get_running_loop(), queue)
+        with job.lock:
+            history = list(job.events)
+            # The terminal event is always the last one; until it is recorded, follow live events
+            if not history or history[-1]["event"] not in TERMINAL_EVENTS:
+                job.subscribers.append(subscriber)
+        try:
+            for event in history:
+                yield event
+                if event["event"] in TERMINAL_EVENTS:
+                    return
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield event
+                if event["event"] in TERMINAL_EVENTS:
+                    return
+        finally:
+            with job.lock:
+                if subscriber in job.subscribers:
+                    job.subscribers.remove(subscriber)
+
+    def _run(self, job: Job, fn: Callable[[Job, Callable[[Dict[str, Any]], None]], Any]) -> None:
+        job.status, job.started = "running", time.time()
+        self.publish(job, {"event": "started"})
+        try:
+            result = fn(job, lambda event: self.publish(job, event))
+        except Exception as exc:
+            job.error = f"{type(exc).__name__}: {exc}"
+            job.status, job.finished = "failed", time.time()
+            self.publish(job, {"event": "failed", "error": job.error})
+        else:
+            job.result = result
+            job.status, job.finished = "succeeded", time.time()
+            self.publish(job, {"event": "succeeded", "result": result})
+        self._evict()
+
+    def _evict(self) -> None:
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job.done]
+            for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+                del self._jobs[job_id]
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def format_sse(event: Optional[Dict[str, Any]]) -> str:
+    """Server-sent event frame; None becomes a comment line that keeps proxies from timing out"""
+    if event is None:
+        return ": keep-alive\n\n"
+    return f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+# ---------- mapreduce ----------
+
+def resolve_corpus(reference: str) -> str:
+    """Path of a corpus name under CORPUS_DIR; raises ValueError / FileNotFoundError"""
+    root = os.path.realpath(CORPUS_DIR)
+    path = os.path.realpath(os.path.join(root, reference))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"Corpus {reference!r} is outside the corpus directory")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Corpus {reference!r} not found in {CORPUS_DIR}")
+    return path
+
+
+def load_corpus(path: str) -> List[str]:
+    """Read a corpus file or directory (see resolve_corpus) into a list of documents"""
+    if os.path.isdir(path):
+        documents = []
+        for name in sorted(os.listdir(path)):
+            if name.endswith(".txt"):
+                with open(os.path.join(path, name), encoding="utf-8") as f:
+                    documents.append(f.read())
+        return documents
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line)["text"] for line in f if line.strip()]
+        return [line.strip() for line in f if line.strip()]
+
+
+def run_mapreduce(
+    module: Any,
+    documents: List[str],
+    num_shards: int,
+    publish: Callable[[Dict[str, Any]], None],
+    mode: str = "exact",
+    config: Optional[RunnableConfig] = None,
+) -> Dict[str, Any]:
+    """Run mapreduce_graph with stream_mode="updates", publishing one event per finished shard
+
+    mode="approximate" counts with fixed-size sketches (see sketches.py) instead of exact dicts.
+    config carries the run's callbacks (metrics, tracing).
+    """
+    final_result: Dict[str, Any] = {}
+    shards = shards_done = documents_done = 0
+    state = {
+        "large_input_data": documents,
+        "sub_datasets": [],
+        "intermediate_results": [],
+        "final_result": {},
+        "num_sub_tasks": num_shards,
+        "mode": mode,
+    }
+    for update in module.mapreduce_graph.stream(state, config, stream_mode="updates"):
+        for node, values in update.items():
+            if node == "split_node":
+                shards = len(values["sub_datasets"])
+                publish({"event": "split", "shards": shards, "documents_total": len(documents)})
+            elif node == "map_node":
+                for partial in values["intermediate_results"]:
+                    shards_done += 1
+                    documents_done += partial["doc_count"]
+                    publish({
+                        "event": "shard",
+                        "shard": partial.get("shard"),
+                        "shards": shards,
+                        "shards_done": shards_done,
+                        "documents": partial["doc_count"],
+                        "documents_done": documents_done,
+                        "unique_words": partial["unique_words"],
+                    })
+            elif node == "reduce_node":
+                final_result = values["final_result"]
+    return final_result
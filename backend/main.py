@@ -2,24 +2,121 @@
 FastAPI backend for Customer Support Agent
 Connects the Vue3 frontend to the LangGraph workflow
 """
-from fastapi import FastAPI, HTTPException
+import time
+
+_import_start = time.perf_counter()
+
+from contextlib import asynccontextmanager, nullcontext
+from fastapi import FastAPI, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Dict, Optional, List
+from pydantic import BaseModel, Field
+from typing import Dict, Literal, Optional, List
 import sys
 import os
 
 # Add parent directory to path to import the agent
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _root not in sys.path:
+    sys.path.append(_root)
+
+from backend.admission import AdmissionController, PriorityClass
+from backend.graph_registry import registry
+from backend.idempotency import IdempotencyCache
+from backend.jobs import JobManager, format_sse, load_corpus, resolve_corpus, run_mapreduce
+from backend.metrics import metrics_handler, render_metrics
+from backend import profiling, tracing
+from backend.profiling import RunProfiler, profiler_for
+from backend.responses import CompressionMiddleware, ORJSONResponse
+
+# Graph modules are imported (and compiled) on first use or by the warm-up in
+# lifespan, not here, so the server binds its port without waiting for them.
+registry.register("customer_support", "customer_support_agent_langgraph")
+registry.register("travel_planner", "backend.travel_planner_api")
+registry.register("mapreduce", "mapreduce")
+
+# One pool of in-flight slots in front of the model gateway. Chat (which may need
+# escalating) is served ahead of travel plans; travel may hold at most half the slots.
+_max_in_flight = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "16"))
+admission = AdmissionController(
+    "llm",
+    max_in_flight=_max_in_flight,
+    max_wait=float(os.getenv("ADMISSION_MAX_WAIT", "10")),
+    classes={
+        "chat": PriorityClass(priority=0, max_queue=int(os.getenv("ADMISSION_CHAT_QUEUE", "64"))),
+        "travel": PriorityClass(
+            priority=1,
+            max_queue=int(os.getenv("ADMISSION_TRAVEL_QUEUE", "16")),
+            max_in_flight=max(1, _max_in_flight // 2),
+        ),
+    },
+)
+
+# Parallel travel plans generate one section per interest; each concurrent section is a
+# gateway call and holds its own admission slot
+MAX_TRAVEL_INTERESTS = 8
+TRAVEL_PARALLEL_SECTIONS = max(1, int(os.getenv("TRAVEL_PARALLEL_SECTIONS", "4")))
+
+# Duplicate chat / travel requests (double-clicks, client retries) share one graph run;
+# checked before admission so duplicates never take an in-flight slot
+idempotency = IdempotencyCache(
+    key_ttl=float(os.getenv("IDEMPOTENCY_KEY_TTL", "3600")),
+    body_ttl=float(os.getenv("IDEMPOTENCY_BODY_TTL", "10")),
+    max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "1000")),
+    hash_body=os.getenv("IDEMPOTENCY_HASH_BODY", "1") != "0",
+)
+
+# Analytics jobs run on their own thread pool, never on the API workers
+jobs = JobManager(
+    max_workers=int(os.getenv("JOBS_MAX_WORKERS", "2")),
+    max_pending=int(os.getenv("JOBS_MAX_PENDING", "32")),
+)
+
+# OTEL_TRACING=otlp|file|console traces each request through its graph nodes and LLM calls
+TRACING_ENABLED = tracing.configure()
+
+IMPORT_MS = (time.perf_counter() - _import_start) * 1000
+
+
+def _run_graph(name: str, entry_point: str, *args, profiler: Optional[RunProfiler] = None):
+    """Load the graph module and call its entry point; runs in the threadpool so the
+    synchronous graph (and a first-use import) never blocks the event loop"""
+    with registry.request_timer(name):
+        entry = getattr(registry.load(name), entry_point)
+        with profiler or nullcontext():
+            return entry(*args)
+
+
+def _graph_config(run_name: str, profiler: Optional[RunProfiler] = None, response: Optional[Response] = None) -> Dict:
+    """Run config with the metrics callback, plus the tracing handler when tracing is on
+    and the profiler when this request is profiled"""
+    callbacks = [metrics_handler]
+    if tracing.handler is not None:
+        callbacks.append(tracing.handler)
+    if profiler is not None:
+        response.headers["X-Profile-Id"] = profiler.run_id
+        callbacks.append(profiler)
+    return {"callbacks": callbacks, "run_name": run_name}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # GRAPH_WARMUP: background (default) | eager | lazy
+    registry.warm_up(os.getenv("GRAPH_WARMUP", "background"))
+    registry.mark_ready()
+    yield
+    jobs.shutdown()
+    tracing.shutdown()
 
-from customer_support_agent_langgraph import run_customer_support, app as langgraph_app
-from backend.travel_planner_api import generate_travel_plan
 
 # Create FastAPI app
 api = FastAPI(
     title="AI Assistant API",
     description="API for Customer Support Agent and Travel Planner powered by LangGraph",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS for Vue frontend
@@ -31,6 +128,13 @@ api.add_middleware(
     allow_headers=["*"],
 )
 
+# Itineraries are multi-KB markdown; compress bodies above 1 KB (brotli if installed, else gzip)
+api.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+# Outermost, so the request span covers compression and every other middleware
+if TRACING_ENABLED:
+    api.add_middleware(tracing.TracingMiddleware)
+
 class QueryRequest(BaseModel):
     """Request model for customer queries"""
     query: str
@@ -51,7 +155,9 @@ class HealthResponse(BaseModel):
 class TravelPlanRequest(BaseModel):
     """Request model for travel planning"""
     city: str
-    interests: List[str]
+    interests: List[str] = Field(..., max_length=MAX_TRAVEL_INTERESTS)
+    # "parallel" generates one section per interest concurrently and merges them
+    mode: Literal["sequential", "parallel"] = "sequential"
 
 class TravelPlanResponse(BaseModel):
     """Response model for travel planning"""
@@ -60,6 +166,22 @@ class TravelPlanResponse(BaseModel):
     itinerary: str
     status: str = "success"
 
+class MapReduceJobRequest(BaseModel):
+    """Word-statistics job over a corpus: a name under MAPREDUCE_CORPUS_DIR ("sample" for the demo
+    documents) or inline documents"""
+    corpus: Optional[str] = None
+    documents: Optional[List[str]] = None
+    num_shards: int = Field(4, ge=1, le=256)
+    # "approximate" counts with fixed-memory sketches: top-k and unique words are estimates
+    mode: Literal["exact", "approximate"] = "exact"
+
+class JobResponse(BaseModel):
+    """A submitted job and where to follow it"""
+    job_id: str
+    status: str
+    events_url: str
+    result_url: str
+
 @api.get("/", response_model=HealthResponse)
 async def root():
     """Root endpoint - health check"""
@@ -70,21 +192,69 @@ async def health_check():
     """Health check endpoint"""
     return HealthResponse(status="healthy", message="Service is operational")
 
+@api.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-graph/per-node latency, LLM tokens, errors, retries, in-flight runs"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@api.get("/api/graphs")
+async def graph_status():
+    """Cold-start timings: backend import, startup, per-graph load and first request"""
+    return {"import_ms": round(IMPORT_MS, 1), **registry.status()}
+
+@api.get("/api/admission")
+async def admission_status():
+    """Admission control: in-flight and queued requests per priority class, rejections"""
+    return admission.stats()
+
+@api.get("/api/idempotency")
+async def idempotency_status():
+    """Request coalescing: executed / coalesced / replayed requests per endpoint, stored results"""
+    return idempotency.stats()
+
+@api.get("/api/profiles")
+async def recent_profiles():
+    """Summaries of recently profiled graph runs (send X-Profile: sample|cprofile to profile one)"""
+    return {"directory": profiling.PROFILE_DIR, "runs": list(profiling.recent)[::-1]}
+
 @api.post("/api/chat", response_model=QueryResponse)
-async def process_query(request: QueryRequest):
+async def process_query(
+    request: QueryRequest,
+    response: Response,
+    x_profile: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None),
+):
     """
     Process a customer query through the LangGraph workflow.
     
     - Categorizes the query (Technical, Billing, General)
     - Analyzes sentiment (Positive, Neutral, Negative)
     - Routes to appropriate handler or escalates if negative
+    - Identical requests (same Idempotency-Key, or same body within seconds) share one run
     """
     try:
         if not request.query.strip():
             raise HTTPException(status_code=400, detail="Query cannot be empty")
         
-        # Process through LangGraph
-        result = run_customer_support(request.query)
+        # Process through LangGraph; a profiled request always gets its own run
+        profiler = profiler_for(x_profile, "customer_support")
+        key = None if profiler else idempotency.request_key("chat", request, idempotency_key)
+
+        async def execute():
+            async with admission.admit("chat"):
+                return await run_in_threadpool(
+                    _run_graph,
+                    "customer_support",
+                    "run_customer_support",
+                    request.query,
+                    _graph_config("customer_support", profiler, response),
+                    profiler=profiler,
+                )
+
+        result, outcome = await idempotency.run(key, execute)
+        response.headers["Idempotency-Status"] = outcome
+        tracing.set_attributes({"idempotency.status": outcome})
         
         return QueryResponse(
             query=request.query,
@@ -93,9 +263,24 @@ async def process_query(request: QueryRequest):
             response=result["response"],
             status="success"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@api.get("/api/cache")
+async def node_cache_stats():
+    """Node result cache hit rates per graph and node (graphs that have not loaded yet are absent)"""
+    # Looked up lazily so this endpoint does not import langgraph at start-up
+    node_cache = sys.modules.get("node_cache")
+    return node_cache.cache_stats() if node_cache else {}
+
+@api.get("/api/triage")
+async def triage_stats():
+    """Share of category / sentiment decisions answered by the local classifiers instead of the LLM"""
+    module = await run_in_threadpool(registry.load, "customer_support")
+    return module.triage.stats()
+
 @api.get("/api/categories")
 async def get_categories():
     """Get available query categories"""
@@ -109,22 +294,51 @@ async def get_categories():
     }
 
 @api.post("/api/travel/plan", response_model=TravelPlanResponse)
-async def create_travel_plan(request: TravelPlanRequest):
+async def create_travel_plan(
+    request: TravelPlanRequest,
+    response: Response,
+    x_profile: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None),
+):
     """
     Generate a travel itinerary based on destination city and interests.
     
     - Takes a city and list of interests
     - Generates a detailed day trip itinerary
     - Returns recommendations for places, activities, and dining
+    - Identical requests (same Idempotency-Key, or same body within seconds) share one run
     """
     try:
         if not request.city.strip():
             raise HTTPException(status_code=400, detail="City cannot be empty")
-        if not request.interests or len(request.interests) == 0:
+        interests = list(dict.fromkeys(i.strip() for i in request.interests if i.strip()))
+        if not interests:
             raise HTTPException(status_code=400, detail="At least one interest is required")
+        # One slot per concurrently generated section, and the graph never runs more than that
+        slots = 1
+        if request.mode == "parallel":
+            slots = min(len(interests), TRAVEL_PARALLEL_SECTIONS, admission.max_slots("travel"))
         
-        # Generate travel plan through LangGraph
-        result = generate_travel_plan(request.city, request.interests)
+        # Generate travel plan through LangGraph; a profiled request always gets its own run
+        profiler = profiler_for(x_profile, "travel_planner")
+        key = None if profiler else idempotency.request_key("travel", request, idempotency_key)
+
+        async def execute():
+            async with admission.admit("travel", slots):
+                return await run_in_threadpool(
+                    _run_graph,
+                    "travel_planner",
+                    "generate_travel_plan",
+                    request.city,
+                    interests,
+                    {**_graph_config("travel_planner", profiler, response), "max_concurrency": slots},
+                    request.mode,
+                    profiler=profiler,
+                )
+
+        result, outcome = await idempotency.run(key, execute)
+        response.headers["Idempotency-Status"] = outcome
+        tracing.set_attributes({"idempotency.status": outcome})
         
         return TravelPlanResponse(
             city=result["city"],
@@ -132,6 +346,8 @@ async def create_travel_plan(request: TravelPlanRequest):
             itinerary=result["itinerary"],
             status="success"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -151,6 +367,82 @@ async def get_popular_interests():
         ]
     }
 
+def _mapreduce_job(documents: Optional[List[str]], corpus_path: Optional[str], num_shards: int, mode: str):
+    def run(job, publish):
+        module = registry.load("mapreduce")
+        if documents is not None:
+            corpus = documents
+        elif corpus_path is None:
+            corpus = module.large_documents
+        else:
+            corpus = load_corpus(corpus_path)
+        return run_mapreduce(module, corpus, num_shards, publish, mode, _graph_config("mapreduce"))
+    return run
+
+@api.post("/api/jobs/mapreduce", response_model=JobResponse, status_code=202)
+async def submit_mapreduce_job(request: MapReduceJobRequest):
+    """
+    Queue a MapReduce word-statistics job and return its id right away.
+
+    - Follow per-shard progress at /api/jobs/{job_id}/events (SSE)
+    - Fetch the stored result at /api/jobs/{job_id}
+    """
+    if (request.corpus is None) == (request.documents is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of corpus or documents")
+    if request.documents is not None and not request.documents:
+        raise HTTPException(status_code=400, detail="documents cannot be empty")
+    corpus_path = None
+    if request.corpus is not None and request.corpus != "sample":
+        try:
+            corpus_path = resolve_corpus(request.corpus)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    job = jobs.submit(
+        "mapreduce",
+        {
+            "corpus": request.corpus,
+            "documents": len(request.documents or ()),
+            "num_shards": request.num_shards,
+            "mode": request.mode,
+        },
+        _mapreduce_job(request.documents, corpus_path, request.num_shards, request.mode),
+    )
+    return JobResponse(
+        job_id=job.id,
+        status=job.status,
+        events_url=f"/api/jobs/{job.id}/events",
+        result_url=f"/api/jobs/{job.id}",
+    )
+
+def _get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@api.get("/api/jobs")
+async def list_jobs():
+    """Queued, running and recently finished jobs (without results)"""
+    return {"jobs": [job.snapshot(with_result=False) for job in jobs.jobs()]}
+
+@api.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job status, progress and, once it succeeded, the stored result"""
+    return _get_job(job_id).snapshot()
+
+@api.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-sent events: the job's progress so far, then live updates until it finishes"""
+    job = _get_job(job_id)
+
+    async def stream():
+        async for event in jobs.events(job):
+            yield format_sse(event)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(api, host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,218 @@
+"""
+Prometheus instrumentation for the LangGraph workflows
+
+MetricsCallbackHandler is a LangChain callback handler that turns run events into
+Prometheus metrics:
+- per-graph and per-node latency histograms (status: ok / error / interrupted)
+- LLM latency histograms and input/output token counters per node and model
+- error counters and retry counters (a node task that starts again with the same
+  langgraph_checkpoint_ns inside the same graph run is a RetryPolicy retry)
+- in-flight gauges for graphs, nodes and LLM calls
+
+The handler runs inline (no thread hop) and only does dict lookups and metric
+updates per event, so it can stay enabled on the hot path. Pass it through the
+run config, e.g. ``app.invoke(state, {"callbacks": [metrics_handler], "run_name": "customer_support"})``;
+the root run name becomes the ``graph`` label.
+"""
+import sys
+import time
+from typing import Any, Dict, List, Optional, Set
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# LLM calls range from milliseconds (cached / tiny prompts) to minutes (long generations)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+GRAPH_DURATION = Histogram(
+    "langgraph_graph_duration_seconds", "End-to-end graph run latency", ["graph", "status"], buckets=LATENCY_BUCKETS
+)
+NODE_DURATION = Histogram(
+    "langgraph_node_duration_seconds", "Node latency (per attempt)", ["graph", "node", "status"], buckets=LATENCY_BUCKETS
+)
+LLM_DURATION = Histogram(
+    "langgraph_llm_duration_seconds", "LLM call latency", ["graph", "node", "model"], buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter("langgraph_llm_tokens_total", "LLM tokens consumed", ["graph", "node", "model", "type"])
+ERRORS = Counter("langgraph_errors_total", "Failed graph, node and LLM runs", ["graph", "node", "kind", "error"])
+NODE_RETRIES = Counter("langgraph_node_retries_total", "Node attempts retried by RetryPolicy", ["graph", "node"])
+GRAPH_IN_FLIGHT = Gauge("langgraph_graph_in_flight", "Graph runs in progress", ["graph"])
+NODE_IN_FLIGHT = Gauge("langgraph_node_in_flight", "Node runs in progress", ["graph", "node"])
+LLM_IN_FLIGHT = Gauge("langgraph_llm_in_flight", "LLM calls in progress", ["graph", "node", "model"])
+
+GRAPH, NODE, CHAIN, LLM = "graph", "node", "chain", "llm"
+
+
+class _Run:
+    __slots__ = ("kind", "graph", "node", "model", "start")
+
+    def __init__(self, kind: str, graph: str, node: str = "", model: str = ""):
+        self.kind = kind
+        self.graph = graph
+        self.node = node
+        self.model = model
+        self.start = time.perf_counter()
+
+
+def _is_interrupt(error: BaseException) -> bool:
+    # Looked up lazily: importing langgraph.errors here would pull langgraph into
+    # backend start-up, and no graph can have raised one before langgraph is loaded.
+    errors = sys.modules.get("langgraph.errors")
+    return errors is not None and isinstance(error, errors.GraphBubbleUp)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Record LangGraph run events as Prometheus metrics"""
+
+    run_inline = True
+
+    def __init__(self) -> None:
+        self._runs: Dict[UUID, _Run] = {}
+        # checkpoint namespaces of node tasks already started, per parent graph run
+        self._tasks: Dict[UUID, Set[str]] = {}
+
+    # ---------- chains: graphs, nodes and everything nested inside them ----------
+
+    def on_chain_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        inputs: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        tags: Optional[List[str]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        parent = self._runs.get(parent_run_id) if parent_run_id else None
+        name = kwargs.get("name") or "graph"
+        if parent is None:
+            GRAPH_IN_FLIGHT.labels(name).inc()
+            self._runs[run_id] = _Run(GRAPH, name)
+            return
+
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node")
+        if node is None or node != name or not any(tag.startswith("graph:step:") for tag in tags or ()):
+            self._runs[run_id] = _Run(CHAIN, parent.graph, parent.node)
+            return
+
+        task = metadata.get("langgraph_checkpoint_ns", "")
+        seen = self._tasks.setdefault(parent_run_id, set())
+        if task in seen:
+            NODE_RETRIES.labels(parent.graph, node).inc()
+        seen.add(task)
+        NODE_IN_FLIGHT.labels(parent.graph, node).inc()
+        self._runs[run_id] = _Run(NODE, parent.graph, node)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, "ok")
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        # interrupt() and Command(graph=PARENT) travel as exceptions but are not failures
+        self._finish(run_id, "interrupted" if _is_interrupt(error) else "error", error)
+
+    def _finish(self, run_id: UUID, status: str, error: Optional[BaseException] = None) -> None:
+        run = self._runs.pop(run_id, None)
+        self._tasks.pop(run_id, None)
+        if run is None or run.kind == CHAIN:
+            return
+        elapsed = time.perf_counter() - run.start
+        if status == "error":
+            ERRORS.labels(run.graph, run.node, run.kind, type(error).__name__).inc()
+        if run.kind == GRAPH:
+            GRAPH_IN_FLIGHT.labels(run.graph).dec()
+            GRAPH_DURATION.labels(run.graph, status).observe(elapsed)
+        else:
+            NODE_IN_FLIGHT.labels(run.graph, run.node).dec()
+            NODE_DURATION.labels(run.graph, run.node, status).observe(elapsed)
+
+    # ---------- LLM calls ----------
+
+    def on_chat_model_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        messages: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        self._start_llm(serialized, run_id, parent_run_id, kwargs)
+
+    def on_llm_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        prompts: List[str],
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        self._start_llm(serialized, run_id, parent_run_id, kwargs)
+
+    def _start_llm(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        run_id: UUID,
+        parent_run_id: Optional[UUID],
+        kwargs: Dict[str, Any],
+    ) -> None:
+        parent = self._runs.get(parent_run_id) if parent_run_id else None
+        params = kwargs.get("invocation_params") or {}
+        model = (
+            params.get("model")
+            or params.get("model_name")
+            or kwargs.get("name")
+            or (serialized or {}).get("name")
+            or "unknown"
+        )
+        node = (kwargs.get("metadata") or {}).get("langgraph_node") or (parent.node if parent else "")
+        run = _Run(LLM, parent.graph if parent else "", node, str(model))
+        LLM_IN_FLIGHT.labels(run.graph, run.node, run.model).inc()
+        self._runs[run_id] = run
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        LLM_IN_FLIGHT.labels(run.graph, run.node, run.model).dec()
+        LLM_DURATION.labels(run.graph, run.node, run.model).observe(time.perf_counter() - run.start)
+        input_tokens, output_tokens = _token_usage(response)
+        if input_tokens:
+            LLM_TOKENS.labels(run.graph, run.node, run.model, "input").inc(input_tokens)
+        if output_tokens:
+            LLM_TOKENS.labels(run.graph, run.node, run.model, "output").inc(output_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        LLM_IN_FLIGHT.labels(run.graph, run.node, run.model).dec()
+        ERRORS.labels(run.graph, run.node, LLM, type(error).__name__).inc()
+
+
+def _token_usage(response: LLMResult) -> "tuple[int, int]":
+    """Token usage from message usage_metadata, falling back to the provider's llm_output"""
+    input_tokens = output_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+    if not (input_tokens or output_tokens) and response.llm_output:
+        usage = response.llm_output.get("token_usage") or {}
+        input_tokens = usage.get("prompt_tokens", 0)
+        output_tokens = usage.get("completion_tokens", 0)
+    return input_tokens, output_tokens
+
+
+metrics_handler = MetricsCallbackHandler()
+
+
+def render_metrics() -> "tuple[bytes, str]":
+    """Prometheus text exposition of the default registry and its content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
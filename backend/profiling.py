@@ -0,0 +1,301 @@
+"""
+On-demand profiling of graph runs
+
+When a request is slow, the metrics tell us which node was slow but not whether
+the time went to prompt building, Pydantic validation, the LangGraph scheduler or
+our own node code. RunProfiler wraps one graph run in a profiler and attributes
+what it sees to node names (time outside any node is reported as "[graph]", i.e.
+input/output handling and the scheduler):
+
+- sample   a background thread samples the stacks of the threads running this
+           graph every PROFILE_SAMPLE_INTERVAL_MS and writes a flamegraph-compatible
+           collapsed-stack file (``graph;node;frame;...;frame count``), usable with
+           flamegraph.pl, speedscope or inferno
+- cprofile deterministic cProfile, one profile per node task (so parallel Send tasks
+           in executor threads are covered too), merged into one .pstats file
+           (python -m pstats, snakeviz)
+
+Both modes also write a JSON summary with per-node wall time and samples or top
+functions. Artifacts go to PROFILE_DIR (default ./profiles) as
+``<timestamp>-<graph>-<id>.{collapsed,pstats,json}``.
+
+Profiling is switched on per request with the ``X-Profile: sample|cprofile``
+header (``X-Profile: 1`` picks sample), or for every run with
+GRAPH_PROFILING=sample|cprofile; PROFILE_HEADER=0 ignores the header. When it is
+off, profiler_for() returns None and the request path is unchanged.
+"""
+import cProfile
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from types import FrameType
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("sample", "cprofile")
+GRAPH_LABEL = "[graph]"
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000
+_ALWAYS = os.getenv("GRAPH_PROFILING", "off").lower()
+_HEADER_ENABLED = os.getenv("PROFILE_HEADER", "1") != "0"
+
+# Summaries of the most recent profiled runs, served by /api/profiles
+recent: Deque[Dict[str, Any]] = deque(maxlen=50)
+
+
+def requested_mode(header: Optional[str]) -> Optional[str]:
+    """Profiling mode for one run: the X-Profile header, else GRAPH_PROFILING; None when off"""
+    value = (header or "").strip().lower() if _HEADER_ENABLED else ""
+    if value in ("1", "true", "yes", "on"):
+        return "sample"
+    if value in PROFILE_MODES:
+        return value
+    return _ALWAYS if _ALWAYS in PROFILE_MODES else None
+
+
+def profiler_for(header: Optional[str], graph: str) -> Optional["RunProfiler"]:
+    mode = requested_mode(header)
+    return RunProfiler(mode, graph) if mode else None
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _is_worker_frame(frame: FrameType) -> bool:
+    # Executor plumbing below a node task: concurrent.futures and threading
+    filename = frame.f_code.co_filename
+    return filename.endswith(("concurrent/futures/thread.py", "threading.py"))
+
+
+class RunProfiler(BaseCallbackHandler):
+    """Profile one graph run and write its artifacts
+
+    Use as a context manager around the graph call and pass it in the run's
+    callbacks, so it sees which node each thread is executing::
+
+        profiler = RunProfiler("sample", "customer_support")
+        with profiler:
+            app.invoke(state, {"callbacks": [profiler]})
+    """
+
+    run_inline = True
+
+    def __init__(
+        self,
+        mode: str,
+        graph: str,
+        directory: str = PROFILE_DIR,
+        interval: float = PROFILE_SAMPLE_INTERVAL,
+    ) -> None:
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profiling mode {mode!r}, expected one of {PROFILE_MODES}")
+        self.mode = mode
+        self.graph = graph
+        self.directory = directory
+        self.interval = interval
+        self.run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{graph}-{uuid.uuid4().hex[:8]}"
+        self.summary: Optional[Dict[str, Any]] = None
+
+        self._lock = threading.Lock()
+        # thread id -> labels of the node runs active in that thread (innermost last)
+        self._stacks: Dict[int, List[str]] = {}
+        # node run id -> (thread id, label, start)
+        self._nodes: Dict[UUID, Tuple[int, str, float]] = {}
+        self._wall: Dict[str, List[float]] = {}
+        self._root_thread = 0
+        self._root_frame: Optional[FrameType] = None
+        self._start = 0.0
+
+        # sample mode
+        self._samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        # cprofile mode: active profilers per thread, and finished (label, profile) pairs
+        self._active: Dict[int, List[cProfile.Profile]] = {}
+        self._profiles: List[Tuple[str, cProfile.Profile]] = []
+
+    # ---------- run lifecycle ----------
+
+    def __enter__(self) -> "RunProfiler":
+        self._root_thread = threading.get_ident()
+        self._root_frame = sys._getframe(1)
+        self._stacks[self._root_thread] = [GRAPH_LABEL]
+        self._start = time.perf_counter()
+        if self.mode == "sample":
+            self._sampler = threading.Thread(target=self._sample_loop, name=f"profiler-{self.run_id}", daemon=True)
+            self._sampler.start()
+        else:
+            self._push_profile(self._root_thread, GRAPH_LABEL)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        wall_ms = (time.perf_counter() - self._start) * 1000
+        if self.mode == "sample":
+            self._stop.set()
+            self._sampler.join()
+        else:
+            self._pop_profile(self._root_thread)
+        self._stacks.pop(self._root_thread, None)
+        try:
+            self.summary = self._write(wall_ms)
+            recent.append(self.summary)
+        except OSError:
+            logger.exception("Could not write profile %s", self.run_id)
+
+    # ---------- node attribution (callbacks run inline in the node's thread) ----------
+
+    def on_chain_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        inputs: Any,
+        *,
+        run_id: UUID,
+        tags: Optional[List[str]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        if node is None or node != kwargs.get("name") or not any(tag.startswith("graph:step:") for tag in tags or ()):
+            return
+        thread = threading.get_ident()
+        self._nodes[run_id] = (thread, node, time.perf_counter())
+        self._stacks.setdefault(thread, []).append(node)
+        if self.mode == "cprofile":
+            self._push_profile(thread, node)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_node(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_node(run_id)
+
+    def _finish_node(self, run_id: UUID) -> None:
+        entry = self._nodes.pop(run_id, None)
+        if entry is None:
+            return
+        thread, node, start = entry
+        if self.mode == "cprofile":
+            self._pop_profile(thread)
+        stack = self._stacks.get(thread)
+        if stack:
+            stack.pop()
+            if not stack:
+                del self._stacks[thread]
+        with self._lock:
+            self._wall.setdefault(node, []).append((time.perf_counter() - start) * 1000)
+
+    # ---------- cprofile ----------
+
+    def _push_profile(self, thread: int, label: str) -> None:
+        # One profiler per thread can be active; pause the enclosing one until this node ends
+        active = self._active.setdefault(thread, [])
+        if active:
+            active[-1].disable()
+        profile = cProfile.Profile()
+        active.append(profile)
+        self._profiles.append((label, profile))
+        profile.enable()
+
+    def _pop_profile(self, thread: int) -> None:
+        active = self._active.get(thread)
+        if not active:
+            return
+        active.pop().disable()
+        if active:
+            active[-1].enable()
+        else:
+            del self._active[thread]
+
+    # ---------- sampling ----------
+
+    def _sample_loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread, stack in list(self._stacks.items()):
+                frame = frames.get(thread)
+                if frame is None or not stack:
+                    continue
+                self._samples[self._collapse(thread, stack[-1], frame)] += 1
+
+    def _collapse(self, thread: int, label: str, frame: Optional[FrameType]) -> Tuple[str, ...]:
+        frames = []
+        while frame is not None and frame is not self._root_frame:
+            frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()
+        # Drop only the executor plumbing at the bottom of the stack; a node waiting on a lock,
+        # Event or Future keeps its threading / concurrent.futures frames on top
+        start = 0
+        while start < len(frames) and _is_worker_frame(frames[start]):
+            start += 1
+        return (self.graph, label, *(_frame_label(f) for f in frames[start:]))
+
+    # ---------- artifacts ----------
+
+    def _write(self, wall_ms: float) -> Dict[str, Any]:
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, self.run_id)
+        nodes: Dict[str, Dict[str, Any]] = {
+            label: {"calls": len(times), "wall_ms": round(sum(times), 1)} for label, times in self._wall.items()
+        }
+        artifacts = []
+
+        if self.mode == "sample":
+            path = base + ".collapsed"
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in self._samples.most_common():
+                    f.write(f"{';'.join(stack)} {count}\n")
+            artifacts.append(path)
+            for stack, count in self._samples.items():
+                node = nodes.setdefault(stack[1], {"calls": 0, "wall_ms": None})
+                node["samples"] = node.get("samples", 0) + count
+        else:
+            path = base + ".pstats"
+            pstats.Stats(*(profile for _, profile in self._profiles)).dump_stats(path)
+            artifacts.append(path)
+            by_label: Dict[str, List[cProfile.Profile]] = {}
+            for label, profile in self._profiles:
+                by_label.setdefault(label, []).append(profile)
+            for label, profiles in by_label.items():
+                node = nodes.setdefault(label, {"calls": 0, "wall_ms": None})
+                node["top"] = _top_functions(pstats.Stats(*profiles))
+
+        summary = {
+            "id": self.run_id,
+            "graph": self.graph,
+            "mode": self.mode,
+            "wall_ms": round(wall_ms, 1),
+            "nodes": nodes,
+            "artifacts": artifacts + [base + ".json"],
+        }
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        return summary
+
+
+def _top_functions(stats: pstats.Stats, limit: int = 5) -> List[Dict[str, Any]]:
+    """Functions with the most own time"""
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return [
+        {
+            "function": f"{func} ({os.path.basename(filename)}:{line})",
+            "calls": calls,
+            "tottime_ms": round(tottime * 1000, 2),
+            "cumtime_ms": round(cumtime * 1000, 2),
+        }
+        for (filename, line, func), (_, calls, tottime, cumtime, _) in rows
+    ]
@@ -0,0 +1,401 @@
+"""
+Opt-in OpenTelemetry tracing for requests, graph runs, nodes, LLM and tool calls
+
+The Prometheus metrics tell us that p99 latency went up, not which request was
+slow or where its time went. With OTEL_TRACING set, every request becomes one
+trace:
+
+    POST /api/travel/plan                     (TracingMiddleware, SERVER span)
+    └── graph travel_planner                  (TracingCallbackHandler from here on)
+        ├── step 1
+        │   └── node plan_slots
+        └── step 2
+            ├── node create_section
+            │   └── chat Qwen/Qwen3-8B        (tokens, time to first token)
+            └── node create_section
+                └── chat Qwen/Qwen3-8B
+
+Subgraphs nest under the node that runs them, LangChain tool calls become
+``execute_tool <name>`` spans, and mcp-crypto-server/mcp_client.py traces its MCP
+tool calls and completions with get_tracer(). Incoming ``traceparent`` headers
+are honoured and the response carries ``X-Trace-Id``. The request span comes from
+FastAPI's built-in telemetry where the installed version has it, otherwise from
+TracingMiddleware.
+
+Spans are parented explicitly from the callback run tree, so parallel Send tasks
+in LangGraph's executor threads land in the right place; the graph span itself
+takes the caller's context, which run_in_threadpool, the idempotency task and
+the job pool (ContextThreadPoolExecutor) all carry over.
+
+OTEL_TRACING selects the exporter (the SDK is only imported when it is set):
+
+- off      (default) no tracing; handler is None and the middleware is not installed
+- otlp     OTLP/HTTP to OTEL_EXPORTER_OTLP_ENDPOINT (default http://localhost:4318),
+           e.g. a local Jaeger or OpenTelemetry Collector
+- file     one JSON span per line appended to OTEL_TRACES_FILE (default traces.jsonl),
+           for offline inspection
+- console  pretty-printed spans on stdout
+
+Requires opentelemetry-sdk (plus opentelemetry-exporter-otlp-proto-http for otlp).
+"""
+import importlib.util
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.metrics import _is_interrupt, _token_usage
+
+try:
+    from opentelemetry import propagate, trace
+    from opentelemetry.trace import Span, SpanKind, Status, StatusCode
+except ImportError:  # pragma: no cover - optional, tracing stays off
+    trace = None
+
+logger = logging.getLogger(__name__)
+
+TRACING_MODES = ("off", "otlp", "file", "console")
+TRACING = os.getenv("OTEL_TRACING", "off").lower()
+TRACES_FILE = os.getenv("OTEL_TRACES_FILE", "traces.jsonl")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "ai-assistant-api")
+# Newer FastAPI releases trace requests themselves once a tracer provider is installed
+FASTAPI_TELEMETRY = importlib.util.find_spec("fastapi.telemetry") is not None
+
+# Set by configure(); None while tracing is off
+handler: Optional["TracingCallbackHandler"] = None
+_provider: Any = None
+
+
+def configure(mode: str = TRACING) -> bool:
+    """Install the tracer provider and exporter for mode; returns whether tracing is on"""
+    global handler, _provider
+    if mode not in TRACING_MODES:
+        raise ValueError(f"Unknown OTEL_TRACING mode {mode!r}, expected one of {TRACING_MODES}")
+    if mode == "off":
+        return False
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError as e:
+        raise RuntimeError(f"OTEL_TRACING={mode} needs the opentelemetry-sdk package") from e
+
+    _provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+    _provider.add_span_processor(BatchSpanProcessor(_exporter(mode)))
+    trace.set_tracer_provider(_provider)
+    handler = TracingCallbackHandler(trace.get_tracer("langgraph"))
+    logger.info("OpenTelemetry tracing enabled (%s)", mode)
+    return True
+
+
+def _exporter(mode: str):
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    if mode == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError as e:
+            raise RuntimeError("OTEL_TRACING=otlp needs the opentelemetry-exporter-otlp-proto-http package") from e
+        return OTLPSpanExporter()
+    if mode == "file":
+        out = open(TRACES_FILE, "a", encoding="utf-8")
+        return ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n")
+    return ConsoleSpanExporter()
+
+
+def shutdown() -> None:
+    """Flush buffered spans; called when the server stops"""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+def get_tracer(name: str):
+    """Tracer for manual spans; without opentelemetry installed, a no-op tracer"""
+    return trace.get_tracer(name) if trace is not None else _NoopTracer()
+
+
+def set_attributes(attributes: Dict[str, Any]) -> None:
+    """Add attributes to the current span (the request span inside a handler)"""
+    if handler is not None:
+        trace.get_current_span().set_attributes(attributes)
+
+
+class _NoopSpan:
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+    def __getattr__(self, name: str):
+        return lambda *args, **kwargs: None
+
+
+class _NoopTracer:
+    def start_as_current_span(self, *args: Any, **kwargs: Any) -> _NoopSpan:
+        return _NoopSpan()
+
+
+# ---------- FastAPI requests ----------
+
+def _add_trace_id(send: Send) -> Send:
+    async def send_wrapper(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Called from inside the request, so the current span is the request span
+            trace_id = format(trace.get_current_span().get_span_context().trace_id, "032x")
+            message.setdefault("headers", []).append((b"x-trace-id", trace_id.encode("latin-1")))
+        await send(message)
+
+    return send_wrapper
+
+
+class TracingMiddleware:
+    """One SERVER span per HTTP request, continuing an incoming traceparent
+
+    FastAPI versions with built-in telemetry already open that span as soon as a
+    tracer provider is installed; with those the middleware only adds X-Trace-Id.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.tracer = trace.get_tracer("http")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if FASTAPI_TELEMETRY:
+            await self.app(scope, receive, _add_trace_id(send))
+            return
+        carrier = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        method = scope["method"]
+        with self.tracer.start_as_current_span(
+            f"{method} {scope['path']}",
+            context=propagate.extract(carrier),
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope["path"]},
+        ) as span:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            await self.app(scope, receive, _add_trace_id(send_wrapper))
+            # Name by route template once routing has run, so /api/jobs/{job_id} groups together
+            route = scope.get("route")
+            if route is not None and hasattr(route, "path"):
+                span.update_name(f"{method} {route.path}")
+                span.set_attribute("http.route", route.path)
+
+
+# ---------- graph runs ----------
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Turn LangGraph / LangChain run events into spans
+
+    Pass it in the run config next to the metrics handler; the root run name
+    becomes the graph span name.
+    """
+
+    run_inline = True
+
+    def __init__(self, tracer: Any) -> None:
+        self.tracer = tracer
+        # run id -> (span, owned); runs without a span of their own (prompt templates,
+        # runnable sequences) map to their nearest traced ancestor and are not ended here
+        self._runs: Dict[UUID, Tuple["Span", bool]] = {}
+        # graph run id -> (step, span) of the superstep currently executing
+        self._steps: Dict[UUID, Tuple[int, "Span"]] = {}
+        # LLM run id -> start time, until the first streamed token arrives
+        self._first_token: Dict[UUID, float] = {}
+        self._lock = threading.Lock()
+
+    def _parent_context(self, parent_run_id: Optional[UUID]):
+        entry = self._runs.get(parent_run_id) if parent_run_id else None
+        # No traced parent: take the caller's context (the request span, if any)
+        return trace.set_span_in_context(entry[0]) if entry else None
+
+    def on_chain_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        inputs: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        tags: Optional[List[str]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        name = kwargs.get("name") or "graph"
+        parent = self._runs.get(parent_run_id) if parent_run_id else None
+        if parent is None:
+            span = self.tracer.start_span(f"graph {name}", attributes={"langgraph.graph": name})
+            self._runs[run_id] = (span, True)
+            return
+
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node")
+        if node is None or node != name or not any(tag.startswith("graph:step:") for tag in tags or ()):
+            self._runs[run_id] = (parent[0], False)
+            return
+
+        step = metadata.get("langgraph_step", 0)
+        step_span = self._step_span(parent_run_id, step, parent[0])
+        span = self.tracer.start_span(
+            f"node {node}",
+            context=trace.set_span_in_context(step_span),
+            attributes={
+                "langgraph.node": node,
+                "langgraph.step": step,
+                "langgraph.task": metadata.get("langgraph_checkpoint_ns", ""),
+            },
+        )
+        self._runs[run_id] = (span, True)
+
+    def _step_span(self, graph_run_id: UUID, step: int, graph_span: "Span") -> "Span":
+        # Nodes of one superstep can start concurrently in different threads
+        with self._lock:
+            current = self._steps.get(graph_run_id)
+            if current is not None and current[0] == step:
+                return current[1]
+            if current is not None:
+                current[1].end()
+            span = self.tracer.start_span(
+                f"step {step}", context=trace.set_span_in_context(graph_span), attributes={"langgraph.step": step}
+            )
+            self._steps[graph_run_id] = (step, span)
+            return span
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, error)
+
+    def _finish(self, run_id: UUID, error: Optional[BaseException] = None) -> None:
+        entry = self._runs.pop(run_id, None)
+        with self._lock:
+            step = self._steps.pop(run_id, None)
+        if step is not None:
+            step[1].end()
+        if entry is None or not entry[1]:
+            return
+        span = entry[0]
+        if error is not None:
+            # interrupt() and Command(graph=PARENT) travel as exceptions but are not failures
+            if _is_interrupt(error):
+                span.set_attribute("langgraph.interrupted", True)
+            else:
+                span.record_exception(error)
+                span.set_status(Status(StatusCode.ERROR, f"{type(error).__name__}: {error}"))
+        span.end()
+
+    # ---------- LLM calls ----------
+
+    def on_chat_model_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        messages: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        self._start_llm(serialized, run_id, parent_run_id, kwargs)
+
+    def on_llm_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        prompts: List[str],
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        self._start_llm(serialized, run_id, parent_run_id, kwargs)
+
+    def _start_llm(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        run_id: UUID,
+        parent_run_id: Optional[UUID],
+        kwargs: Dict[str, Any],
+    ) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = str(
+            params.get("model")
+            or params.get("model_name")
+            or kwargs.get("name")
+            or (serialized or {}).get("name")
+            or "unknown"
+        )
+        attributes = {"gen_ai.operation.name": "chat", "gen_ai.request.model": model}
+        if params.get("max_tokens") is not None:
+            attributes["gen_ai.request.max_tokens"] = params["max_tokens"]
+        node = (kwargs.get("metadata") or {}).get("langgraph_node")
+        if node:
+            attributes["langgraph.node"] = node
+        span = self.tracer.start_span(
+            f"chat {model}", context=self._parent_context(parent_run_id), kind=SpanKind.CLIENT, attributes=attributes
+        )
+        self._runs[run_id] = (span, True)
+        self._first_token[run_id] = time.perf_counter()
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        start = self._first_token.pop(run_id, None)
+        entry = self._runs.get(run_id)
+        if start is None or entry is None:
+            return
+        entry[0].set_attribute("gen_ai.response.time_to_first_token", time.perf_counter() - start)
+        entry[0].add_event("first_token")
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        self._first_token.pop(run_id, None)
+        entry = self._runs.pop(run_id, None)
+        if entry is None:
+            return
+        span = entry[0]
+        input_tokens, output_tokens = _token_usage(response)
+        span.set_attributes({"gen_ai.usage.input_tokens": input_tokens, "gen_ai.usage.output_tokens": output_tokens})
+        model = (response.llm_output or {}).get("model_name")
+        if model:
+            span.set_attribute("gen_ai.response.model", model)
+        span.end()
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._first_token.pop(run_id, None)
+        self._finish(run_id, error)
+
+    # ---------- tools ----------
+
+    def on_tool_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        input_str: str,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or "tool"
+        span = self.tracer.start_span(
+            f"execute_tool {name}",
+            context=self._parent_context(parent_run_id),
+            attributes={"gen_ai.operation.name": "execute_tool", "gen_ai.tool.name": name},
+        )
+        self._runs[run_id] = (span, True)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, error)
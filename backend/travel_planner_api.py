@@ -1,21 +1,45 @@
 """
 Travel Planner API Adapter
 Adapts the LangGraph travel planner for API usage
+
+Two graph modes:
+- sequential: one long generation covering every interest (the original graph)
+- parallel: one short section per interest, generated concurrently with Send,
+  then merged into a single timed itinerary, so wall-clock time is bounded by the
+  slowest section instead of growing with the number of interests
 """
-from typing import Dict, List
+import operator
+from typing import Dict, List, Optional, Union
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
+from langgraph.graph.message import add_messages
+from langgraph.types import Send
 from typing import TypedDict, Annotated
 from dotenv import load_dotenv
 
+from hedging import maybe_hedged
+from lazy_model import lazy_chat_openai
+from model_profiles import profile_llm
+
 load_dotenv()
 
-llm = ChatOpenAI(model="Qwen/Qwen3-8B", temperature=0.7)
+# Built on first use so importing this module stays cheap.
+# Set LLM_HEDGING=1 to send a backup request when a call stalls past the recent p95 latency
+llm = lazy_chat_openai(model="Qwen/Qwen3-8B", temperature=0.7, wrap=maybe_hedged)
+# Per-interest sections in parallel mode: thinking off and a short output cap
+section_llm = profile_llm("section", wrap=maybe_hedged)
+
+GRAPH_MODES = ("sequential", "parallel")
+# Upper bound on sections generated at once. Each one is a concurrent gateway call, so keep
+# this small; the API also charges them to admission control (one slot per section)
+MAX_PARALLEL_SECTIONS = 4
+
 
 class PlannerState(TypedDict):
-    messages: Annotated[List[HumanMessage | AIMessage], "The messages in the conversation"]
+    # Nodes return only the messages they add; add_messages appends them to the history
+    messages: Annotated[List[HumanMessage | AIMessage], add_messages]
     city: str
     interests: List[str]
     itinerary: str
@@ -25,11 +49,11 @@ itinerary_prompt = ChatPromptTemplate.from_messages([
     ("human", "Create an itinerary for my day trip."),
 ])
 
-def process_inputs(state: PlannerState) -> PlannerState:
+def process_inputs(state: PlannerState) -> Dict:
     """Process the city and interests from the initial state"""
-    return state
+    return {}
 
-def create_itinerary(state: PlannerState) -> PlannerState:
+def create_itinerary(state: PlannerState) -> Dict:
     """Generate travel itinerary based on city and interests"""
     response = llm.invoke(
         itinerary_prompt.format_messages(
@@ -38,8 +62,7 @@ def create_itinerary(state: PlannerState) -> PlannerState:
         )
     )
     return {
-        **state,
-        "messages": state['messages'] + [AIMessage(content=response.content)],
+        "messages": [AIMessage(content=response.content)],
         "itinerary": response.content,
     }
 
@@ -53,13 +76,116 @@ workflow.add_edge("create_itinerary", END)
 
 app = workflow.compile()
 
-def generate_travel_plan(city: str, interests: List[str]) -> Dict[str, str]:
+
+# Parallel mode: plan time slots -> one section per interest (Send) -> merge into one itinerary
+DAY_START, DAY_END = 9 * 60, 21 * 60  # minutes after midnight
+# Interests that belong at a particular time of day; everything else keeps the user's order
+MIDDAY_INTERESTS = {"food", "美食", "dining", "restaurants"}
+EVENING_INTERESTS = {"nightlife", "夜生活", "bars", "music"}
+
+
+class ParallelPlannerState(PlannerState):
+    slots: List[Dict[str, str]]
+    # Each create_section task appends its section; operator.add merges them
+    sections: Annotated[List[Dict[str, str]], operator.add]
+
+
+class SectionState(TypedDict):
+    city: str
+    interest: str
+    index: int
+    start: str
+    end: str
+
+
+section_prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are a helpful travel assistant planning one part of a day trip to {city}. "
+               "This part is about {interest} and runs from {start} to {end}. "
+               "Give 2-3 bulleted recommendations with specific places, restaurants or activities "
+               "and a short practical tip. Do not add a title, an introduction or other parts of the day."),
+    ("human", "Plan the {interest} part of my day trip."),
+])
+
+
+def _format_time(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def unique_interests(interests: List[str]) -> List[str]:
+    """Stripped, non-blank interests without duplicates, in the user's order"""
+    return list(dict.fromkeys(i.strip() for i in interests if i.strip()))
+
+
+def plan_slots(state: ParallelPlannerState) -> Dict:
+    """Order the interests through the day and give each an equal time slot"""
+    interests = unique_interests(state["interests"])
+    evening = [i for i in interests if i.lower() in EVENING_INTERESTS]
+    midday = [i for i in interests if i.lower() in MIDDAY_INTERESTS]
+    others = [i for i in interests if i not in evening and i not in midday]
+    middle = len(others) // 2
+    ordered = others[:middle] + midday + others[middle:] + evening
+
+    length = (DAY_END - DAY_START) // max(1, len(ordered))
+    slots = []
+    for index, interest in enumerate(ordered):
+        start = DAY_START + index * length
+        slots.append({"interest": interest, "start": _format_time(start), "end": _format_time(start + length)})
+    return {"slots": slots}
+
+
+def route_sections(state: ParallelPlannerState) -> Union[List[Send], str]:
+    """Fan out one create_section task per interest (straight to merge_itinerary when there are none)"""
+    if not state["slots"]:
+        return "merge_itinerary"
+    return [
+        Send("create_section", {"city": state["city"], "index": index, **slot})
+        for index, slot in enumerate(state["slots"])
+    ]
+
+
+def create_section(state: SectionState) -> Dict:
+    """Generate the itinerary section for one interest"""
+    response = section_llm.invoke(section_prompt.format_messages(**state))
+    return {"sections": [{**state, "content": response.content.strip()}]}
+
+
+def merge_itinerary(state: ParallelPlannerState) -> Dict:
+    """Assemble the sections in slot order into one timed itinerary"""
+    parts = [f"**{state['city']} Day Trip Itinerary**"]
+    for section in sorted(state.get("sections", []), key=lambda s: s["index"]):
+        parts.append(f"**{section['start']} - {section['end']} · {section['interest'].title()}**\n{section['content']}")
+    itinerary = "\n\n".join(parts)
+    return {
+        "messages": [AIMessage(content=itinerary)],
+        "itinerary": itinerary,
+    }
+
+
+parallel_workflow = StateGraph(ParallelPlannerState)
+parallel_workflow.add_node("plan_slots", plan_slots)
+parallel_workflow.add_node("create_section", create_section)
+parallel_workflow.add_node("merge_itinerary", merge_itinerary)
+parallel_workflow.set_entry_point("plan_slots")
+parallel_workflow.add_conditional_edges("plan_slots", route_sections, ["create_section", "merge_itinerary"])
+parallel_workflow.add_edge("create_section", "merge_itinerary")
+parallel_workflow.add_edge("merge_itinerary", END)
+
+parallel_app = parallel_workflow.compile()
+
+def generate_travel_plan(
+    city: str,
+    interests: List[str],
+    config: Optional[RunnableConfig] = None,
+    mode: str = "sequential",
+) -> Dict[str, str]:
     """
     Generate a travel itinerary for the given city and interests.
     
     Args:
         city: The destination city
         interests: List of user interests (e.g., ['food', 'history', 'art'])
+        config: Optional run config, e.g. callbacks for metrics
+        mode: "sequential" (one generation) or "parallel" (one concurrent section per interest)
         
     Returns:
         Dict containing the city, interests, and generated itinerary
@@ -71,7 +197,14 @@ def generate_travel_plan(city: str, interests: List[str]) -> Dict[str, str]:
         "itinerary": "",
     }
     
-    result = app.invoke(state)
+    if mode not in GRAPH_MODES:
+        raise ValueError(f"Unknown mode {mode!r}, expected one of {GRAPH_MODES}")
+    graph = app
+    if mode == "parallel":
+        graph = parallel_app
+        sections = max(1, min(len(unique_interests(interests)), MAX_PARALLEL_SECTIONS))
+        config = {"max_concurrency": sections, **(config or {})}
+    result = graph.invoke(state, config)
     
     return {
         "city": result["city"],
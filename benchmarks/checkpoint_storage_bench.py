@@ -0,0 +1,90 @@
+"""
+检查点存储体积基准：完整快照 vs 增量存储 vs 增量存储 + 保留策略
+
+在仓库的示例图上重复运行，统计每个超步 (检查点) 平均占用的字节数：
+- 完整快照：每个检查点都序列化全部通道值（SQLiteSaver 增量存储之前的写法）
+- 增量存储：只写入版本变化的通道值
+- 增量存储 + 保留策略：压缩后只保留最近 keep_last 个检查点和中断点
+
+运行方式（在仓库根目录）：
+    python -m benchmarks.checkpoint_storage_bench --runs 50 --keep-last 5
+"""
+import argparse
+import os
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix="checkpoint_storage_bench_")
+os.environ.setdefault("CHECKPOINT_DB_PATH", os.path.join(_TMP_DIR, "examples.sqlite"))
+
+from langgraph.types import Command  # noqa: E402
+
+from human_in_the_loop import approval_graph_builder  # noqa: E402
+from sqlite_checkpointer import SQLiteSaver  # noqa: E402
+from update_subgraph_state import enhanced_main_graph, enhanced_subgraph  # noqa: E402
+
+
+def run_hierarchical(saver, runs):
+    graph = enhanced_main_graph.compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": "enhanced_hierarchical_thread"}}
+    for i in range(runs):
+        graph.invoke({"main_topic": f"天气分析任务 {i}", "user_location": "shanghai"}, config)
+
+
+def run_subgraph(saver, runs):
+    graph = enhanced_subgraph.compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": "enhanced_sub_thread"}}
+    for i in range(runs):
+        graph.invoke({"subtask_input": f"预处理: 任务 {i}", "city": "beijing", "temperature": 25}, config)
+
+
+def run_approval(saver, runs):
+    graph = approval_graph_builder.compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": "approval_thread"}}
+    graph.invoke({"topic": "产品推广活动"}, config)
+    for _ in range(runs):
+        graph.invoke(Command(resume={"user_response": "deny"}), config)
+    graph.invoke(Command(resume={"user_response": "approve"}), config)
+
+
+def full_snapshot_bytes(saver):
+    """按增量存储之前的方式（每个检查点携带全部通道值）估算体积"""
+    total = 0
+    for checkpoint_tuple in saver.list(None):
+        total += len(saver.serde.dumps_typed(checkpoint_tuple.checkpoint)[1])
+        total += len(saver.serde.dumps_typed(checkpoint_tuple.metadata)[1])
+    return total + saver.storage_stats()["write_bytes"]
+
+
+SCENARIOS = {
+    "enhanced_hierarchical_graph": run_hierarchical,
+    "compiled_enhanced_subgraph": run_subgraph,
+    "approval_graph": run_approval,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=50, help="每个示例图在同一线程上重复运行的次数")
+    parser.add_argument("--keep-last", type=int, default=5, help="保留策略：每个线程保留的最近检查点数")
+    args = parser.parse_args()
+
+    print(f"📁 临时数据库目录: {_TMP_DIR}")
+    print(f"{'graph':<30}{'steps':>7}{'full B/step':>14}{'delta B/step':>14}{'kept':>7}{'retained total B':>18}")
+    for name, run in SCENARIOS.items():
+        saver = SQLiteSaver(os.path.join(_TMP_DIR, f"{name}.sqlite"), keep_last=args.keep_last)
+        run(saver, args.runs)
+
+        stats = saver.storage_stats()
+        steps = stats["checkpoints"]
+        full = full_snapshot_bytes(saver)
+        saver.compact()
+        retained = saver.storage_stats()
+        print(
+            f"{name:<30}{steps:>7}{full / steps:>14.0f}{stats['total_bytes'] / steps:>14.0f}"
+            f"{retained['checkpoints']:>7}{retained['total_bytes']:>18}"
+        )
+        saver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+检查点存储基准测试：MemorySaver vs SQLiteSaver
+
+测量检查点写入 (put) 和读取 (get_tuple) 的延迟与吞吐，
+以及 human_in_the_loop 审批图端到端运行到中断点再 get_state 的耗时。
+
+运行方式（在仓库根目录）：
+    python -m benchmarks.checkpointer_bench --threads 200 --steps 10 --workers 8
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 导入示例模块前把它们的检查点库指向临时目录，避免污染工作目录
+_TMP_DIR = tempfile.mkdtemp(prefix="checkpoint_bench_")
+os.environ.setdefault("CHECKPOINT_DB_PATH", os.path.join(_TMP_DIR, "examples.sqlite"))
+
+from langgraph.checkpoint.base import empty_checkpoint  # noqa: E402
+from langgraph.checkpoint.base.id import uuid6  # noqa: E402
+from langgraph.checkpoint.memory import MemorySaver  # noqa: E402
+
+from human_in_the_loop import approval_graph_builder  # noqa: E402
+from sqlite_checkpointer import SQLiteSaver  # noqa: E402
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(name, samples, elapsed):
+    print(
+        f"  {name:<28} ops={len(samples):>6}  "
+        f"p50={percentile(samples, 50) * 1e6:>8.1f}µs  "
+        f"p99={percentile(samples, 99) * 1e6:>8.1f}µs  "
+        f"mean={statistics.fmean(samples) * 1e6:>8.1f}µs  "
+        f"throughput={len(samples) / elapsed:>9.0f} ops/s"
+    )
+
+
+def make_savers():
+    return {
+        "MemorySaver": MemorySaver(),
+        "SQLiteSaver(batch=1)": SQLiteSaver(os.path.join(_TMP_DIR, "batch1.sqlite"), batch_size=1),
+        "SQLiteSaver(batch=256)": SQLiteSaver(os.path.join(_TMP_DIR, "batch256.sqlite")),
+    }
+
+
+def run_thread_steps(saver, thread_id, steps, payload):
+    """模拟一个线程连续 steps 个超步的检查点写入，返回每次 put 的延迟"""
+    latencies = []
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    version = None
+    for step in range(steps):
+        checkpoint = empty_checkpoint()
+        checkpoint["id"] = str(uuid6(clock_seq=step))
+        version = saver.get_next_version(version, None)
+        checkpoint["channel_values"] = {"payload": payload, "step": step}
+        checkpoint["channel_versions"] = {"payload": version, "step": version}
+        start = time.perf_counter()
+        config = saver.put(config, checkpoint, {"source": "loop", "step": step}, {"payload": version, "step": version})
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_put_get(saver, threads, steps, workers, payload):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda i: run_thread_steps(saver, f"thread-{i}", steps, payload), range(threads))
+        put_latencies = [lat for thread_latencies in results for lat in thread_latencies]
+    if isinstance(saver, SQLiteSaver):
+        saver.flush()  # 写吞吐按全部落盘计算
+    put_elapsed = time.perf_counter() - start
+    report("put", put_latencies, put_elapsed)
+
+    get_latencies = []
+    start = time.perf_counter()
+    for i in range(threads):
+        t0 = time.perf_counter()
+        saver.get_tuple({"configurable": {"thread_id": f"thread-{i}", "checkpoint_ns": ""}})
+        get_latencies.append(time.perf_counter() - t0)
+    report("get_tuple (latest)", get_latencies, time.perf_counter() - start)
+
+
+def bench_approval_graph(saver, threads, workers):
+    graph = approval_graph_builder.compile(checkpointer=saver)
+
+    def run(i):
+        config = {"configurable": {"thread_id": f"approval-{i}"}}
+        t0 = time.perf_counter()
+        graph.invoke({"topic": f"活动 {i}"}, config)
+        run_latency = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        graph.get_state(config)
+        return run_latency, time.perf_counter() - t0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(run, range(threads)))
+    elapsed = time.perf_counter() - start
+    report("approval run -> interrupt", [r[0] for r in results], elapsed)
+    report("approval get_state", [r[1] for r in results], elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=200, help="模拟的会话线程数")
+    parser.add_argument("--steps", type=int, default=10, help="每个线程的超步数")
+    parser.add_argument("--workers", type=int, default=8, help="并发写入的工作线程数")
+    parser.add_argument("--payload-bytes", type=int, default=2048, help="每个检查点的状态大小")
+    args = parser.parse_args()
+
+    payload = "x" * args.payload_bytes
+    print(f"📁 临时数据库目录: {_TMP_DIR}")
+    for name, saver in make_savers().items():
+        print(f"\n=== {name} ===")
+        bench_put_get(saver, args.threads, args.steps, args.workers, payload)
+        bench_approval_graph(saver, args.threads, args.workers)
+        if isinstance(saver, SQLiteSaver):
+            saver.close()
+
+
+if __name__ == "__main__":
+    main()
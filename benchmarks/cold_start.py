@@ -0,0 +1,134 @@
+"""
+后端冷启动基准：在全新的子进程里测量导入、启动和第一次请求的耗时
+
+每次测量启动一个新的 Python 进程（没有任何模块缓存），依次记录：
+- import_ms       import backend.main 的耗时（决定进程多久能开始监听端口）
+- startup_ms      应用启动 (lifespan) 的耗时
+- first_ms        启动后第一次 POST /api/chat 的延迟
+- second_ms       第二次请求的延迟（稳态参考）
+- ready_ms        从进程开始导入到第一次请求返回的总耗时
+
+按 GRAPH_WARMUP 的三种模式分别测量：
+    lazy        第一次请求时才编译图、创建模型
+    background  启动后在后台线程预热（--gap 模拟健康检查到第一个真实请求之间的间隔）
+    eager       启动时同步预热完再开始服务
+
+LLM 请求发往本地模拟服务（零延迟），结果里只剩框架和应用自身的开销。
+
+运行方式（在仓库根目录）：
+    python -m benchmarks.cold_start --repeat 5 --gap 0.5
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+import backend.main as main
+import_ms = (time.perf_counter() - start) * 1000
+
+from fastapi.testclient import TestClient
+
+gap = float(sys.argv[1])
+body = {"query": "My internet connection keeps dropping. Can you help?"}
+t0 = time.perf_counter()
+with TestClient(main.api) as client:
+    startup_ms = (time.perf_counter() - t0) * 1000
+    time.sleep(gap)
+    t1 = time.perf_counter()
+    first = client.post("/api/chat", json=body)
+    first_ms = (time.perf_counter() - t1) * 1000
+    t2 = time.perf_counter()
+    second = client.post("/api/chat", json=body)
+    second_ms = (time.perf_counter() - t2) * 1000
+    graphs = client.get("/api/graphs").json()
+assert first.status_code == second.status_code == 200, (first.text, second.text)
+print(json.dumps({
+    "import_ms": import_ms,
+    "startup_ms": startup_ms,
+    "first_ms": first_ms,
+    "second_ms": second_ms,
+    "ready_ms": (t1 - start) * 1000 - gap * 1000 + first_ms,
+    "graph_load_ms": graphs["graphs"]["customer_support"]["load_ms"],
+}))
+"""
+
+COLUMNS = ("import_ms", "startup_ms", "first_ms", "second_ms", "ready_ms", "graph_load_ms")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_mock_server(port: int, *options: str) -> subprocess.Popen:
+    """启动模拟服务子进程并等待端口可用；默认零延迟、立即返回"""
+    options = options or ("--latency", "fixed:0", "--tokens-per-second", "0")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mock_openai_server", "--port", str(port), *options],
+        cwd=ROOT,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("模拟服务没有在 30 秒内启动")
+
+
+def run_child(mode: str, gap: float, port: int) -> Dict[str, float]:
+    env = {
+        **os.environ,
+        "GRAPH_WARMUP": mode,
+        "NODE_CACHE": "off",  # 第二次请求的查询相同，不让节点缓存影响稳态参考值
+        "OPENAI_API_BASE": f"http://127.0.0.1:{port}/v1",
+        "OPENAI_API_KEY": "mock",
+    }
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, str(gap)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["lazy", "background", "eager"])
+    parser.add_argument("--repeat", type=int, default=5, help="每种模式启动的进程数，报告中位数")
+    parser.add_argument("--gap", type=float, default=0.0, help="启动完成到第一次请求之间等待的秒数")
+    parser.add_argument("--json", dest="json_path", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_mock_server(port)
+    results: Dict[str, Dict[str, float]] = {}
+    try:
+        print(f"{'mode':<12}" + "".join(f"{c:>15}" for c in COLUMNS))
+        for mode in args.modes:
+            samples: List[Dict[str, float]] = [run_child(mode, args.gap, port) for _ in range(args.repeat)]
+            results[mode] = {c: statistics.median(s[c] or 0.0 for s in samples) for c in COLUMNS}
+            print(f"{mode:<12}" + "".join(f"{results[mode][c]:>15.0f}" for c in COLUMNS))
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+图框架开销基准：用桩模型、无 I/O 运行仓库里所有示例图，测量 LangGraph 本身的开销
+
+覆盖的图形态：
+- travel_planner       线性图 (backend/travel_planner_api.py)
+- support_router       条件路由 (customer_support_agent_langgraph.py)
+- mapreduce            Send 动态扇出 (mapreduce.py)
+- checkpointed_subgraph 带检查点的父子图 (update_subgraph_state.py，使用内存检查点)
+- retrying_nodes       带 RetryPolicy 的节点 (node.py，退避时间置 0，故障按固定种子注入)
+
+对每个图测量：单次运行延迟 (p50/p99)、超步数、每个超步的平均开销、单次运行的内存分配峰值；
+另外测量延迟随状态大小和扇出宽度的变化。结果写入 JSON，--compare 与之前的结果对比，
+超过容忍度的回归以非零退出码返回，便于在升级依赖或修改图结构时发现性能回退。
+
+运行方式（在仓库根目录）：
+    python -m benchmarks.graph_overhead --runs 200 --output graph_overhead.json
+    python -m benchmarks.graph_overhead --compare graph_overhead.json --tolerance 0.2
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from importlib.metadata import version
+from typing import Any, Dict, List
+
+# 导入示例模块前：桩模型不需要真实密钥，检查点库指向临时目录
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ.setdefault("CHECKPOINT_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="graph_overhead_"), "examples.sqlite"))
+# 重复运行同样的输入会命中节点缓存、跳过节点，这里测的是节点真正执行时的开销
+os.environ.setdefault("NODE_CACHE", "off")
+
+from langchain_core.callbacks import BaseCallbackHandler  # noqa: E402
+from langchain_core.language_models.fake_chat_models import FakeListChatModel  # noqa: E402
+from langchain_core.messages import HumanMessage  # noqa: E402
+from langgraph.checkpoint.memory import InMemorySaver  # noqa: E402
+from langgraph.types import RetryPolicy  # noqa: E402
+
+with contextlib.redirect_stdout(io.StringIO()):  # 示例模块在构建图时会打印说明
+    import backend.travel_planner_api as travel_planner  # noqa: E402
+    import customer_support_agent_langgraph as customer_support  # noqa: E402
+    import mapreduce  # noqa: E402
+    import node as retry_example  # noqa: E402
+    import update_subgraph_state  # noqa: E402
+
+# 桩模型：固定回复，没有网络 I/O
+travel_planner.llm = FakeListChatModel(responses=["- 09:00 museum\n- 12:00 lunch\n- 15:00 park"])
+customer_support.classifier_llm = FakeListChatModel(responses=["Technical", "Neutral"])
+customer_support.llm = FakeListChatModel(responses=["Please restart your router."])
+customer_support.TRIAGE_LOCAL = False  # 保持每次运行都走三个 LLM 节点，结果与之前可比
+# node.py 的节点经过共享限流器和熔断器，这里直接调用模拟组件，只测图本身和重试的开销
+retry_example.guarded_db_run = retry_example.db.run
+retry_example.guarded_model_invoke = retry_example.model.invoke
+
+
+class StepCounter(BaseCallbackHandler):
+    """统计一次运行的超步数（节点元数据里最大的 langgraph_step）"""
+
+    run_inline = True
+
+    def __init__(self):
+        self.max_step = 0
+
+    def on_chain_start(self, serialized, inputs, *, metadata=None, **kwargs):
+        self.max_step = max(self.max_step, (metadata or {}).get("langgraph_step", 0))
+
+
+def zero_backoff_retry_graph():
+    """node.py 的图，保留重试次数和重试条件，退避时间置 0"""
+    from langgraph.graph import StateGraph
+
+    builder = StateGraph(retry_example.AgentState)
+    for name, spec in retry_example.builder.nodes.items():
+        # RetryPolicy 本身是 NamedTuple，单个策略和策略序列要分开判断
+        policies = [spec.retry_policy] if isinstance(spec.retry_policy, RetryPolicy) else spec.retry_policy or []
+        builder.add_node(
+            name,
+            spec.runnable,
+            retry_policy=[p._replace(initial_interval=0.0, max_interval=0.0, jitter=False) for p in policies] or None,
+        )
+    for start, end in retry_example.builder.edges:
+        builder.add_edge(start, end)
+    return builder.compile()
+
+
+def make_cases(state_size: int = 0, fan_out: int = 4) -> Dict[str, Dict[str, Any]]:
+    """每个场景：graph、生成输入的函数、config、每次运行前的重置函数"""
+    payload = "x" * state_size
+    retry_graph = zero_backoff_retry_graph()
+    checkpointed = update_subgraph_state.build_enhanced_main_graph().compile(checkpointer=InMemorySaver())
+    run_counter = iter(range(10**9))
+
+    def reset_retry_mocks():
+        retry_example.db.call_count = 0  # 数据库前 2 次调用失败
+        random.seed(7)  # 模型按固定种子失败
+
+    return {
+        "travel_planner": {
+            "graph": travel_planner.app,
+            "input": lambda: {
+                "messages": [HumanMessage(content=f"Plan a trip to Hangzhou {payload}")],
+                "city": "Hangzhou",
+                "interests": ["food", "history"],
+                "itinerary": "",
+            },
+        },
+        "support_router": {
+            "graph": customer_support.app,
+            "input": lambda: {"query": f"My internet connection keeps dropping. {payload}"},
+        },
+        "mapreduce": {
+            "graph": mapreduce.mapreduce_graph,
+            "input": lambda: {
+                "large_input_data": [doc + payload for doc in mapreduce.large_documents] * max(1, fan_out // 4),
+                "sub_datasets": [],
+                "intermediate_results": [],
+                "final_result": {},
+                "num_sub_tasks": fan_out,
+            },
+        },
+        "checkpointed_subgraph": {
+            "graph": checkpointed,
+            "input": lambda: {"main_topic": f"天气分析任务 {payload}", "user_location": "shanghai"},
+            # 每次运行使用新线程，避免检查点历史随运行次数增长
+            "config": lambda: {"configurable": {"thread_id": f"bench-{next(run_counter)}"}},
+        },
+        "retrying_nodes": {
+            "graph": retry_graph,
+            "input": lambda: {"messages": [HumanMessage(content=payload)] if payload else []},
+            "reset": reset_retry_mocks,
+        },
+    }
+
+
+def run_once(case: Dict[str, Any], callbacks=None) -> None:
+    config = case["config"]() if "config" in case else {}
+    if callbacks:
+        config = {**config, "callbacks": callbacks}
+    if "reset" in case:
+        case["reset"]()
+    case["graph"].invoke(case["input"](), config)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def measure(case: Dict[str, Any], runs: int, warmup: int) -> Dict[str, float]:
+    with contextlib.redirect_stdout(io.StringIO()) as sink:
+        for _ in range(warmup):
+            run_once(case)
+
+        counter = StepCounter()
+        run_once(case, [counter])
+
+        tracemalloc.start()
+        run_once(case)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        latencies = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            run_once(case)
+            latencies.append(time.perf_counter() - start)
+            sink.seek(0)
+            sink.truncate()
+
+    mean = statistics.fmean(latencies)
+    steps = max(counter.max_step, 1)
+    return {
+        "supersteps": steps,
+        "p50_us": percentile(latencies, 50) * 1e6,
+        "p99_us": percentile(latencies, 99) * 1e6,
+        "mean_us": mean * 1e6,
+        "per_superstep_us": mean / steps * 1e6,
+        "peak_alloc_kb": peak / 1024,
+    }
+
+
+def run_suite(args) -> Dict[str, Any]:
+    results: Dict[str, Any] = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "langgraph": version("langgraph"),
+            "langchain_core": version("langchain-core"),
+            "runs": args.runs,
+        },
+        "graphs": {},
+        "state_size": {},
+        "fan_out": {},
+    }
+
+    print(f"{'graph':<24}{'steps':>6}{'p50 µs':>10}{'p99 µs':>10}{'µs/step':>10}{'peak KB':>10}")
+    for name, case in make_cases().items():
+        row = measure(case, args.runs, args.warmup)
+        results["graphs"][name] = row
+        print(
+            f"{name:<24}{row['supersteps']:>6}{row['p50_us']:>10.0f}{row['p99_us']:>10.0f}"
+            f"{row['per_superstep_us']:>10.0f}{row['peak_alloc_kb']:>10.1f}"
+        )
+
+    print("\n状态大小 (字节) 对单次运行延迟的影响 (p50 µs / peak KB)")
+    for size in args.state_sizes:
+        cases = make_cases(state_size=size)
+        results["state_size"][str(size)] = {
+            name: measure(cases[name], max(10, args.runs // 4), args.warmup)
+            for name in ("travel_planner", "support_router", "checkpointed_subgraph")
+        }
+        print(f"  {size:>8}: " + "  ".join(
+            f"{name}={row['p50_us']:.0f}/{row['peak_alloc_kb']:.0f}"
+            for name, row in results["state_size"][str(size)].items()
+        ))
+
+    print("\nSend 扇出宽度对 mapreduce 的影响")
+    for width in args.fan_outs:
+        row = measure(make_cases(fan_out=width)["mapreduce"], max(10, args.runs // 4), args.warmup)
+        results["fan_out"][str(width)] = row
+        print(f"  width={width:>4}: p50={row['p50_us']:>8.0f}µs  per_task={row['p50_us'] / width:>6.0f}µs  peak={row['peak_alloc_kb']:.0f}KB")
+    return results
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """对比 p50 延迟和内存峰值，返回超过容忍度的回归"""
+    regressions = []
+
+    def walk(cur: Dict[str, Any], base: Dict[str, Any], path: str):
+        for key, value in cur.items():
+            if key not in base:
+                continue
+            if isinstance(value, dict):
+                walk(value, base[key], f"{path}/{key}")
+            elif key in ("p50_us", "peak_alloc_kb") and base[key] > 0 and value > base[key] * (1 + tolerance):
+                regressions.append(f"{path}/{key}: {base[key]:.1f} -> {value:.1f} (+{value / base[key] - 1:.0%})")
+
+    for section in ("graphs", "state_size", "fan_out"):
+        walk(current.get(section, {}), baseline.get(section, {}), section)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=200, help="每个场景计时的运行次数")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--state-sizes", type=int, nargs="+", default=[0, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--fan-outs", type=int, nargs="+", default=[4, 16, 64, 256])
+    parser.add_argument("--output", help="结果 JSON 路径")
+    parser.add_argument("--compare", help="与之前的结果 JSON 对比")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的相对回归比例")
+    args = parser.parse_args()
+
+    results = run_suite(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 结果已写入 {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n⚠️ 超过 {args.tolerance:.0%} 的回归:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\n✅ 与 {args.compare} 相比没有超过 {args.tolerance:.0%} 的回归")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+对冲请求基准：长尾延迟的模拟模型，对比不对冲 / 对冲 (p95) 的延迟分布和额外请求占比
+
+模拟模型的延迟是重尾分布：大多数调用 ~base 毫秒，tail_prob 的调用额外停顿 Pareto 分布的时间，
+和真实模型网关偶发卡顿的形态相近。
+
+运行方式（在仓库根目录）：
+    python -m benchmarks.hedging_bench --calls 2000 --concurrency 32
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable
+
+from hedging import HedgedRunnable
+
+
+class HeavyTailModel(Runnable):
+    """延迟重尾分布的本地模拟模型"""
+
+    def __init__(self, base_ms: float, tail_prob: float, tail_scale_ms: float, alpha: float = 1.5):
+        self.base_ms = base_ms
+        self.tail_prob = tail_prob
+        self.tail_scale_ms = tail_scale_ms
+        self.alpha = alpha
+        self.calls = 0
+
+    def sample_latency(self) -> float:
+        latency = random.gauss(self.base_ms, self.base_ms * 0.1)
+        if random.random() < self.tail_prob:
+            latency += self.tail_scale_ms * random.paretovariate(self.alpha)
+        return max(1.0, latency) / 1000
+
+    def _response(self) -> AIMessage:
+        return AIMessage(
+            content="Technical",
+            usage_metadata={"input_tokens": 60, "output_tokens": 2, "total_tokens": 62},
+        )
+
+    def invoke(self, input, config=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.sample_latency())
+        return self._response()
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.sample_latency())
+        return self._response()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(name, samples, model, hedged=None):
+    line = (
+        f"  {name:<22} p50={percentile(samples, 50) * 1000:>7.1f}ms  "
+        f"p95={percentile(samples, 95) * 1000:>7.1f}ms  "
+        f"p99={percentile(samples, 99) * 1000:>7.1f}ms  "
+        f"mean={statistics.fmean(samples) * 1000:>7.1f}ms  "
+        f"upstream calls={model.calls}"  # 包括被取消的落后请求
+    )
+    if hedged is not None:
+        stats = hedged.stats()
+        line += (
+            f"  hedge_rate={stats['hedge_rate']:.1%}  hedge_wins={stats['hedge_wins']}"
+            f"  delay={stats['hedge_delay_ms']}ms  extra_input_tokens={stats['extra_input_tokens']}"
+        )
+    print(line)
+
+
+def run_sync(runnable, calls, concurrency):
+    def one(_):
+        t0 = time.perf_counter()
+        runnable.invoke("Categorize: my internet keeps dropping")
+        return time.perf_counter() - t0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, range(calls)))
+
+
+async def run_async(runnable, calls, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            t0 = time.perf_counter()
+            await runnable.ainvoke("Categorize: my internet keeps dropping")
+            return time.perf_counter() - t0
+
+    return await asyncio.gather(*(one() for _ in range(calls)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--base-ms", type=float, default=40.0, help="常规调用的延迟")
+    parser.add_argument("--tail-prob", type=float, default=0.04, help="发生长尾停顿的概率")
+    parser.add_argument("--tail-scale-ms", type=float, default=400.0, help="长尾停顿的 Pareto 尺度")
+    parser.add_argument("--percentile", type=float, default=95.0, help="触发对冲的延迟分位数")
+    parser.add_argument("--max-hedge-rate", type=float, default=0.1, help="对冲请求占比上限")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    def make_model():
+        return HeavyTailModel(args.base_ms, args.tail_prob, args.tail_scale_ms)
+
+    def make_hedged(model):
+        return HedgedRunnable(model, percentile=args.percentile, max_hedge_rate=args.max_hedge_rate)
+
+    print("=== 同步 invoke (线程池并发) ===")
+    random.seed(args.seed)
+    model = make_model()
+    report("baseline", run_sync(model, args.calls, args.concurrency), model)
+    random.seed(args.seed)
+    model = make_model()
+    hedged = make_hedged(model)
+    report("hedged", run_sync(hedged, args.calls, args.concurrency), model, hedged)
+
+    print("=== 异步 ainvoke (取消落后请求) ===")
+    random.seed(args.seed)
+    model = make_model()
+    report("baseline", asyncio.run(run_async(model, args.calls, args.concurrency)), model)
+    random.seed(args.seed)
+    model = make_model()
+    hedged = make_hedged(model)
+    report("hedged", asyncio.run(run_async(hedged, args.calls, args.concurrency)), model, hedged)
+
+
+if __name__ == "__main__":
+    main()
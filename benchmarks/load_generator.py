@@ -0,0 +1,186 @@
+"""
+异步压测工具：按目标 RPS 开环发送请求，报告吞吐、延迟分位数和错误率
+
+场景：
+    chat    POST /api/chat（客服工作流）
+    travel  POST /api/travel/plan（旅游规划工作流）
+    stream  流式接口：默认直接压 --stream-url 指向的 OpenAI 兼容流式接口（例如模拟服务），
+            额外统计首 token 时间 (TTFT)
+
+开环发送：请求按泊松过程（或固定间隔）准时发出，不等待前一个请求返回，
+服务变慢时排队延迟会真实地反映在结果里，而不是被压测端自己的并发限制掩盖。
+
+运行方式（在仓库根目录，先启动模拟服务和后端，见 benchmarks/mock_openai_server.py）：
+    python -m benchmarks.load_generator --base-url http://127.0.0.1:8000 --rps 20 --duration 30 \\
+        --mix chat=3,travel=1,stream=1 --stream-url http://127.0.0.1:9000/v1/chat/completions
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+CHAT_QUERIES = [
+    "My internet connection keeps dropping. Can you help?",
+    "Where can I find my receipt?",
+    "What are your business hours?",
+    "I was charged twice for my subscription, this is unacceptable!",
+    "Thanks, the new app version works great",
+]
+TRAVEL_REQUESTS = [
+    {"city": "Beijing", "interests": ["history", "food"]},
+    {"city": "Shanghai", "interests": ["art", "shopping", "nightlife"]},
+    {"city": "Chengdu", "interests": ["food", "nature"]},
+]
+
+
+class Result:
+    __slots__ = ("scenario", "latency", "ttft", "status", "error")
+
+    def __init__(self, scenario: str, latency: float, status: int, ttft: Optional[float] = None, error: str = ""):
+        self.scenario = scenario
+        self.latency = latency
+        self.ttft = ttft
+        self.status = status
+        self.error = error
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_chat(client: httpx.AsyncClient, args) -> Result:
+    start = time.perf_counter()
+    response = await client.post(f"{args.base_url}/api/chat", json={"query": random.choice(CHAT_QUERIES)})
+    return Result("chat", time.perf_counter() - start, response.status_code)
+
+
+async def run_travel(client: httpx.AsyncClient, args) -> Result:
+    start = time.perf_counter()
+    response = await client.post(f"{args.base_url}/api/travel/plan", json=random.choice(TRAVEL_REQUESTS))
+    return Result("travel", time.perf_counter() - start, response.status_code)
+
+
+async def run_stream(client: httpx.AsyncClient, args) -> Result:
+    body = {
+        "model": "mock-model",
+        "stream": True,
+        "messages": [{"role": "user", "content": "Create a day trip itinerary for Hangzhou."}],
+    }
+    start = time.perf_counter()
+    ttft = None
+    async with client.stream("POST", args.stream_url, json=body) as response:
+        async for line in response.aiter_lines():
+            if not line.startswith("data: ") or line == "data: [DONE]":
+                continue
+            if ttft is None and (json.loads(line[6:]).get("choices") or [{}])[0].get("delta", {}).get("content"):
+                ttft = time.perf_counter() - start
+    return Result("stream", time.perf_counter() - start, response.status_code, ttft)
+
+
+SCENARIOS = {"chat": run_chat, "travel": run_travel, "stream": run_stream}
+
+
+async def guarded(scenario: str, client: httpx.AsyncClient, args) -> Result:
+    start = time.perf_counter()
+    try:
+        return await SCENARIOS[scenario](client, args)
+    except Exception as exc:  # 超时、连接失败等都计入错误
+        return Result(scenario, time.perf_counter() - start, 0, error=type(exc).__name__)
+
+
+async def generate_load(args) -> Tuple[List[Result], float]:
+    mix = {}
+    for item in args.mix.split(","):
+        name, _, weight = item.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    names, weights = list(mix), list(mix.values())
+
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        tasks = []
+        start = time.perf_counter()
+        next_at = start
+        while next_at - start < args.duration:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            scenario = random.choices(names, weights)[0]
+            tasks.append(asyncio.create_task(guarded(scenario, client, args)))
+            interval = 1 / args.rps
+            next_at += random.expovariate(1 / interval) if args.arrival == "poisson" else interval
+        results = await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def report(results: List[Result], elapsed: float) -> Dict[str, Dict[str, float]]:
+    by_scenario: Dict[str, List[Result]] = defaultdict(list)
+    for result in results:
+        by_scenario[result.scenario].append(result)
+    by_scenario["all"] = list(results)
+
+    summary = {}
+    print(f"{'scenario':<10}{'sent':>7}{'ok/s':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ttft p50':>10}{'errors':>9}")
+    for scenario, items in by_scenario.items():
+        ok = [r for r in items if 200 <= r.status < 300]
+        latencies = [r.latency for r in ok] or [0.0]
+        ttfts = [r.ttft for r in ok if r.ttft is not None]
+        row = {
+            "sent": len(items),
+            "throughput": len(ok) / elapsed,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "mean_ms": statistics.fmean(latencies) * 1000,
+            "ttft_p50_ms": percentile(ttfts, 50) * 1000 if ttfts else None,
+            "error_rate": 1 - len(ok) / len(items) if items else 0.0,
+        }
+        summary[scenario] = row
+        ttft = f"{row['ttft_p50_ms']:>10.1f}" if row["ttft_p50_ms"] is not None else f"{'-':>10}"
+        print(
+            f"{scenario:<10}{row['sent']:>7}{row['throughput']:>8.1f}{row['p50_ms']:>10.1f}"
+            f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{ttft}{row['error_rate']:>9.1%}"
+        )
+
+    errors = defaultdict(int)
+    for result in results:
+        if not 200 <= result.status < 300:
+            errors[result.error or f"HTTP {result.status}"] += 1
+    if errors:
+        print("errors:", dict(errors))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="后端地址")
+    parser.add_argument("--stream-url", default="http://127.0.0.1:9000/v1/chat/completions", help="流式接口地址")
+    parser.add_argument("--rps", type=float, default=10.0, help="目标每秒请求数")
+    parser.add_argument("--duration", type=float, default=30.0, help="发送请求的秒数")
+    parser.add_argument("--mix", default="chat=3,travel=1", help="场景权重，例如 chat=3,travel=1,stream=1")
+    parser.add_argument("--arrival", choices=["poisson", "constant"], default="poisson", help="请求到达过程")
+    parser.add_argument("--timeout", type=float, default=60.0, help="单个请求超时秒数")
+    parser.add_argument("--max-connections", type=int, default=1000)
+    parser.add_argument("--json", dest="json_path", help="把结果写入 JSON 文件，便于对比不同版本")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    print(f"🚀 {args.rps} rps × {args.duration}s, mix={args.mix}, arrival={args.arrival}")
+    results, elapsed = asyncio.run(generate_load(args))
+    summary = report(results, elapsed)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "elapsed": elapsed, "summary": summary}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
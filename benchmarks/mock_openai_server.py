@@ -0,0 +1,216 @@
+"""
+本地 OpenAI 兼容的模拟聊天服务，用于离线压测和容量规划
+
+实现 POST /v1/chat/completions（普通 JSON 和 stream=true 的 SSE 流式返回）以及 GET /v1/models：
+- 延迟分布可配置：首 token 延迟按分布采样，之后按 --tokens-per-second 的速率生成 token
+- 错误注入：按比例返回 500 或 429 (带 Retry-After)
+- 预置输出：识别客服分类 / 情感分析的提示词，返回固定的类别和情感标签，
+  让图的路由逻辑和真实模型一样走到各个分支；其他请求返回指定长度的文本，
+  旅行行程请求按兴趣个数成倍增长（真实模型为每个兴趣都要写一段）
+- 思考模式：--thinking-tokens N 时模拟 Qwen3 默认的思考输出，先生成 N 个 token 的 <think> 块，
+  请求里 chat_template_kwargs.enable_thinking=false 时跳过；max_tokens 截断包括思考在内的全部输出
+- 统计：GET /stats 返回请求数、错误数和生成的 token 数
+
+延迟分布写法：
+    fixed:0.2               固定 0.2 秒
+    normal:0.3,0.05         正态分布 (均值, 标准差)
+    lognormal:-1.5,0.6      对数正态分布 (mu, sigma)，单位秒
+    pareto:0.1,1.5          Pareto 分布 (尺度, 形状)，重尾
+
+运行方式（在仓库根目录）：
+    python -m benchmarks.mock_openai_server --port 9000 --latency lognormal:-1.5,0.6 --tokens-per-second 80
+    OPENAI_API_BASE=http://127.0.0.1:9000/v1 OPENAI_API_KEY=mock uvicorn backend.main:api --port 8000
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CATEGORY_RULES = [
+    ("Billing", re.compile(r"bill|invoice|receipt|refund|payment|charge|price|账单|发票|退款|付款|扣费", re.I)),
+    ("Technical", re.compile(r"internet|connect|error|crash|bug|install|login|password|网络|连接|报错|崩溃|登录|密码", re.I)),
+]
+ITINERARY_INTERESTS = re.compile(r"based on the user's interests: (.*?)\. Provide")
+NEGATIVE = re.compile(r"terrible|angry|worst|awful|hate|unacceptable|furious|糟糕|生气|投诉|愤怒|垃圾", re.I)
+POSITIVE = re.compile(r"thank|great|love|awesome|excellent|谢谢|很好|满意|喜欢", re.I)
+FILLER_WORDS = (
+    "The itinerary starts with breakfast near the old town, followed by a guided walk through the museum "
+    "district, lunch at a local market, an afternoon in the park and dinner at a riverside restaurant."
+).split()
+
+
+def parse_distribution(spec: str) -> Callable[[], float]:
+    """把 'kind:a,b' 形式的延迟分布解析成采样函数（秒）"""
+    kind, _, args = spec.partition(":")
+    params = [float(x) for x in args.split(",") if x]
+    samplers = {
+        "fixed": lambda: params[0],
+        "normal": lambda: random.gauss(params[0], params[1]),
+        "lognormal": lambda: random.lognormvariate(params[0], params[1]),
+        "pareto": lambda: params[0] * random.paretovariate(params[1]),
+    }
+    if kind not in samplers:
+        raise ValueError(f"未知的延迟分布: {spec}")
+    sampler = samplers[kind]
+    return lambda: max(0.0, sampler())
+
+
+def filler(n: int) -> str:
+    return " ".join(FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(n))
+
+
+def canned_reply(messages: List[Dict[str, Any]], completion_tokens: int) -> str:
+    """按提示词返回预置的分类 / 情感标签，其他请求返回填充文本"""
+    prompt = " ".join(str(m.get("content", "")) for m in messages)
+    query = prompt.split("Query:", 1)[-1]
+    if "Categorize the following customer query" in prompt:
+        return next((label for label, pattern in CATEGORY_RULES if pattern.search(query)), "General")
+    if "Analyze the sentiment" in prompt:
+        if NEGATIVE.search(query):
+            return "Negative"
+        return "Positive" if POSITIVE.search(query) else "Neutral"
+    if match := ITINERARY_INTERESTS.search(prompt):
+        return filler(completion_tokens * len(match.group(1).split(",")))
+    return filler(completion_tokens)
+
+
+def create_app(
+    latency: Callable[[], float],
+    tokens_per_second: float,
+    completion_tokens: int,
+    error_rate: float,
+    rate_limit_rate: float,
+    thinking_tokens: int = 0,
+) -> FastAPI:
+    app = FastAPI(title="Mock OpenAI-compatible server")
+    stats = {"requests": 0, "streams": 0, "errors_500": 0, "errors_429": 0, "completion_tokens": 0}
+
+    def inject_error() -> Optional[JSONResponse]:
+        roll = random.random()
+        if roll < error_rate:
+            stats["errors_500"] += 1
+            return JSONResponse({"error": {"message": "injected server error", "type": "server_error"}}, status_code=500)
+        if roll < error_rate + rate_limit_rate:
+            stats["errors_429"] += 1
+            return JSONResponse(
+                {"error": {"message": "injected rate limit", "type": "rate_limit_error"}},
+                status_code=429,
+                headers={"Retry-After": "1"},
+            )
+        return None
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "mock-model", "object": "model", "owned_by": "mock"}]}
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        if (error := inject_error()) is not None:
+            return error
+
+        messages = body.get("messages", [])
+        max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+        reply = canned_reply(messages, min(max_tokens or completion_tokens, completion_tokens))
+        if thinking_tokens and (body.get("chat_template_kwargs") or {}).get("enable_thinking", True):
+            reply = f"<think> {filler(thinking_tokens)} </think> {reply}"
+        words = reply.split(" ")[:max_tokens]
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4 + 1
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(words),
+            "total_tokens": prompt_tokens + len(words),
+        }
+        stats["completion_tokens"] += len(words)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = body.get("model", "mock-model")
+        created = int(time.time())
+        per_token = 1 / tokens_per_second if tokens_per_second > 0 else 0.0
+
+        await asyncio.sleep(latency())
+        if not body.get("stream"):
+            await asyncio.sleep(per_token * len(words))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            }
+
+        stats["streams"] += 1
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, **extra: Any) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                **extra,
+            }
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        async def stream():
+            yield chunk({"role": "assistant", "content": ""})
+            for i, word in enumerate(words):
+                yield chunk({"content": word if i == 0 else f" {word}"})
+                if per_token:
+                    await asyncio.sleep(per_token)
+            yield chunk({}, "stop")
+            if include_usage:
+                yield f"data: {json.dumps({'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model, 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", default="lognormal:-1.5,0.6", help="首 token 延迟分布")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="token 生成速率，0 表示立即返回")
+    parser.add_argument("--completion-tokens", type=int, default=120, help="非分类请求返回的 token 数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的比例")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="返回 429 的比例")
+    parser.add_argument("--thinking-tokens", type=int, default=0, help="模拟思考模式时每次回复前的思考 token 数")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    app = create_app(
+        parse_distribution(args.latency),
+        args.tokens_per_second,
+        args.completion_tokens,
+        args.error_rate,
+        args.rate_limit_rate,
+        args.thinking_tokens,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
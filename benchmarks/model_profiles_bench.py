@@ -0,0 +1,101 @@
+"""
+模型配置基准：分类节点使用 classifier 配置（关闭思考、温度 0、max_tokens=8）前后，
+每条客服查询的延迟、生成的 token 数和路由结果
+
+对比两种配置（都关闭本地分诊 TRIAGE_LOCAL=0，让每条查询都调用分类模型）：
+    single    所有节点共用回复节点的设置（即之前的行为，思考模式按模型默认开启）
+    profiles  分类节点使用 classifier 配置
+
+LLM 请求发往本地模拟服务，--thinking-tokens 模拟 Qwen3 默认思考模式的输出长度。
+每种配置在独立子进程中运行，避免模型客户端和配置缓存互相影响。
+
+运行方式（在仓库根目录）：
+    python -m benchmarks.model_profiles_bench --thinking-tokens 150 --tokens-per-second 100
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+import httpx
+
+from benchmarks.cold_start import ROOT, free_port, start_mock_server
+
+CHILD = r"""
+import json, sys, time
+import customer_support_agent_langgraph as cs
+from benchmarks.load_generator import CHAT_QUERIES
+
+expected = {
+    "My internet connection keeps dropping. Can you help?": ("Technical", "Neutral"),
+    "Where can I find my receipt?": ("Billing", "Neutral"),
+    "What are your business hours?": ("General", "Neutral"),
+    "I was charged twice for my subscription, this is unacceptable!": ("Billing", "Negative"),
+    "Thanks, the new app version works great": ("General", "Positive"),
+}
+rounds = int(sys.argv[1])
+cs.run_customer_support("warm up")
+latencies, correct = [], 0
+for _ in range(rounds):
+    for query in CHAT_QUERIES:
+        start = time.perf_counter()
+        result = cs.run_customer_support(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        correct += (result["category"], result["sentiment"]) == expected[query]
+print(json.dumps({"latencies": latencies, "route_accuracy": correct / len(latencies)}))
+"""
+
+CONFIGS = {
+    "single": json.dumps({"classifier": {"temperature": 0.7, "max_tokens": None, "thinking": None}}),
+    "profiles": "",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=3, help="每种配置把示例查询跑几遍")
+    parser.add_argument("--latency", default="fixed:0.2", help="模拟服务的首 token 延迟分布")
+    parser.add_argument("--tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--thinking-tokens", type=int, default=150)
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_mock_server(
+        port, "--latency", args.latency, "--tokens-per-second", str(args.tokens_per_second),
+        "--thinking-tokens", str(args.thinking_tokens), "--completion-tokens", "60",
+    )
+    results = {}
+    try:
+        print(f"{'config':<10}{'mean ms':>10}{'p50 ms':>10}{'tokens/query':>14}{'routing ok':>12}")
+        for name, profiles in CONFIGS.items():
+            before = httpx.get(f"http://127.0.0.1:{port}/stats").json()["completion_tokens"]
+            env = {
+                **os.environ,
+                "OPENAI_API_BASE": f"http://127.0.0.1:{port}/v1",
+                "OPENAI_API_KEY": "mock",
+                "TRIAGE_LOCAL": "0",
+                "NODE_CACHE": "off",  # 每轮重复同样的查询，关闭节点缓存让每次都调用分类模型
+                "LLM_PROFILES": profiles,
+            }
+            out = subprocess.run(
+                [sys.executable, "-c", CHILD, str(args.rounds)],
+                cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+            )
+            row = json.loads(out.stdout.strip().splitlines()[-1])
+            tokens = httpx.get(f"http://127.0.0.1:{port}/stats").json()["completion_tokens"] - before
+            queries = len(row["latencies"]) + 1  # 包括预热查询
+            results[name] = statistics.fmean(row["latencies"])
+            print(
+                f"{name:<10}{results[name]:>10.0f}{statistics.median(row['latencies']):>10.0f}"
+                f"{tokens / queries:>14.0f}{row['route_accuracy']:>12.0%}"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+    print(f"\n⏱️ 每条查询节省 {results['single'] - results['profiles']:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+响应序列化与压缩基准：不同大小的行程 (itinerary) 响应的 CPU 开销和传输字节数
+
+三部分：
+1. 序列化：把 TravelPlanResponse 变成 JSON 字节
+       stdlib      jsonable_encoder + json.dumps（Starlette JSONResponse 的路径）
+       orjson      model_dump + orjson.dumps（backend.responses.ORJSONResponse 的路径）
+       pydantic    TypeAdapter.dump_json（新版 FastAPI 对 response_model 路由的直接序列化）
+2. 压缩：gzip 1/6/9 与 brotli 4/5/11（安装了 brotli 时）的压缩后字节数和耗时
+3. 端到端：在进程内用 ASGI 调用一个只返回行程的接口，比较默认配置、
+   orjson 响应类、再加压缩中间件时每个请求的耗时和响应字节数
+
+运行方式（在仓库根目录）：
+    python -m benchmarks.serialization_bench --sizes 2000 8000 32000 128000
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import time
+from typing import Callable, Dict, List, Tuple
+
+import httpx
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from backend.responses import CompressionMiddleware, ORJSONResponse, brotli, orjson
+from backend.main import TravelPlanResponse
+
+SECTIONS = [
+    "## 上午 9:00 - 故宫博物院 (Forbidden City)",
+    "- 建议提前在官网预约门票，从午门进入，沿中轴线参观太和殿、中和殿、保和殿",
+    "- Tip: rent the audio guide at the entrance, the English version covers all the main halls",
+    "## 中午 12:30 - 午餐：四季民福烤鸭店",
+    "- 推荐菜品：招牌烤鸭、宫保虾球、豌豆黄；人均约 150 元，高峰期需要排队 30 分钟左右",
+    "## 下午 14:00 - 景山公园 → 北海公园",
+    "- Walk up Jingshan hill for the panoramic view of the palace roofs, then stroll to Beihai lake",
+    "## 傍晚 18:00 - 南锣鼓巷 / 什刹海",
+    "- 胡同小吃：炸酱面、卤煮、驴打滚；晚上可以在后海酒吧街听现场音乐",
+    "**交通**：地铁 6 号线南锣鼓巷站；**预算**：门票 60 元 + 餐饮 250 元 + 交通 20 元",
+]
+
+
+def make_itinerary(size: int, seed: int = 0) -> str:
+    """生成约 size 字节 (UTF-8) 的中英混合 markdown 行程"""
+    rng = random.Random(seed)
+    lines: List[str] = []
+    total = 0
+    while total < size:
+        line = rng.choice(SECTIONS)
+        lines.append(line)
+        total += len(line.encode("utf-8")) + 1
+    return "\n".join(lines)
+
+
+def make_response(size: int) -> TravelPlanResponse:
+    return TravelPlanResponse(
+        city="Beijing",
+        interests=["history", "food", "nightlife"],
+        itinerary=make_itinerary(size),
+        status="success",
+    )
+
+
+def timeit(fn: Callable[[], bytes], min_time: float = 0.2) -> Tuple[float, bytes]:
+    """返回每次调用的平均微秒数和最后一次的输出"""
+    out = fn()
+    runs = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_time:
+        out = fn()
+        runs += 1
+    return (time.perf_counter() - start) / runs * 1e6, out
+
+
+def serializers() -> Dict[str, Callable[[TravelPlanResponse], bytes]]:
+    adapter = TypeAdapter(TravelPlanResponse)
+    result = {
+        "stdlib": lambda model: json.dumps(
+            jsonable_encoder(model), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8"),
+        "pydantic": lambda model: adapter.dump_json(model),
+    }
+    if orjson is not None:
+        result["orjson"] = lambda model: orjson.dumps(model.model_dump())
+    return result
+
+
+def compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    result = {f"gzip-{level}": (lambda body, level=level: gzip.compress(body, compresslevel=level, mtime=0)) for level in (1, 6, 9)}
+    if brotli is not None:
+        result.update({f"br-{q}": (lambda body, q=q: brotli.compress(body, quality=q)) for q in (4, 5, 11)})
+    return result
+
+
+def build_app(size: int, response_class=None, compression: bool = False) -> FastAPI:
+    app = FastAPI(default_response_class=response_class) if response_class else FastAPI()
+    if compression:
+        app.add_middleware(CompressionMiddleware)
+    payload = make_response(size)
+
+    @app.get("/plan", response_model=TravelPlanResponse)
+    async def plan():
+        return payload
+
+    return app
+
+
+async def end_to_end(app: FastAPI, requests: int, accept_encoding: str) -> Tuple[float, int]:
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Accept-Encoding": accept_encoding}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.get("/plan", headers=headers)
+        wire = len(response.content) if "content-encoding" not in response.headers else int(response.headers["content-length"])
+        start = time.perf_counter()
+        for _ in range(requests):
+            await client.get("/plan", headers=headers)
+        return (time.perf_counter() - start) / requests * 1e6, wire
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 8000, 32000, 128000], help="行程的 UTF-8 字节数")
+    parser.add_argument("--requests", type=int, default=300, help="端到端测试每种配置的请求数")
+    args = parser.parse_args()
+
+    print("1. 序列化 (µs / 次)")
+    names = list(serializers())
+    print(f"{'size':>8}" + "".join(f"{name:>12}" for name in names) + f"{'json bytes':>12}")
+    bodies = {}
+    for size in args.sizes:
+        model = make_response(size)
+        row = {name: timeit(lambda fn=fn: fn(model)) for name, fn in serializers().items()}
+        bodies[size] = row["stdlib"][1]
+        print(f"{size:>8}" + "".join(f"{row[name][0]:>12.1f}" for name in names) + f"{len(bodies[size]):>12}")
+
+    print("\n2. 压缩 (压缩后字节 / µs)")
+    names = list(compressors())
+    print(f"{'size':>8}" + "".join(f"{name:>16}" for name in names))
+    for size in args.sizes:
+        cells = []
+        for fn in compressors().values():
+            micros, out = timeit(lambda fn=fn: fn(bodies[size]))
+            cells.append(f"{len(out):>8}/{micros:<7.0f}")
+        print(f"{size:>8}" + "".join(f"{cell:>16}" for cell in cells))
+
+    print("\n3. 端到端 (µs / 请求, 响应字节)")
+    encoding = "br, gzip" if brotli is not None else "gzip"
+    configs = {
+        "default": lambda size: (build_app(size), "identity"),
+        "orjson": lambda size: (build_app(size, ORJSONResponse), "identity"),
+        "orjson+gzip": lambda size: (build_app(size, ORJSONResponse, compression=True), "gzip"),
+        "default+compress": lambda size: (build_app(size, compression=True), encoding),
+    }
+    print(f"{'size':>8}" + "".join(f"{name:>22}" for name in configs))
+    for size in args.sizes:
+        cells = []
+        for make in configs.values():
+            app, accept = make(size)
+            micros, wire = asyncio.run(end_to_end(app, args.requests, accept))
+            cells.append(f"{micros:.0f}µs {wire}B")
+        print(f"{size:>8}" + "".join(f"{cell:>22}" for cell in cells))
+
+
+if __name__ == "__main__":
+    main()
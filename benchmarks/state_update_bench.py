@@ -0,0 +1,148 @@
+"""
+状态更新方式基准：节点返回整个状态的副本 vs 只返回增量（add_messages 追加）
+
+长会话：同一个线程上连续运行 --turns 轮旅行规划图 (backend/travel_planner_api.py，桩模型)，
+每轮追加一条用户消息和一条行程回复，检查点保存在 SQLiteSaver 中。对比两种写法：
+- copy    改造前的写法：messages 是普通列表通道，节点返回 {**state, "messages": state["messages"] + [...]}，
+          客户端每轮要带上完整历史；每一步都复制整个状态和消息列表
+- append  现在的写法：messages 使用 add_messages 归约器，节点只返回新增的消息和修改的键
+
+报告（按会话长度分段）：
+- turn_ms        最后 10% 轮次的平均耗时
+- alloc_kb       最后一轮的 Python 内存分配峰值 (tracemalloc)
+- write_kb       检查点 writes 表的总字节数（节点写入；copy 写法每步都写入整个消息列表）
+- blob_kb        检查点 blobs 表的总字节数（通道值；copy 写法每步都重写城市、兴趣等未变化的通道）
+- ckpt_kb        以上加检查点本身的总字节数
+
+两种写法在通道变化时都会保存完整的 messages 通道值，所以 blob 体积仍随会话长度二次增长，
+差别在于 writes 和未变化的通道。
+
+运行方式（在仓库根目录）：
+    python -m benchmarks.state_update_bench --turns 50 200 500
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Annotated, Any, Callable, Dict, List, TypedDict
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ.setdefault("NODE_CACHE", "off")
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+from langgraph.graph import END, StateGraph  # noqa: E402
+
+import backend.travel_planner_api as travel_planner  # noqa: E402
+from sqlite_checkpointer import SQLiteSaver  # noqa: E402
+
+_TMP_DIR = tempfile.mkdtemp(prefix="state_update_bench_")
+ITINERARY = "\n".join(f"- {9 + hour:02d}:00 stop {hour}: museum, lunch or park with a short tip" for hour in range(12))
+
+travel_planner.llm = FakeListChatModel(responses=[ITINERARY])
+
+
+class CopyPlannerState(TypedDict):
+    messages: Annotated[List[HumanMessage | AIMessage], "The messages in the conversation"]
+    city: str
+    interests: List[str]
+    itinerary: str
+
+
+def copy_process_inputs(state: CopyPlannerState) -> CopyPlannerState:
+    return state
+
+
+def copy_create_itinerary(state: CopyPlannerState) -> CopyPlannerState:
+    response = travel_planner.llm.invoke(
+        travel_planner.itinerary_prompt.format_messages(city=state["city"], interests=", ".join(state["interests"]))
+    )
+    return {
+        **state,
+        "messages": state["messages"] + [AIMessage(content=response.content)],
+        "itinerary": response.content,
+    }
+
+
+def build_copy_graph():
+    workflow = StateGraph(CopyPlannerState)
+    workflow.add_node("process_inputs", copy_process_inputs)
+    workflow.add_node("create_itinerary", copy_create_itinerary)
+    workflow.set_entry_point("process_inputs")
+    workflow.add_edge("process_inputs", "create_itinerary")
+    workflow.add_edge("create_itinerary", END)
+    return workflow
+
+
+def turn_input(turn: int) -> Dict[str, Any]:
+    return {
+        "messages": [HumanMessage(content=f"Plan day {turn} in Paris")],
+        "city": "Paris",
+        "interests": ["art", "food", "history"],
+        "itinerary": "",
+    }
+
+
+def run_session(variant: str, turns: int) -> Dict[str, float]:
+    workflow = build_copy_graph() if variant == "copy" else travel_planner.workflow
+    saver = SQLiteSaver(os.path.join(_TMP_DIR, f"{variant}-{turns}.sqlite"))
+    graph = workflow.compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": "session"}}
+
+    def invoke(turn: int) -> None:
+        state = turn_input(turn)
+        if variant == "copy":
+            # 普通列表通道会被输入覆盖，客户端必须带上完整历史
+            previous = graph.get_state(config).values.get("messages", [])
+            state["messages"] = previous + state["messages"]
+        graph.invoke(state, config)
+
+    durations = []
+    for turn in range(turns - 1):
+        start = time.perf_counter()
+        invoke(turn)
+        durations.append(time.perf_counter() - start)
+    tracemalloc.start()
+    invoke(turns - 1)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    messages = len(graph.get_state(config).values["messages"])
+    assert messages == 2 * turns, f"{variant}: expected {2 * turns} messages, got {messages}"
+    stats = saver.storage_stats()
+    saver.close()
+    tail = durations[-max(1, len(durations) // 10):]
+    return {
+        "turn_ms": sum(tail) / len(tail) * 1000,
+        "alloc_kb": peak / 1024,
+        "write_kb": stats["write_bytes"] / 1024,
+        "blob_kb": stats["blob_bytes"] / 1024,
+        "ckpt_kb": stats["total_bytes"] / 1024,
+    }
+
+
+COLUMNS: Dict[str, Callable[[float], str]] = {
+    "turn_ms": "{:>10.2f}".format,
+    "alloc_kb": "{:>10.0f}".format,
+    "write_kb": "{:>10.0f}".format,
+    "blob_kb": "{:>10.0f}".format,
+    "ckpt_kb": "{:>10.0f}".format,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, nargs="+", default=[50, 200, 500], help="会话轮数")
+    args = parser.parse_args()
+
+    print(f"📁 临时数据库目录: {_TMP_DIR}")
+    print(f"{'turns':>6}{'variant':>9}" + "".join(f"{name:>10}" for name in COLUMNS))
+    for turns in args.turns:
+        for variant in ("copy", "append"):
+            row = run_session(variant, turns)
+            print(f"{turns:>6}{variant:>9}" + "".join(fmt(row[name]) for name, fmt in COLUMNS.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+子图调用方式基准：节点内嵌套 invoke vs 直接挂载为节点
+
+对 update_subgraph_state 中的增强版主图分别使用两种子图接入方式运行，统计：
+- 每次运行的平均耗时 / p99
+- 每次运行写入的检查点数量（包括子图自己的线程或命名空间）
+- 子图检查点所在的线程数（嵌套 invoke 按 main_topic 生成线程，相同主题会共用一个线程）
+
+运行方式（在仓库根目录）：
+    python -m benchmarks.subgraph_bench --runs 200
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+_TMP_DIR = tempfile.mkdtemp(prefix="subgraph_bench_")
+os.environ.setdefault("CHECKPOINT_DB_PATH", os.path.join(_TMP_DIR, "examples.sqlite"))
+
+import update_subgraph_state as example  # noqa: E402
+from sqlite_checkpointer import SQLiteSaver  # noqa: E402
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def bench(name, subgraph_node, runs, topics):
+    saver = SQLiteSaver(os.path.join(_TMP_DIR, f"{name}.sqlite"))
+    graph = example.build_enhanced_main_graph(subgraph_node).compile(checkpointer=saver)
+    # 嵌套 invoke 的子图写入示例模块自己的检查点库，需要一起统计（只算本次运行新写入的检查点）
+    nested_before = {t.config["configurable"]["checkpoint_id"] for t in example.checkpointer.list(None)}
+
+    latencies = []
+    for i in range(runs):
+        config = {"configurable": {"thread_id": f"{name}-{i}"}}
+        start = time.perf_counter()
+        graph.invoke({"main_topic": f"天气分析任务 {i % topics}", "user_location": "shanghai"}, config)
+        latencies.append(time.perf_counter() - start)
+
+    parent_checkpoints = saver.storage_stats()["checkpoints"]
+    nested = [t for t in example.checkpointer.list(None) if t.config["configurable"]["checkpoint_id"] not in nested_before]
+    nested_checkpoints = len(nested)
+    if nested:
+        subgraph_threads = len({t.config["configurable"]["thread_id"] for t in nested})
+    else:
+        subgraph_threads = len(
+            {t.config["configurable"]["checkpoint_ns"] for t in saver.list(None) if t.config["configurable"]["checkpoint_ns"]}
+        )
+    print(
+        f"{name:<14}{statistics.fmean(latencies) * 1e3:>10.2f}{percentile(latencies, 99) * 1e3:>10.2f}"
+        f"{(parent_checkpoints + nested_checkpoints) / runs:>16.1f}{subgraph_threads:>18}"
+    )
+    saver.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=200, help="主图运行次数（每次使用新的线程）")
+    parser.add_argument("--topics", type=int, default=10, help="不同 main_topic 的数量，用于观察嵌套 invoke 的线程冲突")
+    args = parser.parse_args()
+
+    print(f"📁 临时数据库目录: {_TMP_DIR}")
+    print(f"{'approach':<14}{'mean ms':>10}{'p99 ms':>10}{'checkpoints/run':>16}{'subgraph threads':>18}")
+    bench("nested_invoke", example.enhanced_call_subgraph_node, args.runs, args.topics)
+    bench("mounted", example.compiled_mounted_subgraph, args.runs, args.topics)
+
+
+if __name__ == "__main__":
+    main()
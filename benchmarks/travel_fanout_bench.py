@@ -0,0 +1,85 @@
+"""
+旅行行程并行生成基准：sequential（一次长生成）与 parallel（每个兴趣一段，Send 并发生成后合并）
+在不同兴趣个数下的端到端耗时
+
+模拟服务为行程请求按兴趣个数成倍生成 token（--section-tokens × 兴趣数），
+并行模式下每个片段生成 --section-tokens 个 token，于是：
+    sequential  耗时 ≈ 首 token 延迟 + 兴趣数 × 片段生成时间
+    parallel    耗时 ≈ 最慢的片段（首 token 延迟 + 片段生成时间）
+
+两种模式在同一个子进程里交替运行，LLM 请求都发往本地模拟服务。
+
+运行方式（在仓库根目录）：
+    python -m benchmarks.travel_fanout_bench --interests 1 2 4 6 --tokens-per-second 100
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.cold_start import ROOT, free_port, start_mock_server
+
+INTERESTS = ["history", "food", "art", "shopping", "parks", "nightlife", "architecture", "museums"]
+
+CHILD = r"""
+import json, sys, time
+from backend.travel_planner_api import generate_travel_plan
+
+interests = json.loads(sys.argv[1])
+rounds = int(sys.argv[2])
+generate_travel_plan("Beijing", interests[:1], mode="parallel")  # 预热：建立连接、编译提示词
+results = {}
+for count in json.loads(sys.argv[3]):
+    row = {"sequential": [], "parallel": []}
+    for _ in range(rounds):
+        for mode in row:
+            start = time.perf_counter()
+            generate_travel_plan("Beijing", interests[:count], mode=mode)
+            row[mode].append((time.perf_counter() - start) * 1000)
+    results[count] = row
+print(json.dumps(results))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interests", type=int, nargs="+", default=[1, 2, 4, 6], help="要测试的兴趣个数")
+    parser.add_argument("--rounds", type=int, default=3, help="每个兴趣个数、每种模式运行的次数，报告中位数")
+    parser.add_argument("--latency", default="fixed:0.3", help="模拟服务的首 token 延迟分布")
+    parser.add_argument("--tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--section-tokens", type=int, default=150, help="每个兴趣对应的输出 token 数")
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_mock_server(
+        port, "--latency", args.latency, "--tokens-per-second", str(args.tokens_per_second),
+        "--completion-tokens", str(args.section_tokens),
+    )
+    env = {
+        **os.environ,
+        "OPENAI_API_BASE": f"http://127.0.0.1:{port}/v1",
+        "OPENAI_API_KEY": "mock",
+        "LLM_HEDGING": "0",
+    }
+    try:
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD, json.dumps(INTERESTS), str(args.rounds), json.dumps(args.interests)],
+            cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+        )
+    finally:
+        server.terminate()
+        server.wait()
+
+    results = json.loads(out.stdout.strip().splitlines()[-1])
+    print(f"{'interests':>10}{'sequential ms':>16}{'parallel ms':>14}{'speedup':>10}")
+    for count in args.interests:
+        row = results[str(count)]
+        sequential = statistics.median(row["sequential"])
+        parallel = statistics.median(row["parallel"])
+        print(f"{count:>10}{sequential:>16.0f}{parallel:>14.0f}{sequential / parallel:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
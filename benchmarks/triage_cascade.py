@@ -0,0 +1,105 @@
+"""
+本地分诊级联的离线评估：交叉验证覆盖率 / 准确率，以及本地分类的耗时
+
+对标注工单做 k 折交叉验证：每折用其余工单训练，对留出的工单走一遍级联（关键词 → 分类器），
+统计不同置信度阈值下
+- coverage  本地直接回答的比例（这部分查询不再调用 LLM）
+- accuracy  本地回答中标签正确的比例
+- neg_miss  （仅 sentiment）真实为 Negative 却被本地判为其他情感的比例（包括关键词直接回答的），
+            这类错误会让本该转人工的查询走到普通处理节点，代价最高
+
+另外用一组不在训练数据里的否定 / 反讽查询（"not great"、"thanks for nothing"）检查完整级联的情感判断，
+这类查询包含正面词，最容易被误判为 Positive。
+
+运行方式（在仓库根目录）：
+    python -m benchmarks.triage_cascade --folds 5
+    TRIAGE_TRAINING_DATA=tickets.jsonl python -m benchmarks.triage_cascade --thresholds 0.5 0.6 0.7 0.8
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+from triage_classifier import TriageCascade, keyword_label, load_tickets, train_field
+
+FIELDS = {"category": 1, "sentiment": 2}
+
+# 否定 / 反讽查询，真实情感都是 Negative
+NEGATION_CASES = [
+    "This is not great, I want my money back",
+    "I do not love being charged twice",
+    "Thanks for nothing, the wifi is still broken",
+    "No thanks, I just want a refund now",
+    "Wow, thanks for deleting all my files",
+    "Great, the router died again. Just great.",
+    "I am not happy that nobody answered my email",
+    "服务一点都不好，谢谢",
+    "对你们的退款速度很不满意",
+]
+
+
+def cross_validate(tickets: List[Tuple[str, str, str]], folds: int, seed: int) -> Dict[str, List[Tuple[str, str, float]]]:
+    """返回每个字段的 (真实标签, 预测标签, 置信度) 列表；关键词命中的置信度记为 1"""
+    shuffled = list(tickets)
+    random.Random(seed).shuffle(shuffled)
+    predictions: Dict[str, List[Tuple[str, str, float]]] = {field: [] for field in FIELDS}
+    for fold in range(folds):
+        test = shuffled[fold::folds]
+        train = [t for i, t in enumerate(shuffled) if i % folds != fold]
+        for field, column in FIELDS.items():
+            model = train_field(field, train)
+            for ticket in test:
+                label = keyword_label(field, ticket[0])
+                label, confidence = (label, 1.0) if label else model.predict(ticket[0])
+                predictions[field].append((ticket[column], label, confidence))
+    return predictions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.4, 0.5, 0.6, 0.7, 0.8, 0.9])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tickets = load_tickets()
+    print(f"📚 {len(tickets)} 条标注工单, {args.folds} 折交叉验证")
+    predictions = cross_validate(tickets, args.folds, args.seed)
+
+    for field, rows in predictions.items():
+        print(f"\n{field}: 全部由本地回答时准确率 {sum(t == p for t, p, _ in rows) / len(rows):.1%}")
+        print(f"{'threshold':>10}{'coverage':>10}{'accuracy':>10}" + (f"{'neg_miss':>10}" if field == "sentiment" else ""))
+        for threshold in args.thresholds:
+            answered = [(t, p) for t, p, c in rows if c >= threshold]
+            coverage = len(answered) / len(rows)
+            accuracy = sum(t == p for t, p in answered) / len(answered) if answered else 0.0
+            line = f"{threshold:>10.2f}{coverage:>10.1%}{accuracy:>10.1%}"
+            if field == "sentiment":
+                negatives = [(t, p, c) for t, p, c in rows if t == "Negative"]
+                missed = sum(1 for t, p, c in negatives if c >= threshold and p != "Negative")
+                line += f"{missed / len(negatives) if negatives else 0.0:>10.1%}"
+            print(line)
+
+    cascade = TriageCascade(tickets=tickets)
+    start = time.perf_counter()
+    cascade.classify("category", "warm up")
+    train_ms = (time.perf_counter() - start) * 1000
+
+    answers = {query: cascade.classify("sentiment", query) for query in NEGATION_CASES}
+    missed = [query for query, label in answers.items() if label not in (None, "Negative")]
+    print(f"\n否定 / 反讽查询: {sum(label == 'Negative' for label in answers.values())}/{len(answers)} 本地判为 Negative，"
+          f"{sum(label is None for label in answers.values())} 条交给 LLM，neg_miss {len(missed) / len(answers):.1%}")
+    for query in missed:
+        print(f"  ❌ {query!r} → {answers[query]}")
+    latencies = []
+    for query, _, _ in tickets * 5:
+        start = time.perf_counter()
+        cascade.classify("category", query)
+        cascade.classify("sentiment", query)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    print(f"\n⏱️ 训练 {train_ms:.0f} ms；每条查询本地分类 (两个字段) 中位数 {statistics.median(latencies):.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,41 @@
-from typing import Dict, TypedDict
+from typing import Dict, Optional, TypedDict
 from langgraph.graph import StateGraph, END
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
+from langchain_core.runnables import RunnableConfig
 
 # from IPython.display import display, Image
 # from langchain_core.runnables.graph import MermaidDrawMethod
 from dotenv import load_dotenv
+import logging
 import os
 
+from hedging import maybe_hedged
+from model_profiles import normalize_label, profile_llm
+from node_cache import make_node_cache, node_cache_policy
+from triage_classifier import TriageCascade
+
 # Load environment variables and set OpenAI API key
 load_dotenv()
 
-llm = ChatOpenAI(model="Qwen/Qwen3-8B", temperature=0.7)
+# Per-node model profiles (model_profiles.py): the one-word classifiers run without thinking,
+# at temperature 0 and with a tiny output cap; the handlers keep the generous settings.
+# Built on first use so importing this module stays cheap.
+# Set LLM_HEDGING=1 to send a backup request when a call stalls past the recent p95 latency
+classifier_llm = profile_llm("classifier", wrap=maybe_hedged)
+# Same classifier without the output cap, for replies the cap cut off before the label
+classifier_retry_llm = profile_llm("classifier_retry", wrap=maybe_hedged)
+llm = profile_llm("responder", wrap=maybe_hedged)
+
+logger = logging.getLogger(__name__)
+
+# Labels route_query compares against, with aliases a model may answer with instead
+CATEGORY_LABELS = {"Technical": ("技术",), "Billing": ("账单", "计费"), "General": ("一般", "通用")}
+SENTIMENT_LABELS = {"Positive": ("正面", "积极"), "Neutral": ("中性",), "Negative": ("负面", "消极")}
+
+# Local keyword + TF-IDF classifiers answer confident triage decisions without an LLM call.
+# Set TRIAGE_LOCAL=0 to always use the LLM; triage.stats() reports the share answered locally.
+triage = TriageCascade()
+TRIAGE_LOCAL = os.getenv("TRIAGE_LOCAL", "1") != "0"
 
 
 class State(TypedDict):
@@ -20,24 +44,39 @@ class State(TypedDict):
     sentiment: str
     response: str
 
+def llm_label(prompt: ChatPromptTemplate, query: str, labels: Dict, fallback: str) -> str:
+    """Ask the classifier model for one of labels; retry once without the output cap when the reply
+    has no label (a gateway that ignores the thinking switch truncates it inside <think>), then use fallback"""
+    for model in (classifier_llm, classifier_retry_llm):
+        reply = (prompt | model).invoke({"query": query}).content
+        label = normalize_label(reply, labels, None)
+        if label is not None:
+            return label
+        logger.warning("No label in classifier reply %r", reply[:200])
+    logger.warning("Classifier gave no label for %r, using %s", query[:200], fallback)
+    return fallback
+
 def categorize(state: State) -> State:
     """Categorize the customer query into Technical, Billing, or General."""
+    if TRIAGE_LOCAL and (category := triage.classify("category", state["query"])):
+        return {"category": category}
     prompt = ChatPromptTemplate.from_template(
         "Categorize the following customer query into one of these categories: "
-        "Technical, Billing, General. Query: {query}"
+        "Technical, Billing, General. Respond with the category name only. Query: {query}"
     )
-    chain = prompt | llm
-    category = chain.invoke({"query": state["query"]}).content
+    category = llm_label(prompt, state["query"], CATEGORY_LABELS, "General")
     return {"category": category}
 
 def analyze_sentiment(state: State) -> State:
     """Analyze the sentiment of the customer query as Positive, Neutral, or Negative."""
+    if TRIAGE_LOCAL and (sentiment := triage.classify("sentiment", state["query"])):
+        return {"sentiment": sentiment}
     prompt = ChatPromptTemplate.from_template(
         "Analyze the sentiment of the following customer query. "
         "Respond with either 'Positive', 'Neutral', or 'Negative'. Query: {query}"
     )
-    chain = prompt | llm
-    sentiment = chain.invoke({"query": state["query"]}).content
+    # Without a label, escalate: a missed Negative skips the human agent, an extra escalation only costs review time
+    sentiment = llm_label(prompt, state["query"], SENTIMENT_LABELS, "Negative")
     return {"sentiment": sentiment}
 
 def handle_technical(state: State) -> State:
@@ -86,8 +125,9 @@ def route_query(state: State) -> str:
 workflow = StateGraph(State)
 
 # Add nodes
-workflow.add_node("categorize", categorize)
-workflow.add_node("analyze_sentiment", analyze_sentiment)
+# Classification depends only on the query: retries and re-runs reuse the cached label
+workflow.add_node("categorize", categorize, cache_policy=node_cache_policy("query"))
+workflow.add_node("analyze_sentiment", analyze_sentiment, cache_policy=node_cache_policy("query"))
 workflow.add_node("handle_technical", handle_technical)
 workflow.add_node("handle_billing", handle_billing)
 workflow.add_node("handle_general", handle_general)
@@ -114,18 +154,19 @@ workflow.add_edge("escalate", END)
 workflow.set_entry_point("categorize")
 
 # Compile the graph
-app = workflow.compile()
+app = workflow.compile(cache=make_node_cache("customer_support"))
 
-def run_customer_support(query: str) -> Dict[str, str]:
+def run_customer_support(query: str, config: Optional[RunnableConfig] = None) -> Dict[str, str]:
     """Process a customer query through the LangGraph workflow.
     
     Args:
         query (str): The customer's query
+        config (RunnableConfig, optional): Run config, e.g. callbacks for metrics
         
     Returns:
         Dict[str, str]: A dictionary containing the query's category, sentiment, and response
     """
-    results = app.invoke({"query": query})
+    results = app.invoke({"query": query}, config)
     return {
         "category": results["category"],
         "sentiment": results["sentiment"],
@@ -0,0 +1,220 @@
+"""
+对冲请求 (hedged requests)：压低 LLM 调用的长尾延迟
+
+少量 LLM 调用的耗时远超中位数，接口的 p99 基本由它们决定。HedgedRunnable 包装模型：
+- 维护最近调用延迟的滑动窗口，阈值取其中的某个分位数（默认 p95）
+- 调用超过阈值还没返回时，发出一份相同的备份请求，取先返回的结果，取消另一个
+- 对冲预算：每次调用积累 max_hedge_rate 个对冲额度，发出一次对冲消耗 1 个，
+  保证对冲请求占比（即额外成本）不超过 max_hedge_rate；同时限制同时在途的对冲数
+- stats() 报告对冲率（即额外请求占比）、对冲胜出次数和对冲额外消耗的输入 token 估计
+
+异步调用 (ainvoke) 会真正取消落后的请求；同步调用无法中断已经发出的 HTTP 请求，
+落后的请求在后台线程里跑完后丢弃结果。流式调用 (stream / astream) 不对冲，
+直接转给被包装的模型，也不计入统计。
+
+通过环境变量开启（默认关闭）：
+    LLM_HEDGING=1                 开启对冲
+    LLM_HEDGE_PERCENTILE=95       触发对冲的延迟分位数
+    LLM_HEDGE_MAX_RATE=0.05       对冲请求占比上限
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+
+class HedgedRunnable(Runnable):
+    """对冲包装器，可以直接替换 llm 用在 prompt | llm 或 llm.invoke(...) 中
+
+    Args:
+        bound: 被包装的模型（或任意 Runnable）
+        percentile: 触发对冲的延迟分位数
+        window: 计算分位数的最近延迟样本数
+        min_samples: 样本不足时不对冲
+        min_delay: 对冲等待时间的下限（秒），避免延迟很低时频繁对冲
+        max_hedge_rate: 对冲请求占总调用数的上限
+        max_inflight_hedges: 同时在途的对冲请求上限
+        max_workers: 同步调用使用的线程数
+    """
+
+    def __init__(
+        self,
+        bound: Runnable,
+        *,
+        percentile: float = 95.0,
+        window: int = 500,
+        min_samples: int = 20,
+        min_delay: float = 0.05,
+        max_hedge_rate: float = 0.05,
+        max_inflight_hedges: int = 8,
+        max_workers: int = 64,
+    ):
+        self.bound = bound
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_hedge_rate = max_hedge_rate
+        self.max_inflight_hedges = max_inflight_hedges
+        self._latencies: "deque[float]" = deque(maxlen=window)
+        self._lock = threading.Lock()
+        # 对冲额度，最多积累 max_inflight_hedges 个，允许短时间的突发
+        self._budget = 0.0
+        self._inflight_hedges = 0
+        self._executor = ContextThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedged-llm")
+        self._stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "skipped_budget": 0, "extra_input_tokens": 0}
+
+    # ---------- 阈值与预算 ----------
+
+    def _record_latency(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def hedge_delay(self) -> Optional[float]:
+        """当前的对冲等待时间，样本不足时返回 None"""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_delay, ordered[index])
+
+    def _start_call(self) -> None:
+        with self._lock:
+            self._stats["calls"] += 1
+            self._budget = min(float(self.max_inflight_hedges), self._budget + self.max_hedge_rate)
+
+    def _try_acquire_hedge(self) -> bool:
+        with self._lock:
+            if self._budget < 1 or self._inflight_hedges >= self.max_inflight_hedges:
+                self._stats["skipped_budget"] += 1
+                return False
+            self._budget -= 1
+            self._inflight_hedges += 1
+            self._stats["hedged"] += 1
+            return True
+
+    def _release_hedge(self) -> None:
+        with self._lock:
+            self._inflight_hedges -= 1
+
+    def _finish_hedged(self, result: Any, hedge_won: bool) -> Any:
+        # 两份请求的 prompt 相同，落后请求至少消耗了同样多的输入 token
+        usage = getattr(result, "usage_metadata", None) or {}
+        with self._lock:
+            self._stats["hedge_wins"] += int(hedge_won)
+            self._stats["extra_input_tokens"] += usage.get("input_tokens", 0)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        delay = self.hedge_delay()
+        with self._lock:
+            stats = dict(self._stats)
+        calls = stats["calls"] or 1
+        # 每次对冲多发一个请求，对冲率就是额外请求数的占比
+        stats["hedge_rate"] = stats["hedged"] / calls
+        stats["hedge_delay_ms"] = None if delay is None else round(delay * 1000, 1)
+        return stats
+
+    # ---------- 同步调用 ----------
+
+    def _invoke_bound(self, input: Any, config: Optional[RunnableConfig], kwargs: Dict[str, Any], record: bool) -> Any:
+        # 在工作线程内计时，不把线程池排队时间算进延迟；
+        # 主请求记录完整耗时（即使被对冲请求抢先，也在后台跑完后记录），避免分位数被对冲结果拉低
+        started = time.perf_counter()
+        result = self.bound.invoke(input, config, **kwargs)
+        if record:
+            self._record_latency(time.perf_counter() - started)
+        return result
+
+    def _submit(self, input: Any, config: Optional[RunnableConfig], kwargs: Dict[str, Any], record: bool) -> Future:
+        return self._executor.submit(self._invoke_bound, input, config, kwargs, record)
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        self._start_call()
+        delay = self.hedge_delay()
+        primary = self._submit(input, config, kwargs, record=True)
+        if delay is None:
+            return primary.result()
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._try_acquire_hedge():
+            return primary.result()
+
+        hedge = self._submit(input, config, kwargs, record=False)
+        hedge.add_done_callback(lambda f: self._release_hedge())
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()  # 尚未开始时可以取消；已经在跑的请求结果被丢弃
+                    return self._finish_hedged(future.result(), future is hedge)
+                error = future.exception()
+        raise error
+
+    # ---------- 异步调用 ----------
+
+    async def _timed(self, input: Any, config: Optional[RunnableConfig], kwargs: Dict[str, Any]) -> Any:
+        # 主请求总是记录延迟，避免分位数被对冲结果拉低（同步调用让落后的主请求跑完后记录）。
+        # 异步调用会取消落后的主请求，此时只知道耗时的下限，按已经等待的时间记录
+        started = time.perf_counter()
+        try:
+            result = await self.bound.ainvoke(input, config, **kwargs)
+        except asyncio.CancelledError:
+            self._record_latency(time.perf_counter() - started)
+            raise
+        self._record_latency(time.perf_counter() - started)
+        return result
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        self._start_call()
+        delay = self.hedge_delay()
+        primary = asyncio.ensure_future(self._timed(input, config, kwargs))
+        if delay is None:
+            return await primary
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not self._try_acquire_hedge():
+            return await primary
+
+        hedge = asyncio.ensure_future(self.bound.ainvoke(input, config, **kwargs))
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return self._finish_hedged(task.result(), task is hedge)
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            self._release_hedge()
+
+    # ---------- 流式调用 ----------
+
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Iterator[Any]:
+        yield from self.bound.stream(input, config, **kwargs)
+
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AsyncIterator[Any]:
+        async for chunk in self.bound.astream(input, config, **kwargs):
+            yield chunk
+
+
+def maybe_hedged(llm: Runnable) -> Runnable:
+    """按环境变量决定是否为模型开启对冲，未开启时原样返回"""
+    if os.getenv("LLM_HEDGING", "").lower() not in ("1", "true", "yes", "on"):
+        return llm
+    return HedgedRunnable(
+        llm,
+        percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "95")),
+        max_hedge_rate=float(os.getenv("LLM_HEDGE_MAX_RATE", "0.05")),
+    )
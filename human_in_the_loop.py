@@ -1,11 +1,12 @@
-from typing import Literal
+from typing import Any, Dict, List, Literal, Optional
 from typing import TypedDict
 from langgraph.types import interrupt, Command
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import StateGraph, START, END
 from typing import TypedDict
 from dotenv import load_dotenv
 
+from sqlite_checkpointer import LazySaver, PendingInterrupt
+
 load_dotenv()
 
 # 定义状态类型
@@ -14,11 +15,10 @@ class ApprovalState(TypedDict):
     proposed_action_details: str
     final_result: str
 
-# 定义节点函数
-def propose_action(state: ApprovalState) -> ApprovalState:
+# 定义节点函数：只返回本节点修改的键，未修改的通道不会重新写入检查点
+def propose_action(state: ApprovalState) -> Dict[str, str]:
     """提出一个需要人类审批的操作"""
     return {
-        **state,
         "proposed_action_details": f"基于主题 '{state['topic']}' 的操作提议：发送营销邮件给1000个客户"
     }
 
@@ -37,17 +37,15 @@ def human_approval_node(state: ApprovalState) -> Command[Literal["execute_action
     else:
         return Command(goto="revise_action")
 
-def execute_action(state: ApprovalState) -> ApprovalState:
+def execute_action(state: ApprovalState) -> Dict[str, str]:
     """执行已批准的操作"""
     return {
-        **state,
         "final_result": f"✅ 已执行操作: {state['proposed_action_details']}"
     }
 
-def revise_action(state: ApprovalState) -> ApprovalState:
+def revise_action(state: ApprovalState) -> Dict[str, str]:
     """修改被拒绝的操作"""
     return {
-        **state, 
         "final_result": f"❌ 操作被拒绝，已修改为: 发送营销邮件给50个目标客户（缩小规模）"
     }
 
@@ -66,23 +64,74 @@ approval_graph_builder.add_edge("propose_action", "human_approval")
 approval_graph_builder.add_edge("revise_action", "human_approval")  # 修改后再次请求审批
 
 # 编译图（必须包含检查点器以支持中断）
-approval_graph = approval_graph_builder.compile(checkpointer=MemorySaver())
+# 使用持久化的 SQLite 检查点，等待数小时的审批在进程重启后仍可恢复
+# 与其他示例图共用 default_saver()，第一次运行时才打开数据库
+checkpointer = LazySaver()
+approval_graph = approval_graph_builder.compile(checkpointer=checkpointer)
 
-# 启动审批流程
-config = {"configurable": {"thread_id": "approval_thread"}}
+# 批量审批：待审批线程由检查点的 pending_interrupts 索引直接列出，恢复时并发执行
+def list_pending_approvals(limit: Optional[int] = None, after: Optional[float] = None) -> List[PendingInterrupt]:
+    """按进入审批的先后列出等待人工审批的线程"""
+    return checkpointer.list_pending_interrupts(limit=limit, after=after)
 
-print("=== 第一步：启动智能体，等待人工审批 ===")
-try:
-    result = approval_graph.invoke(
-        {"topic": "产品推广活动"}, 
-        config=config
-    )
-    print("执行完成：", result)
-except Exception as e:
-    print(f"智能体在等待人工审批处中断: {e}")
+def _resume_batch(decisions: Dict[str, Any], max_concurrency: int):
+    thread_ids = list(decisions)
+    inputs = [Command(resume=decisions[thread_id]) for thread_id in thread_ids]
+    configs = [
+        {"configurable": {"thread_id": thread_id}, "max_concurrency": max_concurrency}
+        for thread_id in thread_ids
+    ]
+    return thread_ids, inputs, configs
+
+def resume_approvals(decisions: Dict[str, Any], *, max_concurrency: int = 32) -> Dict[str, Any]:
+    """并发恢复多个审批线程
+
+    Args:
+        decisions: {thread_id: 审批结果}，例如 {"approval_1": {"user_response": "approve"}}
+        max_concurrency: 同时恢复的线程数上限
+
+    Returns:
+        {thread_id: 该线程恢复后的最终状态，或执行时抛出的异常}，单个线程失败不影响其他线程
+    """
+    thread_ids, inputs, configs = _resume_batch(decisions, max_concurrency)
+    results = approval_graph.batch(inputs, configs, return_exceptions=True)
+    return dict(zip(thread_ids, results))
+
+async def aresume_approvals(decisions: Dict[str, Any], *, max_concurrency: int = 32) -> Dict[str, Any]:
+    """resume_approvals 的异步版本"""
+    thread_ids, inputs, configs = _resume_batch(decisions, max_concurrency)
+    results = await approval_graph.abatch(inputs, configs, return_exceptions=True)
+    return dict(zip(thread_ids, results))
+
+if __name__ == "__main__":
+    # 启动审批流程
+    config = {"configurable": {"thread_id": "approval_thread"}}
+
+    print("=== 第一步：启动智能体，等待人工审批 ===")
+    try:
+        result = approval_graph.invoke(
+            {"topic": "产品推广活动"}, 
+            config=config
+        )
+        print("执行完成：", result)
+    except Exception as e:
+        print(f"智能体在等待人工审批处中断: {e}")
     
-# 检查当前状态
-current_state = approval_graph.get_state(config)
-print(f"\n当前状态: {current_state.values}")
-print(f"下一个节点: {current_state.next}")
-print(f"是否被中断: {current_state.tasks[0] if current_state.tasks else 'No interrupts'}")
\ No newline at end of file
+    # 检查当前状态
+    current_state = approval_graph.get_state(config)
+    print(f"\n当前状态: {current_state.values}")
+    print(f"下一个节点: {current_state.next}")
+    print(f"是否被中断: {current_state.tasks[0] if current_state.tasks else 'No interrupts'}")
+    print("\n=== 批量审批：列出待审批线程并并发恢复 ===")
+    for i in range(5):
+        approval_graph.invoke({"topic": f"促销活动 {i}"}, config={"configurable": {"thread_id": f"campaign_{i}"}})
+
+    pending = list_pending_approvals()
+    print(f"待审批数量: {len(pending)}")
+    for item in pending:
+        print(f"  {item.thread_id}: {item.interrupts[0].value['action_details']}")
+
+    results = resume_approvals({item.thread_id: {"user_response": "approve"} for item in pending}, max_concurrency=8)
+    for thread_id, result in results.items():
+        print(f"  {thread_id} -> {result['final_result'] if isinstance(result, dict) else result}")
+    print(f"剩余待审批数量: {len(list_pending_approvals())}")
@@ -0,0 +1,63 @@
+"""
+延迟构建的模型：第一次调用时才导入 langchain_openai 并创建客户端
+
+导入 langchain_openai 和第一次创建 ChatOpenAI（建立 HTTP 客户端、SSL 上下文）
+合计要数百毫秒，放在模块顶层会拖慢每个导入这些图的进程的启动。
+LazyRunnable 可以直接替换 llm 用在 prompt | llm 或 llm.invoke(...) 中，
+调用时把 config 原样传给真实模型，回调和追踪不受影响。
+"""
+import threading
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+
+class LazyRunnable(Runnable):
+    """第一次使用时才调用 factory 构建的 Runnable（线程安全）"""
+
+    def __init__(self, factory: Callable[[], Runnable]):
+        self._factory = factory
+        self._runnable: Optional[Runnable] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._runnable is not None
+
+    def load(self) -> Runnable:
+        """构建（只构建一次）并返回真实的 Runnable，预热时可以提前调用"""
+        if self._runnable is None:
+            with self._lock:
+                if self._runnable is None:
+                    self._runnable = self._factory()
+        return self._runnable
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        return self.load().invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        return await self.load().ainvoke(input, config, **kwargs)
+
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Iterator[Any]:
+        yield from self.load().stream(input, config, **kwargs)
+
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AsyncIterator[Any]:
+        async for chunk in self.load().astream(input, config, **kwargs):
+            yield chunk
+
+
+def lazy_chat_openai(*, wrap: Optional[Callable[[Runnable], Runnable]] = None, **kwargs: Any) -> LazyRunnable:
+    """延迟构建的 ChatOpenAI
+
+    Args:
+        wrap: 构建后对模型的包装，例如 hedging.maybe_hedged
+        **kwargs: 传给 ChatOpenAI 的参数
+    """
+
+    def factory() -> Runnable:
+        from langchain_openai import ChatOpenAI
+
+        model = ChatOpenAI(**kwargs)
+        return wrap(model) if wrap is not None else model
+
+    return LazyRunnable(factory)
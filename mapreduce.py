@@ -1,9 +1,20 @@
 from typing import Annotated, List, Any
 from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, START, END
-from langgraph.constants import Send
+from langgraph.types import Send
+import logging
 import operator
 import re
+from collections import Counter
+
+from node_cache import make_node_cache, node_cache_policy, register_cache_type
+from sketches import FrequencySketch
+
+# 近似模式的 map 结果带有 sketch，节点缓存按 to_bytes / from_bytes 编码（不用 pickle）
+register_cache_type(FrequencySketch, FrequencySketch.to_bytes, FrequencySketch.from_bytes)
+
+# 节点的进度输出走 logging：演示时打印到终端，由后端任务 (backend/jobs.py) 运行时不刷屏
+logger = logging.getLogger(__name__)
 
 # 定义整体状态结构体
 class OverallState(TypedDict):
@@ -15,10 +26,17 @@ class OverallState(TypedDict):
     intermediate_results: Annotated[List[dict], operator.add]
     # Reduce 阶段的最终结果
     final_result: dict
+    # Map 任务数（可选，默认 4）
+    num_sub_tasks: int
+    # 统计模式（可选）："exact" 精确词频（默认）；"approximate" 用固定内存的 sketch 近似统计，
+    # 适合词表放不进内存的超大语料，见 sketches.py
+    mode: str
 
 # 定义 Map 节点的私有状态结构体
 class MapState(TypedDict):
     sub_data: Any  # 子任务数据类型可以是任意类型
+    shard: int  # 子数据集编号，用于按分片汇报进度
+    mode: str  # "exact" 或 "approximate"
 
 def split_large_data(input_data: List[str], num_sub_tasks: int = 10) -> List[List[str]]:
     """将大规模数据分割成子数据集"""
@@ -31,11 +49,11 @@ def split_large_data(input_data: List[str], num_sub_tasks: int = 10) -> List[Lis
 def split_input_data(state: OverallState):
     """分割节点函数：只负责数据分割，不返回 Send 对象"""
     input_data = state["large_input_data"]  # 从状态中获取大规模输入数据
-    sub_datasets = split_large_data(input_data, num_sub_tasks=4)  # 将大规模数据分割成子数据集
+    sub_datasets = split_large_data(input_data, num_sub_tasks=state.get("num_sub_tasks", 4))  # 将大规模数据分割成子数据集
 
-    print(f"🔄 分割节点: 将 {len(input_data)} 个文档分割成 {len(sub_datasets)} 个子数据集")
+    logger.info(f"🔄 分割节点: 将 {len(input_data)} 个文档分割成 {len(sub_datasets)} 个子数据集")
     for i, sub_dataset in enumerate(sub_datasets):
-        print(f"📦 子数据集 {i}: {len(sub_dataset)} 个文档")
+        logger.info(f"📦 子数据集 {i}: {len(sub_dataset)} 个文档")
 
     return {"sub_datasets": sub_datasets}
 
@@ -43,15 +61,15 @@ def route_to_map_nodes(state: OverallState):
     """路由函数：根据分割的数据创建 Send 对象"""
     sub_datasets = state["sub_datasets"]
 
-    print(f"🔀 路由函数: 创建 {len(sub_datasets)} 个并行任务")
+    logger.info(f"🔀 路由函数: 创建 {len(sub_datasets)} 个并行任务")
 
     send_list = []
     for i, sub_dataset in enumerate(sub_datasets):  # 遍历每个子数据集
         send_list.append(
-            Send("map_node", {"sub_data": sub_dataset})  # 为每个子数据集创建一个 Send 对象
+            Send("map_node", {"sub_data": sub_dataset, "shard": i, "mode": state.get("mode", "exact")})  # 为每个子数据集创建一个 Send 对象
         )
 
-    print(f"✅ 路由完成: 创建了 {len(send_list)} 个 Send 对象")
+    logger.info(f"✅ 路由完成: 创建了 {len(send_list)} 个 Send 对象")
     return send_list  # 返回 Send 对象列表，用于动态路由到多个 Map 节点实例
 
 def process_sub_data(sub_data: List[str]) -> dict:
@@ -74,14 +92,39 @@ def process_sub_data(sub_data: List[str]) -> dict:
         "unique_words": len(word_count)
     }
 
+# 近似模式下每批文档先在本地 Counter 里合并，再写入 sketch，减少哈希次数；内存只和批大小有关
+SKETCH_BATCH_DOCS = 1000
+
+def process_sub_data_approx(sub_data: List[str]) -> dict:
+    """近似模式的 Map：把子数据集的词频写入一个固定大小的 FrequencySketch"""
+    sketch = FrequencySketch()
+    total_chars = 0
+    for start in range(0, len(sub_data), SKETCH_BATCH_DOCS):
+        batch = Counter()
+        for doc in sub_data[start:start + SKETCH_BATCH_DOCS]:
+            batch.update(re.findall(r'\b\w+\b', doc.lower()))
+            total_chars += len(doc)
+        sketch.update(batch.items())
+
+    return {
+        "sketch": sketch,
+        "doc_count": len(sub_data),
+        "total_chars": total_chars,
+        "unique_words": sketch.cardinality()
+    }
+
 def map_node(state: MapState):
     """Map 节点函数，输入状态为 MapState"""
     sub_data = state["sub_data"]  # 从状态中获取子任务数据
-    print(f"🔧 Map 节点: 开始处理 {len(sub_data)} 个文档")
+    logger.info(f"🔧 Map 节点: 开始处理 {len(sub_data)} 个文档")
 
-    intermediate_result = process_sub_data(sub_data)  # 处理子任务数据，生成中间结果
+    if state.get("mode", "exact") == "approximate":
+        intermediate_result = process_sub_data_approx(sub_data)
+    else:
+        intermediate_result = process_sub_data(sub_data)  # 处理子任务数据，生成中间结果
+    intermediate_result["shard"] = state.get("shard", 0)
 
-    print(f"✅ Map 节点: 处理完成，找到 {intermediate_result['unique_words']}个不同单词")
+    logger.info(f"✅ Map 节点: 处理完成，找到 {intermediate_result['unique_words']}个不同单词")
 
     return {"intermediate_results": [intermediate_result]}  # 返回中间结果，用于后续 Reduce 阶段聚合
 
@@ -100,6 +143,7 @@ def aggregate_results(intermediate_results: List[dict]) -> dict:
             global_word_count[word] = global_word_count.get(word, 0) + count
 
     # 找出最高频和最低频的词
+    sorted_words = []
     if global_word_count:
         sorted_words = sorted(global_word_count.items(), key=lambda x: x[1],
 reverse=True)
@@ -119,25 +163,58 @@ reverse=True)
         "word_distribution": dict(sorted_words[:10])  # 只保留前10个高频词
     }
 
+def aggregate_results_approx(intermediate_results: List[dict], top_k: int = 10) -> dict:
+    """合并各分片的 sketch，生成近似的最终结果
+
+    总文档数、总字符数和总词数是精确的；不同词数、最高频词和高频词频次是估计值，
+    误差上界见 error_bounds。sketch 不保留低频词，所以没有最低频词 (least_common_word 为 None)。
+    """
+    # 合并进一个新的 sketch：分片的 sketch 是通道值（也可能在节点缓存里），不能原地修改
+    sketches = [result["sketch"] for result in intermediate_results]
+    merged = sketches[0].empty_like() if sketches else FrequencySketch()
+    total_docs = 0
+    total_chars = 0
+    for result, sketch in zip(intermediate_results, sketches):
+        total_docs += result["doc_count"]
+        total_chars += result["total_chars"]
+        merged.merge(sketch)
+
+    top = merged.top(top_k)
+    return {
+        "total_documents": total_docs,
+        "total_characters": total_chars,
+        "total_unique_words": merged.cardinality(),
+        "total_words": merged.total,
+        "most_common_word": top[0] if top else ("", 0),
+        "least_common_word": None,
+        "word_distribution": dict(top),
+        "approximate": True,
+        "error_bounds": merged.error_bounds(),
+        "sketch_bytes": merged.memory_bytes()
+    }
+
 def reduce_node(state: OverallState):
     """Reduce 节点函数，输入状态为 OverallState"""
     intermediate_results = state["intermediate_results"]  # 从状态中获取 Map 阶段生成的中间结果列表
 
-    print(f"🔄 Reduce 节点: 汇聚 {len(intermediate_results)} 个中间结果")
+    logger.info(f"🔄 Reduce 节点: 汇聚 {len(intermediate_results)} 个中间结果")
 
-    final_result = aggregate_results(intermediate_results)  # 聚合中间结果，生成最终结果
+    if state.get("mode", "exact") == "approximate":
+        final_result = aggregate_results_approx(intermediate_results)
+    else:
+        final_result = aggregate_results(intermediate_results)  # 聚合中间结果，生成最终结果
 
-    print(f"✅ Reduce 完成: 汇总了 {final_result['total_documents']} 个文档")
+    logger.info(f"✅ Reduce 完成: 汇总了 {final_result['total_documents']} 个文档")
 
     return {"final_result": final_result}  # 返回最终结果
 
 # 构建 MapReduce 图
-print("🏗️ 构建标准 MapReduce 图...")
 builder = StateGraph(OverallState)
 
 # 添加节点
 builder.add_node("split_node", split_input_data)
-builder.add_node("map_node", map_node)
+# Map 结果只取决于分片内容、序号和统计模式：重新运行同一语料时命中缓存的分片直接跳过
+builder.add_node("map_node", map_node, cache_policy=node_cache_policy("sub_data", "shard", "mode"))
 builder.add_node("reduce_node", reduce_node)
 
 # 连接 MapReduce 流程中的节点和边
@@ -153,8 +230,7 @@ builder.add_edge("map_node", "reduce_node")
 # Reduce 节点 -> END (普通边)
 builder.add_edge("reduce_node", END)
 
-mapreduce_graph = builder.compile()
-print("✅ 图构建完成！")
+mapreduce_graph = builder.compile(cache=make_node_cache("mapreduce"))
 
 # 测试数据：模拟大规模文档数据
 large_documents = [
@@ -172,30 +248,32 @@ large_documents = [
     "Advanced error handling and retry mechanisms ensure robust system operation."
 ]
 
-print("\n=== 🚀 MapReduce 大规模文档处理演示 ===")
-print(f"📄 输入文档数量: {len(large_documents)}")
-print(f"📊 使用 Send API 实现动态任务分发")
-print(f"🔄 MapReduce 流程: 分割 -> 并行映射 -> 归约")
-print("\n" + "="*60)
-
-# 执行 MapReduce 流程
-result = mapreduce_graph.invoke({
-    "large_input_data": large_documents,
-    "sub_datasets": [],
-    "intermediate_results": [],
-    "final_result": {}
-})
-
-print("="*60)
-print("\n=== ✨ MapReduce 处理结果 ===")
-final_result = result["final_result"]
-print(f"📊 总文档数: {final_result['total_documents']}")
-print(f"📝 总字符数: {final_result['total_characters']}")
-print(f"🔤 不同单词数: {final_result['total_unique_words']}")
-print(f"🔢 总单词数: {final_result['total_words']}")
-print(f"🏆 最高频词: '{final_result['most_common_word'][0]}' ({final_result['most_common_word'][1]} 次)")
-print(f"🥉 最低频词: '{final_result['least_common_word'][0]}' ({final_result['least_common_word'][1]} 次)")
-
-print(f"\n📈 高频词汇 TOP 10:")
-for word, count in final_result['word_distribution'].items():
-    print(f"  📌 {word}: {count}")
\ No newline at end of file
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    print("\n=== 🚀 MapReduce 大规模文档处理演示 ===")
+    print(f"📄 输入文档数量: {len(large_documents)}")
+    print(f"📊 使用 Send API 实现动态任务分发")
+    print(f"🔄 MapReduce 流程: 分割 -> 并行映射 -> 归约")
+    print("\n" + "="*60)
+
+    # 执行 MapReduce 流程
+    result = mapreduce_graph.invoke({
+        "large_input_data": large_documents,
+        "sub_datasets": [],
+        "intermediate_results": [],
+        "final_result": {}
+    })
+
+    print("="*60)
+    print("\n=== ✨ MapReduce 处理结果 ===")
+    final_result = result["final_result"]
+    print(f"📊 总文档数: {final_result['total_documents']}")
+    print(f"📝 总字符数: {final_result['total_characters']}")
+    print(f"🔤 不同单词数: {final_result['total_unique_words']}")
+    print(f"🔢 总单词数: {final_result['total_words']}")
+    print(f"🏆 最高频词: '{final_result['most_common_word'][0]}' ({final_result['most_common_word'][1]} 次)")
+    print(f"🥉 最低频词: '{final_result['least_common_word'][0]}' ({final_result['least_common_word'][1]} 次)")
+
+    print(f"\n📈 高频词汇 TOP 10:")
+    for word, count in final_result['word_distribution'].items():
+        print(f"  📌 {word}: {count}")
@@ -1,5 +1,6 @@
 # Import necessary libraries
 import os
+import sys
 import json
 import asyncio
 from typing import List, Dict, Any
@@ -15,8 +16,14 @@ from openai import AsyncOpenAI
 from dotenv import load_dotenv
 import os
 
+# Tracing shared with the backend: OTEL_TRACING=otlp|file|console exports spans for
+# MCP calls and completions, otherwise the tracer is a no-op
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend import tracing
+
 # Load environment variables and set OpenAI API key
 load_dotenv()
+tracer = tracing.get_tracer("mcp_client")
 
 # Initialize the OpenAI client
 client = AsyncOpenAI(base_url=os.getenv("OPENAI_API_BASE"), api_key=os.getenv("OPENAI_API_KEY"))
@@ -25,6 +32,19 @@ client = AsyncOpenAI(base_url=os.getenv("OPENAI_API_BASE"), api_key=os.getenv("O
 mcp_server_path = "E:\\LLM_IN_ACTION\\Langgraph_in_action\\mcp-crypto-server\\mcp_server.py"
 print("Setup complete!")
 
+async def create_completion(**kwargs):
+    """chat.completions.create inside a span that records the model and token usage"""
+    model = kwargs["model"]
+    with tracer.start_as_current_span(
+        f"chat {model}",
+        attributes={"gen_ai.operation.name": "chat", "gen_ai.request.model": model},
+    ) as span:
+        response = await client.chat.completions.create(**kwargs)
+        if response.usage is not None:
+            span.set_attribute("gen_ai.usage.input_tokens", response.usage.prompt_tokens)
+            span.set_attribute("gen_ai.usage.output_tokens", response.usage.completion_tokens)
+        return response
+
 async def discover_tools():
     """
     Connect to the MCP server and discover available tools.
@@ -50,11 +70,13 @@ async def discover_tools():
         async with ClientSession(read, write) as session:
             # Initialize the connection
             print(f"{BLUE}📡 Initializing MCP connection...{RESET}")
-            await session.initialize()
+            with tracer.start_as_current_span("mcp initialize"):
+                await session.initialize()
             
             # List the available tools
             print(f"{BLUE}🔎 Discovering available tools...{RESET}")
-            tools = await session.list_tools()
+            with tracer.start_as_current_span("mcp tools/list", attributes={"mcp.method.name": "tools/list"}):
+                tools = await session.list_tools()
             
             # Format the tools information for easier viewing
             tool_info = []
@@ -101,11 +123,18 @@ async def execute_tool(tool_name: str, arguments: Dict[str, Any]):
     
     async with stdio_client(server_params) as (read, write):
         async with ClientSession(read, write) as session:
-            await session.initialize()
+            # Each call starts its own server process; this span shows what that costs
+            with tracer.start_as_current_span("mcp initialize"):
+                await session.initialize()
             
             # Call the specific tool with the provided arguments
             print(f"{BLUE}📡 Sending request to MCP server...{RESET}")
-            result = await session.call_tool(tool_name, arguments)
+            with tracer.start_as_current_span(
+                f"execute_tool {tool_name}",
+                attributes={"gen_ai.operation.name": "execute_tool", "gen_ai.tool.name": tool_name, "mcp.method.name": "tools/call"},
+            ) as span:
+                result = await session.call_tool(tool_name, arguments)
+                span.set_attribute("mcp.tool.is_error", bool(getattr(result, "isError", False)))
             
             print(f"{GREEN}✅ Tool execution complete{RESET}")
             
@@ -183,7 +212,7 @@ async def query_claude(prompt: str, tool_info: List[Dict], previous_messages=Non
     print(f"{BLUE}📡 Sending request to OpenAI API...{RESET}")
     
     # Send the request to openai model with system as a top-level parameter
-    response = await client.chat.completions.create(
+    response = await create_completion(
         model="Qwen/Qwen3-8B",  # 注意：Qwen 官方兼容名称（需和网关匹配）
         max_tokens=4000,
         messages=[  # system prompt 需合并到 messages 列表中（OpenAI 标准格式）
@@ -230,7 +259,7 @@ async def query_claude(prompt: str, tool_info: List[Dict], previous_messages=Non
                 print(f"{PURPLE}🔄 Getting Model's interpretation of the tool result...{RESET}")
                 
                 # Get Model's interpretation of the tool result
-                final_response = await client.chat.completions.create(
+                final_response = await create_completion(
                     model="Qwen/Qwen3-8B",  # 注意：Qwen 官方兼容名称（需和网关匹配）
                     max_tokens=4000,
                     messages=[  # system prompt 需合并到 messages 列表中（OpenAI 标准格式）
@@ -260,8 +289,13 @@ if __name__ == "__main__":  # 推荐加这个，避免导入时执行
         # Run a single query using the tools from your MCP server
         query = "What is the current price of Bitcoin?"
         print(f"Sending query: {query}")
-        tools = asyncio.run(discover_tools())
-        response, messages = asyncio.run(query_claude(query, tools))
+        tracing.configure()
+        # asyncio.run copies the current context, so both phases are children of this span
+        with tracer.start_as_current_span("mcp_client query", attributes={"mcp.query": query}):
+            tools = asyncio.run(discover_tools())
+            response, messages = asyncio.run(query_claude(query, tools))
         print(f"\nAssistant's response:\n{response}")
     except Exception as e:
-        print(f"\033[91m❌ Error: {e}\033[0m")
\ No newline at end of file
+        print(f"\033[91m❌ Error: {e}\033[0m")
+    finally:
+        tracing.shutdown()
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""
+滚动摘要压缩节点 (Rolling Summarization Compaction)
+
+trim_messages / RemoveMessage 只能丢弃旧消息，丢掉的上下文就彻底没了。
+这里的压缩节点在消息总 token 数超过阈值时，把窗口之外的旧消息折叠进一条
+"运行中摘要" SystemMessage，并为被折叠的原始消息发出 RemoveMessage，
+这样无限期运行的会话中，状态大小和每次调用的 prompt token 数都保持有界。
+"""
+from typing import Callable, List, Optional, Sequence
+
+from langchain_core.messages import (
+    BaseMessage,
+    HumanMessage,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.graph import MessagesState
+
+# 摘要消息通过 additional_kwargs 中的标记识别（其 id 会复用被折叠消息的 id）
+SUMMARY_MARKER = "running_summary"
+
+DEFAULT_SUMMARY_PROMPT = (
+    "你是一个对话摘要助手。请把已有摘要和新的对话片段合并成一份简洁的摘要，"
+    "保留用户的目标、关键事实、已做出的决定和未解决的问题，不超过 {max_words} 字。"
+)
+
+
+def message_text(msg: BaseMessage) -> str:
+    """提取消息中的纯文本内容（兼容多模态的 list 形式 content）"""
+    if isinstance(msg.content, str):
+        return msg.content
+    parts = []
+    for block in msg.content:
+        if isinstance(block, str):
+            parts.append(block)
+        elif isinstance(block, dict) and block.get("type") == "text":
+            parts.append(block.get("text", ""))
+    return "".join(parts)
+
+
+def is_summary_message(msg: BaseMessage) -> bool:
+    """判断一条消息是否为运行中摘要"""
+    return isinstance(msg, SystemMessage) and bool(msg.additional_kwargs.get(SUMMARY_MARKER))
+
+
+def _split_history(messages: Sequence[BaseMessage], keep_last: int):
+    """把消息历史拆分为 (固定系统消息, 已有摘要, 可折叠消息, 保留窗口)"""
+    pinned: List[BaseMessage] = []
+    summary: Optional[BaseMessage] = None
+    body: List[BaseMessage] = []
+
+    for msg in messages:
+        if is_summary_message(msg):
+            summary = msg
+        elif isinstance(msg, SystemMessage) and not body:
+            # 开头的系统提示词始终保留，不参与折叠
+            pinned.append(msg)
+        else:
+            body.append(msg)
+
+    cut = max(0, len(body) - keep_last)
+    # 保留窗口不能以 ToolMessage 开头，否则会把工具调用和工具结果拆散
+    # （keep_last=0 时 cut == len(body)，窗口为空，不需要调整）
+    while 0 < cut < len(body) and isinstance(body[cut], ToolMessage):
+        cut -= 1
+
+    return pinned, summary, body[:cut], body[cut:]
+
+
+def make_compaction_node(
+    llm,
+    *,
+    keep_last: int = 6,
+    max_tokens_before_compaction: int = 1000,
+    token_counter: Callable[[Sequence[BaseMessage]], int] = count_tokens_approximately,
+    max_summary_words: int = 200,
+    summary_prompt: str = DEFAULT_SUMMARY_PROMPT,
+):
+    """创建滚动摘要压缩节点
+
+    Args:
+        llm: 用于生成摘要的模型（任何支持 invoke(messages) 的对象）
+        keep_last: 始终原样保留的最近消息条数
+        max_tokens_before_compaction: 消息总 token 数超过该阈值时才触发压缩
+        token_counter: token 计数函数，默认使用近似计数
+        max_summary_words: 摘要的目标长度上限
+        summary_prompt: 摘要系统提示词，可使用 {max_words} 占位符
+
+    Returns:
+        可直接用于 StateGraph(MessagesState) 的节点函数
+    """
+
+    def compact_messages(state: MessagesState):
+        print("\n🗜️ 压缩节点 (滚动摘要)")
+        messages = state["messages"]
+        total_tokens = token_counter(messages)
+
+        if total_tokens <= max_tokens_before_compaction:
+            print(f"✅ 当前 {total_tokens} tokens，未超过阈值 {max_tokens_before_compaction}，无需压缩")
+            return {}
+
+        pinned, summary, folded, window = _split_history(messages, keep_last)
+        if not folded:
+            print(f"✅ 超过阈值但没有窗口外的消息可折叠 (保留窗口 {len(window)} 条)")
+            return {}
+
+        print(f"📊 当前 {total_tokens} tokens，超过阈值 {max_tokens_before_compaction}，折叠 {len(folded)} 条旧消息")
+
+        transcript = "\n".join(f"{msg.type}: {message_text(msg)}" for msg in folded)
+        previous = message_text(summary) if summary is not None else "（无）"
+        summary_response = llm.invoke([
+            SystemMessage(content=summary_prompt.format(max_words=max_summary_words)),
+            HumanMessage(content=f"已有摘要：\n{previous}\n\n新的对话片段：\n{transcript}"),
+        ])
+
+        # 已有摘要原地替换；首次压缩时复用第一条被折叠消息的 id，使摘要落在窗口之前
+        summary_id = summary.id if summary is not None else folded[0].id
+        new_summary = SystemMessage(
+            content=f"此前对话摘要：{message_text(summary_response)}",
+            additional_kwargs={SUMMARY_MARKER: True},
+            id=summary_id,
+        )
+        removals = [RemoveMessage(id=msg.id) for msg in folded if msg.id != summary_id]
+
+        print(f"📝 摘要已更新，保留 {len(pinned)} 条系统消息 + 1 条摘要 + {len(window)} 条最近消息")
+        return {"messages": [new_summary, *removals]}
+
+    return compact_messages
@@ -0,0 +1,146 @@
+"""
+可配置的消息过滤规则引擎
+
+原来的 filter_node 每次调用都会把整个历史逐条 lower() 后做嵌套的子串扫描。
+这里把所有关键词集合编译成一条交替正则（一次扫描即可命中任意关键词），
+再配合长度、角色和"年龄"（距最新消息的位置）规则；同时记住每个会话已经
+评估过的消息 id，每一轮只检查新增消息，过滤开销为 O(新消息数)。
+"""
+import re
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+from langchain_core.messages import BaseMessage, RemoveMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import MessagesState
+
+from message_compaction import message_text
+
+DEFAULT_THREAD = "__default__"
+
+
+class MessageFilter:
+    """编译后的消息过滤规则集合
+
+    Args:
+        keyword_sets: {规则名: 关键词列表}，命中任意关键词的消息会被移除（忽略大小写）
+        max_length: 内容长度超过该值的消息会被移除
+        drop_roles: 需要移除的消息类型，如 ("tool",)
+        max_age: 只保留最近 max_age 条消息，更早的消息按位置老化移除
+        keep_roles: 永不移除的消息类型，默认保留系统提示词和滚动摘要
+        max_threads: 最多为多少个会话记录"已评估消息"，超出后淘汰最久未使用的会话
+    """
+
+    def __init__(
+        self,
+        *,
+        keyword_sets: Optional[Mapping[str, Iterable[str]]] = None,
+        max_length: Optional[int] = None,
+        drop_roles: Sequence[str] = (),
+        max_age: Optional[int] = None,
+        keep_roles: Sequence[str] = ("system",),
+        max_threads: int = 10_000,
+    ):
+        self.max_length = max_length
+        self.drop_roles = frozenset(drop_roles)
+        self.max_age = max_age
+        self.keep_roles = frozenset(keep_roles)
+        self.max_threads = max_threads
+        self._pattern, self._group_names = self._compile(keyword_sets or {})
+        self._seen: "OrderedDict[str, Set[str]]" = OrderedDict()
+
+    @staticmethod
+    def _compile(keyword_sets: Mapping[str, Iterable[str]]):
+        """把所有关键词集合编译成一条带命名分组的交替正则"""
+        groups = []
+        group_names: Dict[str, str] = {}
+        for i, (name, keywords) in enumerate(keyword_sets.items()):
+            # 长关键词优先，避免被较短的前缀抢先匹配
+            words = sorted({k for k in keywords if k}, key=len, reverse=True)
+            if not words:
+                continue
+            group = f"g{i}"
+            group_names[group] = name
+            groups.append(f"(?P<{group}>{'|'.join(re.escape(w) for w in words)})")
+        if not groups:
+            return None, group_names
+        return re.compile("|".join(groups), re.IGNORECASE), group_names
+
+    def check(self, msg: BaseMessage) -> Optional[str]:
+        """对单条消息应用内容规则，返回移除原因；不需要移除时返回 None"""
+        if msg.type in self.keep_roles:
+            return None
+        if msg.type in self.drop_roles:
+            return f"角色 {msg.type}"
+        text = message_text(msg)
+        if self._pattern is not None:
+            match = self._pattern.search(text)
+            if match:
+                return f"关键词 [{self._group_names[match.lastgroup]}] '{match.group(0)}'"
+        if self.max_length is not None and len(text) > self.max_length:
+            return f"过长 ({len(text)} > {self.max_length})"
+        return None
+
+    def _seen_ids(self, thread_id: str) -> Set[str]:
+        seen = self._seen.get(thread_id)
+        if seen is None:
+            seen = self._seen[thread_id] = set()
+            if len(self._seen) > self.max_threads:
+                self._seen.popitem(last=False)
+        else:
+            self._seen.move_to_end(thread_id)
+        return seen
+
+    def select(
+        self, messages: Sequence[BaseMessage], thread_id: str = DEFAULT_THREAD
+    ) -> List[Tuple[BaseMessage, str]]:
+        """找出需要移除的消息及原因，只对上一轮之后新增的消息应用内容规则"""
+        seen = self._seen_ids(thread_id)
+
+        # 从尾部向前找到最后一条已评估过的消息，其后的都是新消息
+        start = len(messages)
+        while start > 0 and messages[start - 1].id not in seen:
+            start -= 1
+
+        removals: List[Tuple[BaseMessage, str]] = []
+        removing: Set[str] = set()
+        for msg in messages[start:]:
+            seen.add(msg.id)
+            reason = self.check(msg)
+            if reason:
+                removals.append((msg, reason))
+                removing.add(msg.id)
+
+        # 年龄规则：超出最近 max_age 条的消息按位置老化，之前的轮次已经移除过更早的消息
+        if self.max_age is not None:
+            for msg in messages[: max(0, len(messages) - self.max_age)]:
+                if msg.type not in self.keep_roles and msg.id not in removing:
+                    removals.append((msg, f"超出最近 {self.max_age} 条"))
+                    removing.add(msg.id)
+
+        # 被移除的消息不会再出现，从已评估集合中清掉，保持集合大小与历史长度同阶
+        seen.difference_update(removing)
+        return removals
+
+    def removals(
+        self, messages: Sequence[BaseMessage], thread_id: str = DEFAULT_THREAD
+    ) -> List[RemoveMessage]:
+        """返回需要发出的 RemoveMessage 列表"""
+        return [RemoveMessage(id=msg.id) for msg, _ in self.select(messages, thread_id)]
+
+
+def thread_id_from_config(config: Optional[RunnableConfig]) -> str:
+    """从运行配置中取出 thread_id，没有检查点时所有调用共用一个默认会话"""
+    if not config:
+        return DEFAULT_THREAD
+    return config.get("configurable", {}).get("thread_id", DEFAULT_THREAD)
+
+
+def make_filter_node(message_filter: MessageFilter):
+    """把 MessageFilter 包装成可直接用于 StateGraph(MessagesState) 的节点"""
+
+    def filter_messages(state: MessagesState, config: RunnableConfig):
+        remove_messages = message_filter.removals(state["messages"], thread_id_from_config(config))
+        return {"messages": remove_messages} if remove_messages else {}
+
+    return filter_messages
@@ -2,7 +2,10 @@ from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, trim
 from langgraph.graph import MessagesState, StateGraph, START, END
 from langchain_openai import ChatOpenAI
 from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import RunnableConfig
 from dotenv import load_dotenv
+from message_compaction import make_compaction_node
+from message_filters import MessageFilter, thread_id_from_config
 
 load_dotenv()
 
@@ -36,24 +39,22 @@ def llm_node_with_trim(state: MessagesState):
 
     return {"messages": [llm_response]}
 
-# 使用 filter_messages 的节点 (基于 RemoveMessage)
-def filter_node(state: MessagesState):
+# 消息过滤规则：关键词集合编译成一条正则，只检查上一轮之后新增的消息
+message_filter = MessageFilter(
+    keyword_sets={"寒暄": ["你好", "再见", "hello", "bye"]},  # 移除寒暄消息
+    max_length=100,                                           # 移除过长的消息
+)
+
+# 使用过滤规则引擎的节点 (基于 RemoveMessage)
+def filter_node(state: MessagesState, config: RunnableConfig):
     print("\n🔧 过滤节点 (使用 RemoveMessage)")
     message_history = state['messages']
     print(f"📥 接收到 {len(message_history)} 条消息")
 
     remove_messages = []
-
-    # 过滤策略：移除包含"你好"或"再见"的寒暄消息
-    for msg in message_history:
-        if any(greeting in msg.content.lower() for greeting in ["你好",
-"再见", "hello", "bye"]):
-            print(f"🗑️ 标记移除寒暄消息: {msg.content[:30]}...")
-            remove_messages.append(RemoveMessage(id=msg.id))
-        # 移除过长的消息
-        elif len(msg.content) > 100:
-            print(f"🗑️ 标记移除过长消息: {msg.content[:30]}...")
-            remove_messages.append(RemoveMessage(id=msg.id))
+    for msg, reason in message_filter.select(message_history, thread_id_from_config(config)):
+        print(f"🗑️ 标记移除消息 ({reason}): {msg.content[:30]}...")
+        remove_messages.append(RemoveMessage(id=msg.id))
 
     if remove_messages:
         print(f"📊 将移除 {len(remove_messages)} 条消息")
@@ -62,6 +63,13 @@ def filter_node(state: MessagesState):
         print("✅ 没有需要移除的消息")
         return {}
 
+# 使用滚动摘要的压缩节点：超过 token 阈值时，把窗口外的旧消息折叠成一条摘要
+compact_node = make_compaction_node(
+    llm,
+    keep_last=2,                       # 始终保留最近 2 条消息
+    max_tokens_before_compaction=60,   # 降低阈值以便看到压缩效果
+)
+
 # 添加用户消息的节点
 def add_user_message(state: MessagesState):
     print("\n👤 添加用户消息节点")
@@ -76,50 +84,53 @@ builder = StateGraph(MessagesState)
 # 添加节点
 builder.add_node("add_message", add_user_message)
 builder.add_node("filter", filter_node)
+builder.add_node("compact", compact_node)
 builder.add_node("llm_trim", llm_node_with_trim)
 
 # 定义边
 builder.add_edge(START, "add_message")
 builder.add_edge("add_message", "filter")
-builder.add_edge("filter", "llm_trim")
+builder.add_edge("filter", "compact")
+builder.add_edge("compact", "llm_trim")
 builder.add_edge("llm_trim", END)
 
 # 编译图
 graph = builder.compile()
 print("✅ 图构建完成！")
 
-# 准备初始消息历史
-print("\n=== 🚀 消息状态管理示例 ===")
-
-initial_messages = [
-    SystemMessage(content="你是一个专业的AI助手，擅长回答各种问题。"),
-    HumanMessage(content="你好！很高兴见到你。"),
-    AIMessage(content="你好！我也很高兴为您服务。有什么可以帮助您的吗？"),
-    HumanMessage(content="这是一条很长很长很长很长很长很长很长很长很长很长很长很长很长很长很长很长很长很长的测试消息，用来测试过滤功能。"),
-    AIMessage(content="我明白了您的测试消息。"),
-    HumanMessage(content="再见！"),
-]
-
-print("📋 初始消息历史:")
-for i, msg in enumerate(initial_messages):
-    content_preview = msg.content[:40] + "..." if len(msg.content) > 40 else msg.content
-    print(f"  {i+1}. [{msg.__class__.__name__}] {content_preview}")
-
-# 运行图
-result = graph.invoke({"messages": initial_messages})
+if __name__ == "__main__":
+    # 准备初始消息历史
+    print("\n=== 🚀 消息状态管理示例 ===")
+
+    initial_messages = [
+        SystemMessage(content="你是一个专业的AI助手，擅长回答各种问题。"),
+        HumanMessage(content="你好！很高兴见到你。"),
+        AIMessage(content="你好！我也很高兴为您服务。有什么可以帮助您的吗？"),
+        HumanMessage(content="这是一条很长很长很长很长很长很长很长很长很长很长很长很长很长很长很长很长很长很长的测试消息，用来测试过滤功能。"),
+        AIMessage(content="我明白了您的测试消息。"),
+        HumanMessage(content="再见！"),
+    ]
+
+    print("📋 初始消息历史:")
+    for i, msg in enumerate(initial_messages):
+        content_preview = msg.content[:40] + "..." if len(msg.content) > 40 else msg.content
+        print(f"  {i+1}. [{msg.__class__.__name__}] {content_preview}")
 
-print(f"\n=== ✨ 最终结果 ===")
-print(f"📊 最终消息历史包含 {len(result['messages'])} 条消息:")
-for i, msg in enumerate(result['messages']):
-    content_preview = msg.content[:50] + "..." if len(msg.content) > 50 else msg.content
-    print(f"  {i+1}. [{msg.__class__.__name__}] {content_preview}")
+    # 运行图
+    result = graph.invoke({"messages": initial_messages})
 
+    print(f"\n=== ✨ 最终结果 ===")
+    print(f"📊 最终消息历史包含 {len(result['messages'])} 条消息:")
+    for i, msg in enumerate(result['messages']):
+        content_preview = msg.content[:50] + "..." if len(msg.content) > 50 else msg.content
+        print(f"  {i+1}. [{msg.__class__.__name__}] {content_preview}")
 
 
 """
  实际工作流程：
 - 添加新的用户消息
 - 过滤不需要的消息
+- 超过 token 阈值时把旧消息折叠成滚动摘要
 - 使用修剪后的消息生成 LLM 回复
 - 展示完整的消息管理流程
 """
\ No newline at end of file
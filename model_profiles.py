@@ -0,0 +1,112 @@
+"""
+按节点分配的模型配置 (model profile)
+
+所有节点共用一个 ChatOpenAI(temperature=0.7) 时，只需要输出一个词的分类节点也会按默认方式生成：
+Qwen3 默认开启思考模式，先输出一大段 <think> 推理，没有输出上限，温度又高，
+回复往往是一整句话，route_query 里 == "Technical" / == "Negative" 的精确比较就匹配不上。
+
+这里定义命名的配置（模型、温度、max_tokens、是否思考、停止序列），节点按名字取用：
+- classifier  分类节点：关闭思考、温度 0、最多 8 个 token，输出再经 normalize_label 规整成标签
+- classifier_retry  classifier 的回复里找不到标签时重试一次：同样的设置，但不限制输出长度
+- responder   回复节点：保持原来的生成设置
+- section     并行生成的行程片段：关闭思考、输出限制在 400 token 以内
+
+思考开关通过 extra_body={"chat_template_kwargs": {"enable_thinking": ...}} 传给服务端，
+只有把 chat_template_kwargs 交给 Qwen3 聊天模板的服务才生效：自部署的 vLLM、SGLang
+（OpenAI 兼容接口）。OpenAI 官方接口、自有参数名的托管服务以及不转发该字段的代理会忽略它，
+这时 max_tokens=8 会在 <think> 里截断回复；分类节点找不到标签时用 classifier_retry 重试一次，
+仍然没有就按对转人工最安全的方式处理（见 customer_support_agent_langgraph.py），不会静默使用默认值。
+这类服务建议用 LLM_PROFILES 去掉 classifier 的 max_tokens。
+
+环境变量 LLM_PROFILES 可以覆盖配置，JSON 格式，例如：
+    LLM_PROFILES='{"classifier": {"model": "Qwen/Qwen3-0.6B"}, "responder": {"max_tokens": 2048}}'
+"""
+import json
+import os
+import re
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+from langchain_core.runnables import Runnable
+
+from lazy_model import LazyRunnable, lazy_chat_openai
+
+
+class ModelProfile(NamedTuple):
+    model: str
+    temperature: float
+    max_tokens: Optional[int] = None  # None 表示使用服务端默认值
+    thinking: Optional[bool] = None  # None 表示不传，使用模型默认（Qwen3 默认开启）
+    stop: Tuple[str, ...] = ()
+
+    def chat_openai_kwargs(self) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {"model": self.model, "temperature": self.temperature}
+        if self.max_tokens is not None:
+            kwargs["max_tokens"] = self.max_tokens
+        if self.stop:
+            kwargs["stop"] = list(self.stop)
+        if self.thinking is not None:
+            kwargs["extra_body"] = {"chat_template_kwargs": {"enable_thinking": self.thinking}}
+        return kwargs
+
+
+PROFILES: Dict[str, ModelProfile] = {
+    "classifier": ModelProfile("Qwen/Qwen3-8B", temperature=0.0, max_tokens=8, thinking=False),
+    "classifier_retry": ModelProfile("Qwen/Qwen3-8B", temperature=0.0, thinking=False),
+    "responder": ModelProfile("Qwen/Qwen3-8B", temperature=0.7),
+    "section": ModelProfile("Qwen/Qwen3-8B", temperature=0.7, max_tokens=400, thinking=False),
+}
+
+
+def _load_overrides() -> Dict[str, ModelProfile]:
+    profiles = dict(PROFILES)
+    raw = os.getenv("LLM_PROFILES")
+    if raw:
+        overrides = json.loads(raw)
+        for name, fields in overrides.items():
+            if "stop" in fields:
+                fields["stop"] = tuple(fields["stop"] or ())
+            base = profiles.get(name, PROFILES["responder"])
+            profiles[name] = base._replace(**fields)
+        # 重试配置默认跟随 classifier（例如换成更小的模型），只去掉输出上限
+        if "classifier" in overrides and "classifier_retry" not in overrides:
+            profiles["classifier_retry"] = profiles["classifier"]._replace(max_tokens=None)
+    return profiles
+
+
+_models: Dict[str, LazyRunnable] = {}
+
+
+def get_profile(name: str) -> ModelProfile:
+    return _load_overrides()[name]
+
+
+def profile_llm(name: str, *, wrap: Optional[Callable[[Runnable], Runnable]] = None) -> LazyRunnable:
+    """按配置名返回（延迟构建的）模型；同一配置的节点共用一个客户端"""
+    if name not in _models:
+        _models[name] = lazy_chat_openai(wrap=wrap, **get_profile(name).chat_openai_kwargs())
+    return _models[name]
+
+
+_THINK = re.compile(r"<think>.*?(</think>|$)", re.S | re.I)
+
+
+def normalize_label(
+    text: str,
+    labels: Union[Sequence[str], Mapping[str, Sequence[str]]],
+    default: Optional[str],
+) -> Optional[str]:
+    """把模型回复规整成标签之一
+
+    去掉 <think> 推理块后，取最早出现的标签（不区分大小写，按整词匹配）；
+    labels 可以是 {标签: 别名列表}，例如 {"Negative": ["负面", "消极"]}。都没找到时返回 default
+    （传 None 可以区分"没有标签"和真正的默认标签）。
+    """
+    aliases = labels if isinstance(labels, Mapping) else {label: () for label in labels}
+    text = _THINK.sub(" ", text)
+    best, best_pos = default, len(text) + 1
+    for label, extra in aliases.items():
+        for word in (label, *extra):
+            match = re.search(rf"\b{re.escape(word)}\b" if word.isascii() else re.escape(word), text, re.I)
+            if match and match.start() < best_pos:
+                best, best_pos = label, match.start()
+    return best
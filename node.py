@@ -9,16 +9,22 @@ from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 from langgraph.graph import StateGraph, START, END
 from langgraph.types import RetryPolicy
 
+from resilience import CircuitOpenError, circuit_breaker, protect, rate_limiter, resilience_stats, retry_on_transient
+
 # 模拟数据库类
 class MockSQLDatabase:
     def __init__(self):
         self.connection_stable = False
         self.call_count = 0
+        self.outage = False  # 模拟数据库整体故障
 
     def run(self, query):
         self.call_count += 1
         print(f"🗄️ 数据库查询 (第{self.call_count}次): {query}")
 
+        if self.outage:
+            raise sqlite3.OperationalError("数据库不可用 (模拟故障)")
+
         # 模拟不稳定的数据库连接 - 前2次调用会失败
         if self.call_count <= 2:
             print(f"❌ 数据库连接失败 (模拟错误)")
@@ -32,11 +38,15 @@ class MockChatOpenAI:
     def __init__(self, model="mock-model"):
         self.model = model
         self.call_count = 0
+        self.outage = False  # 模拟模型网关整体故障
 
     def invoke(self, messages):
         self.call_count += 1
         print(f"🤖 LLM调用 (第{self.call_count}次)")
 
+        if self.outage:
+            raise ConnectionError("LLM网关不可用 (模拟故障)")
+
         # 模拟 LLM 偶尔失败 - 30% 概率失败
         if random.random() < 0.3:
             print(f"❌ LLM服务暂时不可用 (模拟错误)")
@@ -51,6 +61,15 @@ class MockChatOpenAI:
 db = MockSQLDatabase()
 model = MockChatOpenAI(model="Mock-GPT-4")
 
+# 进程级弹性层：每个上游一个熔断器，所有图共用一个令牌桶
+# 失败阈值不小于节点的最大重试次数，偶发失败靠 RetryPolicy 重试，持续故障才会熔断
+llm_breaker = circuit_breaker("llm", failure_threshold=5, recovery_timeout=2.0)
+db_breaker = circuit_breaker("database", failure_threshold=4, recovery_timeout=2.0)
+upstream_limiter = rate_limiter("upstream", rate=20, capacity=5)
+
+guarded_db_run = protect(db_breaker, upstream_limiter)(db.run)
+guarded_model_invoke = protect(llm_breaker, upstream_limiter)(model.invoke)
+
 # 定义图的状态
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], operator.add]
@@ -58,13 +77,13 @@ class AgentState(TypedDict):
 def query_database(state):
     """查询数据库节点 - 配置了特定异常重试"""
     print(f"\n📊 执行数据库查询节点...")
-    query_result = db.run("SELECT * FROM Artist LIMIT 10;")
+    query_result = guarded_db_run("SELECT * FROM Artist LIMIT 10;")
     return {"messages": [AIMessage(content=f"数据库查询结果: {query_result}")]}
 
 def call_model(state):
     """调用模型节点 - 配置了最大重试次数"""
     print(f"\n🧠 执行模型调用节点...")
-    response = model.invoke(state["messages"])
+    response = guarded_model_invoke(state["messages"])
     return {"messages": [response]}
 
 def user_input_node(state):
@@ -90,7 +109,8 @@ builder.add_node(
         initial_interval=0.5,     # 初始重试间隔0.5秒
         backoff_factor=2.0,       # 退避因子2.0 (指数退避)
         max_interval=8.0,         # 最大重试间隔8秒
-        jitter=True              # 添加随机抖动
+        jitter=True,             # 添加随机抖动
+        retry_on=retry_on_transient(),  # 熔断打开时不再重试
     )
 )
 
@@ -99,7 +119,7 @@ builder.add_node(
     "query_database",
     query_database,
     retry=RetryPolicy(
-        retry_on=sqlite3.OperationalError,  # 只对数据库操作错误重试
+        retry_on=retry_on_transient(sqlite3.OperationalError),  # 只对数据库操作错误重试，熔断打开时不重试
         max_attempts=4,                     # 最大重试4次
         initial_interval=1.0,               # 初始间隔1秒
         backoff_factor=1.5                  # 较小的退避因子
@@ -116,27 +136,71 @@ builder.add_edge("query_database", END)
 graph = builder.compile()
 print("✅ 图构建完成！")
 
-# 测试运行
-print("\n=== 🚀 重试策略演示 ===")
-print("📋 测试场景:")
-print("  - 数据库节点: 前2次调用会失败，第3次成功")
-print("  - 模型节点: 30% 概率失败，会自动重试")
-print("  - 两个节点都配置了不同的重试策略\n")
-
-try:
-    # 运行图
-    result = graph.invoke({"messages": []})
-
-    print(f"\n=== ✨ 执行完成 ===")
-    print(f"📊 最终消息数量: {len(result['messages'])}")
-    for i, msg in enumerate(result['messages']):
-        print(f"  {i+1}. [{msg.__class__.__name__}] {msg.content[:60]}...")
-
-    print(f"\n=== 📈 重试统计 ===")
-    print(f"🗄️ 数据库调用次数: {db.call_count}")
-    print(f"🤖 模型调用次数: {model.call_count}")
-
-except Exception as e:
-    print(f"\n❌ 执行失败: {e}")
-    print(f"🗄️ 数据库调用次数: {db.call_count}")
-    print(f"🤖 模型调用次数: {model.call_count}")
\ No newline at end of file
+if __name__ == "__main__":
+    # 测试运行
+    print("\n=== 🚀 重试策略演示 ===")
+    print("📋 测试场景:")
+    print("  - 数据库节点: 前2次调用会失败，第3次成功")
+    print("  - 模型节点: 30% 概率失败，会自动重试")
+    print("  - 两个节点都配置了不同的重试策略\n")
+
+    try:
+        # 运行图
+        result = graph.invoke({"messages": []})
+
+        print(f"\n=== ✨ 执行完成 ===")
+        print(f"📊 最终消息数量: {len(result['messages'])}")
+        for i, msg in enumerate(result['messages']):
+            print(f"  {i+1}. [{msg.__class__.__name__}] {msg.content[:60]}...")
+
+        print(f"\n=== 📈 重试统计 ===")
+        print(f"🗄️ 数据库调用次数: {db.call_count}")
+        print(f"🤖 模型调用次数: {model.call_count}")
+
+    except Exception as e:
+        print(f"\n❌ 执行失败: {e}")
+        print(f"🗄️ 数据库调用次数: {db.call_count}")
+        print(f"🤖 模型调用次数: {model.call_count}")
+
+    print("\n=== 🔌 熔断演示：模型网关故障 ===")
+    runs = 20
+    model.outage = True
+    calls_before = model.call_count
+    results = graph.batch([{"messages": []} for _ in range(runs)], return_exceptions=True)
+    fast_failed = sum(isinstance(r, CircuitOpenError) for r in results)
+    print(f"📉 {runs} 个并发运行，模型实际调用 {model.call_count - calls_before} 次"
+          f"（不熔断时最多 {runs * 5} 次），{fast_failed} 个运行被熔断快速失败")
+    print(f"🔌 LLM 熔断器状态: {llm_breaker.state}")
+
+    print("\n=== 🩺 故障恢复：冷却后半开探测 ===")
+    model.outage = False
+    time.sleep(llm_breaker.recovery_timeout)
+    print(f"🔌 冷却后 LLM 熔断器状态: {llm_breaker.state}")
+    random.seed(0)
+    try:
+        graph.invoke({"messages": []})
+        print("✅ 探测请求成功")
+    except Exception as e:
+        print(f"❌ 探测请求失败: {e!r}")
+    print(f"🔌 LLM 熔断器状态: {llm_breaker.state}")
+
+    print("\n=== 🔌 熔断演示：数据库故障 ===")
+    db.outage = True
+    db_calls_before = db.call_count
+    results = graph.batch([{"messages": []} for _ in range(runs)], return_exceptions=True)
+    fast_failed = sum(isinstance(r, CircuitOpenError) for r in results)
+    print(f"📉 {runs} 个并发运行，数据库实际调用 {db.call_count - db_calls_before} 次"
+          f"（不熔断时最多 {runs * 4} 次），{fast_failed} 个运行被熔断快速失败")
+    print(f"🔌 数据库熔断器状态: {db_breaker.state}")
+
+    print("\n=== 🩺 数据库恢复：冷却后半开探测 ===")
+    db.outage = False
+    time.sleep(db_breaker.recovery_timeout)
+    print(f"🔌 冷却后数据库熔断器状态: {db_breaker.state}")
+    try:
+        graph.invoke({"messages": []})
+        print("✅ 探测请求成功")
+    except Exception as e:
+        print(f"❌ 探测请求失败: {e!r}")
+    print(f"🔌 数据库熔断器状态: {db_breaker.state}")
+    print(f"📊 弹性层统计: {resilience_stats()}")
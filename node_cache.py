@@ -0,0 +1,325 @@
+"""
+节点级结果缓存：按节点声明用哪些输入键作为缓存键，命中时完全跳过节点执行
+
+有些节点只是部分输入的纯函数：categorize / analyze_sentiment 只看 query，
+mapreduce 的 map_node 只看自己的分片，enhanced_subtask_processor 只看子任务输入、城市和温度。
+重试、中断恢复、从检查点重新运行时它们都会被重新计算（包括重新调用 LLM）。
+
+LangGraph 的节点缓存由两部分组成：add_node(..., cache_policy=CachePolicy(...)) 声明缓存策略，
+compile(cache=...) 指定缓存后端。这里提供：
+- node_cache_policy("query", ttl=3600)   用指定的输入键（加上版本号）生成缓存键的 CachePolicy，
+                                          其余键（例如 Send 传入的序号）变化不影响命中
+- MemoryNodeCache                         进程内 LRU 缓存，按序列化后的总字节数限制大小
+- SQLiteNodeCache                         SQLite 缓存 (WAL)，进程重启后仍然有效，多个进程可以共用
+- make_node_cache("customer_support")     按环境变量选择后端：
+                                            NODE_CACHE=memory（默认）/ sqlite / off
+                                            NODE_CACHE_DB=node_cache.sqlite（sqlite 后端的文件）
+- cache_stats()                           每个图、每个节点的命中 / 未命中次数和命中率
+
+缓存的是节点的写入 (writes)，命中时 LangGraph 直接应用这些写入，节点函数、其中的 LLM 调用和回调都不会执行；
+出错或中断 (interrupt) 的节点不会写入缓存。节点逻辑或提示词变化时修改 version 让旧结果失效。
+
+缓存值不使用 pickle：SQLite 缓存文件可以被多个进程共用，读取 pickle 等于执行文件里的任意代码。
+写入中的自定义类型需要用 register_cache_type() 注册编码为 bytes 的方法（例如 FrequencySketch），
+无法序列化的写入不缓存，节点下次照常执行。
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Mapping, Optional, Sequence, Tuple, Type
+
+from langgraph.cache.base import BaseCache, FullKey, Namespace
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.types import CachePolicy
+
+logger = logging.getLogger(__name__)
+
+NODE_CACHE_TTL = int(os.getenv("NODE_CACHE_TTL", "3600"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS node_cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB,
+    expires_at REAL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS idx_node_cache_expires ON node_cache (expires_at);
+"""
+
+
+def node_cache_policy(*keys: str, ttl: Optional[int] = NODE_CACHE_TTL, version: str = "1") -> CachePolicy:
+    """只用 keys 指定的输入键生成缓存键的策略
+
+    Args:
+        keys: 节点输入中决定输出的键，缺失的键按 None 处理
+        ttl: 过期秒数，None 表示不过期
+        version: 节点逻辑变化时修改，使旧的缓存结果失效
+    """
+
+    def key_func(state: Any) -> str:
+        if isinstance(state, Mapping):
+            values = [state.get(key) for key in keys]
+        else:
+            values = [getattr(state, key, None) for key in keys]
+        return json.dumps([version, values], sort_keys=True, ensure_ascii=False, default=str)
+
+    return CachePolicy(key_func=key_func, ttl=ttl)
+
+
+class _NodeStats:
+    """按节点统计缓存查询的命中次数；命名空间的最后一段是节点名"""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def record(self, keys: Sequence[FullKey], found: Mapping[FullKey, Any]) -> None:
+        with self.lock:
+            for key in keys:
+                node = key[0][-1] if key[0] else ""
+                counter = self.hits if key in found else self.misses
+                counter[node] = counter.get(node, 0) + 1
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        with self.lock:
+            report = {}
+            for node in sorted(self.hits.keys() | self.misses.keys()):
+                hits, misses = self.hits.get(node, 0), self.misses.get(node, 0)
+                report[node] = {"hits": hits, "misses": misses, "hit_rate": round(hits / (hits + misses), 4)}
+            return report
+
+
+# 注册过的自定义类型：类 -> (名称, 编码为 bytes, 从 bytes 还原)
+_CUSTOM_TYPES: Dict[type, Tuple[str, Callable[[Any], bytes], Callable[[bytes], Any]]] = {}
+_DECODERS: Dict[str, Callable[[bytes], Any]] = {}
+_TYPE_TAG = "__node_cache_type__"
+
+
+def register_cache_type(cls: Type, encode: Callable[[Any], bytes], decode: Callable[[bytes], Any], name: Optional[str] = None) -> None:
+    """让节点写入中的 cls 实例可以缓存：encode 编码为 bytes，decode 还原"""
+    name = name or f"{cls.__module__}.{cls.__qualname__}"
+    _CUSTOM_TYPES[cls] = (name, encode, decode)
+    _DECODERS[name] = decode
+
+
+def _encode(value: Any) -> Any:
+    custom = _CUSTOM_TYPES.get(type(value))
+    if custom is not None:
+        return {_TYPE_TAG: custom[0], "data": custom[1](value)}
+    # 只展开普通容器（节点写入本身是 deque）；消息、namedtuple 等由 JsonPlusSerializer 自己处理
+    if type(value) is dict:
+        return {key: _encode(item) for key, item in value.items()}
+    if type(value) in (list, deque):
+        return [_encode(item) for item in value]
+    if type(value) is tuple:
+        return tuple(_encode(item) for item in value)
+    return value
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, dict):
+        if _TYPE_TAG in value and len(value) == 2:
+            return _DECODERS[value[_TYPE_TAG]](value["data"])
+        return {key: _decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+class NodeCacheSerializer(JsonPlusSerializer):
+    """JsonPlusSerializer（不回退 pickle）加上 register_cache_type() 注册的自定义类型"""
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        return super().dumps_typed(_encode(obj))
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        return _decode(super().loads_typed(data))
+
+
+def _writes(value: Any) -> Any:
+    # 缓存值是节点写入 [(channel, value), ...]，序列化后元组变成了列表
+    return [tuple(write) for write in value]
+
+
+_SERDE = NodeCacheSerializer()
+
+
+def _dumps_or_skip(serde: SerializerProtocol, key: FullKey, value: Any) -> Optional[Tuple[str, bytes]]:
+    try:
+        return serde.dumps_typed(value)
+    except TypeError as e:
+        logger.warning("节点 %s 的写入无法序列化，不缓存: %s", key[0][-1] if key[0] else "", e)
+        return None
+
+
+class MemoryNodeCache(BaseCache):
+    """进程内 LRU 缓存，序列化后的总大小超过 max_bytes 时淘汰最久未用的条目"""
+
+    serde = _SERDE
+
+    def __init__(self, *, max_bytes: int = 64 * 2 ** 20, serde: Optional[SerializerProtocol] = None):
+        super().__init__(serde=serde)
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.stats = _NodeStats()
+        self._entries: "OrderedDict[FullKey, Tuple[str, bytes, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, keys: Sequence[FullKey]) -> Dict[FullKey, Any]:
+        now = time.time()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                kind, data, expires_at = entry
+                if expires_at is not None and expires_at <= now:
+                    self._remove(key)
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = (kind, data)
+        values = {key: _writes(self.serde.loads_typed(typed)) for key, typed in found.items()}
+        self.stats.record(keys, values)
+        return values
+
+    async def aget(self, keys: Sequence[FullKey]) -> Dict[FullKey, Any]:
+        return self.get(keys)
+
+    def set(self, pairs: Mapping[FullKey, Tuple[Any, Optional[int]]]) -> None:
+        now = time.time()
+        encoded = {}
+        for key, (value, ttl) in pairs.items():
+            typed = _dumps_or_skip(self.serde, key, value)
+            if typed is not None:
+                encoded[key] = (*typed, None if ttl is None else now + ttl)
+        with self._lock:
+            for key, entry in encoded.items():
+                if len(entry[1]) > self.max_bytes:
+                    continue
+                self._remove(key)
+                self._entries[key] = entry
+                self.size += len(entry[1])
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    async def aset(self, pairs: Mapping[FullKey, Tuple[Any, Optional[int]]]) -> None:
+        self.set(pairs)
+
+    def _remove(self, key: FullKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def clear(self, namespaces: Optional[Sequence[Namespace]] = None) -> None:
+        with self._lock:
+            if namespaces is None:
+                self._entries.clear()
+                self.size = 0
+                return
+            cleared = set(map(tuple, namespaces))
+            for key in [key for key in self._entries if key[0] in cleared]:
+                self._remove(key)
+
+    async def aclear(self, namespaces: Optional[Sequence[Namespace]] = None) -> None:
+        self.clear(namespaces)
+
+
+class SQLiteNodeCache(BaseCache):
+    """SQLite 缓存：(命名空间, 键) 为主键，过期条目在读取时跳过、由 prune() 删除"""
+
+    serde = _SERDE
+
+    def __init__(self, db_path: str = "node_cache.sqlite", *, serde: Optional[SerializerProtocol] = None):
+        super().__init__(serde=serde)
+        self.db_path = db_path
+        self.stats = _NodeStats()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _namespace(namespace: Namespace) -> str:
+        return json.dumps(list(namespace), ensure_ascii=False)
+
+    def get(self, keys: Sequence[FullKey]) -> Dict[FullKey, Any]:
+        now = time.time()
+        values = {}
+        with self._lock:
+            for key in keys:
+                row = self._conn.execute(
+                    "SELECT type, value FROM node_cache WHERE namespace = ? AND key = ? "
+                    "AND (expires_at IS NULL OR expires_at > ?)",
+                    (self._namespace(key[0]), key[1], now),
+                ).fetchone()
+                if row is not None:
+                    values[key] = row
+        values = {key: _writes(self.serde.loads_typed(typed)) for key, typed in values.items()}
+        self.stats.record(keys, values)
+        return values
+
+    async def aget(self, keys: Sequence[FullKey]) -> Dict[FullKey, Any]:
+        return self.get(keys)
+
+    def set(self, pairs: Mapping[FullKey, Tuple[Any, Optional[int]]]) -> None:
+        now = time.time()
+        rows = []
+        for full_key, (value, ttl) in pairs.items():
+            typed = _dumps_or_skip(self.serde, full_key, value)
+            if typed is not None:
+                rows.append((self._namespace(full_key[0]), full_key[1], *typed, None if ttl is None else now + ttl))
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO node_cache VALUES (?, ?, ?, ?, ?)", rows)
+
+    async def aset(self, pairs: Mapping[FullKey, Tuple[Any, Optional[int]]]) -> None:
+        self.set(pairs)
+
+    def clear(self, namespaces: Optional[Sequence[Namespace]] = None) -> None:
+        with self._lock:
+            if namespaces is None:
+                self._conn.execute("DELETE FROM node_cache")
+            else:
+                self._conn.executemany(
+                    "DELETE FROM node_cache WHERE namespace = ?", [(self._namespace(ns),) for ns in namespaces]
+                )
+
+    async def aclear(self, namespaces: Optional[Sequence[Namespace]] = None) -> None:
+        self.clear(namespaces)
+
+    def prune(self) -> int:
+        """删除已过期的条目，返回删除的条数"""
+        with self._lock:
+            return self._conn.execute("DELETE FROM node_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+
+
+_caches: Dict[str, BaseCache] = {}
+
+
+def make_node_cache(graph: str, backend: Optional[str] = None) -> Optional[BaseCache]:
+    """为一个图创建缓存后端（NODE_CACHE 环境变量选择），off 时返回 None；命中统计按 graph 汇总"""
+    backend = (backend or os.getenv("NODE_CACHE", "memory")).lower()
+    if backend == "off":
+        return None
+    if backend == "sqlite":
+        cache = SQLiteNodeCache(os.getenv("NODE_CACHE_DB", "node_cache.sqlite"))
+    elif backend == "memory":
+        cache = MemoryNodeCache()
+    else:
+        raise ValueError(f"Unknown NODE_CACHE backend {backend!r}, expected memory, sqlite or off")
+    _caches[graph] = cache
+    return cache
+
+
+def cache_stats() -> Dict[str, Dict[str, Dict[str, float]]]:
+    """{图: {节点: {hits, misses, hit_rate}}}"""
+    return {graph: cache.stats.report() for graph, cache in _caches.items()}
@@ -0,0 +1,321 @@
+"""
+进程级的弹性层：按上游划分的熔断器 + 全局共享的令牌桶限流
+
+RetryPolicy 只作用于单个节点：上游（模型网关、数据库）整体故障时，
+每个并发运行的每个节点都会独立重试，重试把已经过载的上游压得更重。
+这里的熔断器和限流器按名字注册在进程内，所有图共享：
+- CircuitBreaker：连续失败达到阈值后打开，打开期间直接抛出 CircuitOpenError（快速失败，
+  不再访问上游）；冷却时间过后进入半开状态，放行少量探测请求，成功则关闭、失败则重新打开
+- TokenBucket：所有图从同一个桶里取令牌，限制打到上游的总速率（包括重试）
+- retry_on_transient：给 RetryPolicy 用的重试判断，熔断打开时不重试
+
+用法：
+    llm_breaker = circuit_breaker("llm", failure_threshold=3, recovery_timeout=10)
+    limiter = rate_limiter("llm", rate=20)
+
+    @protect(llm_breaker, limiter)
+    def call_llm(messages): ...
+
+    builder.add_node("model", call_model, retry=RetryPolicy(retry_on=retry_on_transient()))
+"""
+import asyncio
+import functools
+import inspect
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Type, Union
+
+from langgraph.types import default_retry_on
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """熔断器处于打开状态，请求未发送到上游"""
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(f"上游 {upstream} 熔断中，{retry_after:.1f} 秒后允许探测")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class RateLimitExceeded(RuntimeError):
+    """在等待时限内没有取到令牌"""
+
+    def __init__(self, name: str, wait: float):
+        super().__init__(f"限流器 {name} 令牌不足，需要再等待 {wait:.2f} 秒")
+        self.name = name
+        self.wait = wait
+
+
+class CircuitBreaker:
+    """单个上游的熔断器（线程安全）
+
+    Args:
+        name: 上游名称，用于错误信息和统计
+        failure_threshold: 关闭状态下连续失败多少次后打开
+        recovery_timeout: 打开后多少秒进入半开状态
+        half_open_max_calls: 半开状态下同时放行的探测请求数
+        failure_exceptions: 计入失败的异常类型，其他异常（例如参数错误）不影响熔断状态
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        failure_exceptions: Tuple[Type[BaseException], ...] = (Exception,),
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.failure_exceptions = failure_exceptions
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._stats = {"calls": 0, "successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def before_call(self) -> None:
+        """请求前调用：熔断打开或半开探测名额已满时抛出 CircuitOpenError"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == OPEN or (state == HALF_OPEN and self._probes >= self.half_open_max_calls):
+                self._stats["rejected"] += 1
+                retry_after = max(0.0, self.recovery_timeout - (now - self._opened_at))
+                raise CircuitOpenError(self.name, retry_after)
+            if state == HALF_OPEN:
+                self._probes += 1
+            self._stats["calls"] += 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._stats["successes"] += 1
+            self._failures = 0
+            self._state = CLOSED
+
+    def release(self) -> None:
+        """放行的请求没有真正发到上游（例如限流超时），归还半开探测名额，不影响熔断状态"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+
+    def record_failure(self, exc: BaseException) -> None:
+        # 限流超时的请求没有发到上游，和不计入失败的异常一样只归还探测名额
+        if isinstance(exc, RateLimitExceeded) or not isinstance(exc, self.failure_exceptions):
+            self.release()
+            return
+        with self._lock:
+            self._stats["failures"] += 1
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._stats["opened"] += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def call(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as exc:
+            self.record_failure(exc)
+            raise
+        self.record_success()
+        return result
+
+    async def acall(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        self.before_call()
+        try:
+            result = await func(*args, **kwargs)
+        except BaseException as exc:
+            self.record_failure(exc)
+            raise
+        self.record_success()
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self._current_state(time.monotonic()), **self._stats}
+
+
+class TokenBucket:
+    """令牌桶限流器（线程安全）
+
+    Args:
+        name: 限流器名称
+        rate: 每秒补充的令牌数
+        capacity: 桶容量（允许的突发量），默认等于 rate
+        max_wait: 单次获取最多等待的秒数，超时抛出 RateLimitExceeded，None 表示一直等待
+    """
+
+    def __init__(self, name: str, *, rate: float, capacity: Optional[float] = None, max_wait: Optional[float] = 30.0):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.max_wait = max_wait
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._stats = {"acquired": 0, "waited": 0, "rejected": 0}
+
+    def _reserve(self, tokens: float) -> float:
+        """取令牌：够用时立即扣除并返回 0，否则返回还需等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self._stats["acquired"] += 1
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def _deadline_wait(self, wait: float, deadline: Optional[float]) -> float:
+        if deadline is not None and time.monotonic() + wait > deadline:
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise RateLimitExceeded(self.name, wait)
+        return wait
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        deadline = None if self.max_wait is None else time.monotonic() + self.max_wait
+        waited = False
+        while wait := self._reserve(tokens):
+            waited = True
+            time.sleep(self._deadline_wait(wait, deadline))
+        if waited:
+            with self._lock:
+                self._stats["waited"] += 1
+
+    async def aacquire(self, tokens: float = 1.0) -> None:
+        deadline = None if self.max_wait is None else time.monotonic() + self.max_wait
+        waited = False
+        while wait := self._reserve(tokens):
+            waited = True
+            await asyncio.sleep(self._deadline_wait(wait, deadline))
+        if waited:
+            with self._lock:
+                self._stats["waited"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"rate": self.rate, "capacity": self.capacity, "tokens": round(self._tokens, 2), **self._stats}
+
+
+# ---------- 进程级注册表：同名的熔断器 / 限流器在所有图之间共享 ----------
+
+_registry_lock = threading.Lock()
+_breakers: Dict[str, CircuitBreaker] = {}
+_limiters: Dict[str, TokenBucket] = {}
+
+
+def circuit_breaker(name: str, **kwargs: Any) -> CircuitBreaker:
+    """获取（首次调用时创建）指定上游的熔断器，参数只在创建时生效"""
+    with _registry_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **kwargs)
+        return _breakers[name]
+
+
+def rate_limiter(name: str = "default", *, rate: float = 10.0, **kwargs: Any) -> TokenBucket:
+    """获取（首次调用时创建）共享的令牌桶，参数只在创建时生效"""
+    with _registry_lock:
+        if name not in _limiters:
+            _limiters[name] = TokenBucket(name, rate=rate, **kwargs)
+        return _limiters[name]
+
+
+def resilience_stats() -> Dict[str, Dict[str, Any]]:
+    """所有熔断器和限流器的当前状态"""
+    with _registry_lock:
+        breakers, limiters = dict(_breakers), dict(_limiters)
+    return {
+        "breakers": {name: breaker.stats() for name, breaker in breakers.items()},
+        "limiters": {name: limiter.stats() for name, limiter in limiters.items()},
+    }
+
+
+def protect(breaker: CircuitBreaker, limiter: Optional[TokenBucket] = None):
+    """装饰器：调用前先过熔断器再取令牌，结果计入熔断器（同时支持同步和异步函数）
+
+    熔断打开时不消耗令牌；限流超时不计入熔断失败；每次重试都会重新取令牌，重试同样受全局速率限制。
+    """
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                async def attempt() -> Any:
+                    if limiter is not None:
+                        await limiter.aacquire()
+                    return await func(*args, **kwargs)
+
+                return await breaker.acall(attempt)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            def attempt() -> Any:
+                if limiter is not None:
+                    limiter.acquire()
+                return func(*args, **kwargs)
+
+            return breaker.call(attempt)
+
+        return wrapper
+
+    return decorator
+
+
+def retry_on_transient(
+    base: Union[Type[Exception], Sequence[Type[Exception]], Callable[[Exception], bool]] = default_retry_on,
+) -> Callable[[Exception], bool]:
+    """生成 RetryPolicy.retry_on：熔断打开时不重试（由熔断器快速失败），限流超时可以重试，其余交给 base 判断
+
+    Args:
+        base: 与 RetryPolicy.retry_on 相同的写法，异常类型、类型序列或判断函数
+    """
+    if isinstance(base, type) or isinstance(base, (tuple, list)):
+        exc_types = tuple(base) if isinstance(base, (tuple, list)) else (base,)
+
+        def base_check(exc: Exception) -> bool:
+            return isinstance(exc, exc_types)
+
+    else:
+        base_check = base
+
+    def retry_on(exc: Exception) -> bool:
+        if isinstance(exc, CircuitOpenError):
+            return False
+        if isinstance(exc, RateLimitExceeded):
+            return True
+        return base_check(exc)
+
+    return retry_on
@@ -0,0 +1,182 @@
+"""
+有界、可持久化的会话历史存储
+
+全局 store = {} 永不淘汰，且每一轮都把完整历史回放进 prompt，
+内存和每轮 token 都会无限增长。SessionStore 分两层：
+- 热层：内存 LRU，只保存最近活跃的 max_sessions 个会话，每个会话只保留最近窗口
+- 冷层：本地 SQLite，完整历史按 (session_id, seq) 索引存储，淘汰时把未落盘消息写入
+
+读取 history 时按消息条数窗口和可选的 token 预算截断，长时间运行的服务
+在任意多会话下内存保持平稳。
+"""
+import atexit
+import json
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, List, Optional, Sequence
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict, trim_messages
+from langchain_core.messages.utils import count_tokens_approximately
+
+
+class WindowedChatMessageHistory(BaseChatMessageHistory):
+    """热层中的单个会话历史：内存中只保留最近窗口，新消息先缓冲，由 SessionStore 写入 SQLite"""
+
+    def __init__(
+        self,
+        session_id: str,
+        store: "SessionStore",
+        recent: Sequence[BaseMessage] = (),
+    ):
+        self.session_id = session_id
+        self._store = store
+        self._recent = deque(recent, maxlen=store.max_messages)
+        self._pending: List[BaseMessage] = []
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        """回放进 prompt 的历史：最近 max_messages 条，再按 token 预算截断"""
+        recent = list(self._recent)
+        if self._store.max_tokens is None:
+            return recent
+        return trim_messages(
+            recent,
+            max_tokens=self._store.max_tokens,
+            strategy="last",
+            token_counter=self._store.token_counter,
+            start_on="human",
+            allow_partial=False,
+        )
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        with self._store._lock:
+            self._recent.extend(messages)
+            self._pending.extend(messages)
+            # 已被淘汰出热层的对象不会再被统一刷盘，直接写入
+            evicted = self._store._hot.get(self.session_id) is not self
+            if evicted or len(self._pending) >= self._store.flush_threshold:
+                self._store._flush(self)
+
+    def clear(self) -> None:
+        with self._store._lock:
+            self._recent.clear()
+            self._pending.clear()
+            self._store._delete(self.session_id)
+
+
+class SessionStore:
+    """内存 LRU 热层 + SQLite 冷层的会话存储
+
+    Args:
+        db_path: SQLite 数据库路径，":memory:" 表示不落盘
+        max_sessions: 热层最多保留的会话数，超出后淘汰最久未使用的会话
+        max_messages: 每个会话在内存中保留、并回放进 prompt 的最近消息条数
+        max_tokens: 回放历史的 token 预算，None 表示只按条数截断
+        token_counter: token 计数函数
+        flush_threshold: 单个会话缓冲多少条新消息后写入 SQLite
+    """
+
+    def __init__(
+        self,
+        db_path: str = "sessions.sqlite",
+        *,
+        max_sessions: int = 1000,
+        max_messages: int = 20,
+        max_tokens: Optional[int] = None,
+        token_counter: Callable[[Sequence[BaseMessage]], int] = count_tokens_approximately,
+        flush_threshold: int = 16,
+    ):
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.token_counter = token_counter
+        self.flush_threshold = flush_threshold
+        self._hot: "OrderedDict[str, WindowedChatMessageHistory]" = OrderedDict()
+        self._lock = threading.RLock()
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "session_id TEXT NOT NULL, "
+            "message TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, seq)"
+        )
+        self._conn.commit()
+        atexit.register(self.close)
+
+    def get(self, session_id: str) -> WindowedChatMessageHistory:
+        """获取会话历史（可直接作为 RunnableWithMessageHistory 的 get_session_history）"""
+        with self._lock:
+            history = self._hot.get(session_id)
+            if history is not None:
+                self._hot.move_to_end(session_id)
+                return history
+
+            history = WindowedChatMessageHistory(session_id, self, self._load_recent(session_id))
+            self._hot[session_id] = history
+            while len(self._hot) > self.max_sessions:
+                _, evicted = self._hot.popitem(last=False)
+                self._flush(evicted)
+            return history
+
+    __getitem__ = get
+
+    def full_history(self, session_id: str) -> List[BaseMessage]:
+        """从冷层读取完整历史（包含尚未落盘的消息），用于查看和导出"""
+        with self._lock:
+            history = self._hot.get(session_id)
+            if history is not None:
+                self._flush(history)
+            rows = self._conn.execute(
+                "SELECT message FROM messages WHERE session_id = ? ORDER BY seq",
+                (session_id,),
+            ).fetchall()
+        return messages_from_dict([json.loads(row[0]) for row in rows])
+
+    def flush(self) -> None:
+        """把热层中所有缓冲的消息写入 SQLite"""
+        with self._lock:
+            for history in self._hot.values():
+                self._flush(history, commit=False)
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is None:
+                return
+            self.flush()
+            self._conn.close()
+            self._conn = None
+            self._hot.clear()
+
+    def _load_recent(self, session_id: str) -> List[BaseMessage]:
+        rows = self._conn.execute(
+            "SELECT message FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+            (session_id, self.max_messages),
+        ).fetchall()
+        return messages_from_dict([json.loads(row[0]) for row in reversed(rows)])
+
+    def _flush(self, history: WindowedChatMessageHistory, commit: bool = True) -> None:
+        if not history._pending:
+            return
+        self._conn.executemany(
+            "INSERT INTO messages (session_id, message) VALUES (?, ?)",
+            [
+                (history.session_id, json.dumps(message_to_dict(msg), ensure_ascii=False))
+                for msg in history._pending
+            ],
+        )
+        if commit:
+            self._conn.commit()
+        history._pending.clear()
+
+    def _delete(self, session_id: str) -> None:
+        self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+        self._conn.commit()
@@ -1,20 +1,25 @@
 from langchain_openai import ChatOpenAI
 from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_core.chat_history import ChatMessageHistory
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 import os
 from dotenv import load_dotenv
 
+from session_store import SessionStore
+
 load_dotenv()
 
 llm = ChatOpenAI(model="Qwen/Qwen3-8B", max_tokens=1000, temperature=0.7)
 
-store = {}
+# 热层最多保留 1000 个会话，每个会话只回放最近 20 条 / 2000 tokens，完整历史落盘到 SQLite
+store = SessionStore(
+    os.getenv("SESSION_DB_PATH", "sessions.sqlite"),
+    max_sessions=1000,
+    max_messages=20,
+    max_tokens=2000,
+)
 
 def get_chat_history(session_id: str):
-    if session_id not in store:
-        store[session_id] = ChatMessageHistory()
-    return store[session_id]
+    return store.get(session_id)
 
 prompt = ChatPromptTemplate.from_messages([
     ("system", "You are a helpful AI assistant."),
@@ -31,24 +36,22 @@ chain_with_history = RunnableWithMessageHistory(
     history_messages_key="history"
 )
 
-session_id = "user_123"
-
-
-response1 = chain_with_history.invoke(
-    {"input": "Hello! How are you?"},
-    config={"configurable": {"session_id": session_id}}
-)
-print("AI:", response1.content)
-
-response2 = chain_with_history.invoke(
-    {"input": "What was my previous message?"},
-    config={"configurable": {"session_id": session_id}}
-)
-print("AI:", response2.content)
+if __name__ == "__main__":
+    session_id = "user_123"
 
-print("\nConversation History:")
-for message in store[session_id].messages:
-    print(f"{message.type}: {message.content}")
 
+    response1 = chain_with_history.invoke(
+        {"input": "Hello! How are you?"},
+        config={"configurable": {"session_id": session_id}}
+    )
+    print("AI:", response1.content)
 
+    response2 = chain_with_history.invoke(
+        {"input": "What was my previous message?"},
+        config={"configurable": {"session_id": session_id}}
+    )
+    print("AI:", response2.content)
 
+    print("\nConversation History:")
+    for message in store.full_history(session_id):
+        print(f"{message.type}: {message.content}")
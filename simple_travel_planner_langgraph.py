@@ -1,6 +1,7 @@
 import os
 from typing import TypedDict, Annotated, List
 from langgraph.graph import StateGraph, END
+from langgraph.graph.message import add_messages
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
@@ -13,7 +14,8 @@ load_dotenv()
 llm = ChatOpenAI(model="Qwen/Qwen3-8B", temperature=0.7)
 
 class PlannerState(TypedDict):
-    messages: Annotated[List[HumanMessage | AIMessage], "The messages in the conversation"]
+    # 节点只返回新增的消息，由 add_messages 追加到历史末尾
+    messages: Annotated[List[HumanMessage | AIMessage], add_messages]
     city: str
     interests: List[str]
     itinerary: str
@@ -25,32 +27,29 @@ itinerary_prompt = ChatPromptTemplate.from_messages([
     ("human", "Create an itinerary for my day trip."),
 ])
 
-def input_city(state: PlannerState) -> PlannerState:
+def input_city(state: PlannerState) -> dict:
     print("Please enter the city you want to visit for your day trip:")
     user_message = input("Your input: ")
     return {
-        **state,
         "city": user_message,
-        "messages": state['messages'] + [HumanMessage(content=user_message)],
+        "messages": [HumanMessage(content=user_message)],
     }
 
-def input_interests(state: PlannerState) -> PlannerState:
+def input_interests(state: PlannerState) -> dict:
     print(f"Please enter your interests for the trip to {state['city']} (comma-separated):")
     user_message = input("Your input: ")
     return {
-        **state,
         "interests": [interest.strip() for interest in user_message.split(',')],
-        "messages": state['messages'] + [HumanMessage(content=user_message)],
+        "messages": [HumanMessage(content=user_message)],
     }
 
-def create_itinerary(state: PlannerState) -> PlannerState:
+def create_itinerary(state: PlannerState) -> dict:
     print(f"Creating an itinerary for {state['city']} based on interests: {', '.join(state['interests'])}...")
     response = llm.invoke(itinerary_prompt.format_messages(city=state['city'], interests=", ".join(state['interests'])))
     print("\nFinal Itinerary:")
     print(response.content)
     return {
-        **state,
-        "messages": state['messages'] + [AIMessage(content=response.content)],
+        "messages": [AIMessage(content=response.content)],
         "itinerary": response.content,
     }
 
@@ -0,0 +1,312 @@
+"""
+可合并的概率数据结构 (sketch)：在固定内存内统计超大词表的词频和基数
+
+精确统计需要一个和词表一样大的 dict；网页级语料的词表（拼写错误、URL、数字、
+多语言词）可以有上亿个，reduce 阶段的 global_word_count 放不进内存。
+这里的三个结构占用的内存只由参数决定，与词表大小无关，而且都可以合并：
+每个 map 节点在自己的分片上构建 sketch，reduce 节点把它们合并成全局结果。
+
+- CountMinSketch   任意词的频次估计。宽 w = ⌈e/ε⌉、深 d = ⌈ln(1/δ)⌉ 时，
+                   估计值 ≥ 真实值，且以至少 1-δ 的概率 估计值 ≤ 真实值 + ε·N（N 为总词数）。
+                   使用保守更新 (conservative update)，误差通常远小于上界；合并为逐格相加。
+- SpaceSaving      Top-k 高频词 (heavy hitters)，保留 capacity 个计数器。
+                   计数 ≥ 真实值 ≥ 计数 - error，且 error ≤ N / capacity；
+                   频次超过 N / capacity 的词一定在结果里。合并方法见 Agarwal 等人的可合并摘要。
+- HyperLogLog      不同元素个数（基数）。2^p 个寄存器，相对标准误差约 1.04 / √(2^p)
+                   （p=14 时约 0.81%，占 16 KB）；合并为逐个寄存器取最大值。
+
+FrequencySketch 把三者组合起来供 mapreduce.py 的近似模式使用：
+Top-k 的候选和计数来自 SpaceSaving，再取 CountMinSketch 估计值中较小的一个。
+
+to_bytes() / from_bytes() 把 FrequencySketch 编码为纯数据（JSON 头 + 计数表和寄存器的原始字节），
+节点缓存和跨进程传递都用它，不依赖 pickle。
+
+哈希使用 blake2b（与进程无关，不同进程 / 机器上构建的 sketch 也能合并），
+一次哈希得到 128 位，前 64 位给 CountMinSketch，后 64 位给 HyperLogLog。
+"""
+import hashlib
+import heapq
+import json
+import math
+import struct
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+
+def hash128(item: str) -> Tuple[int, int]:
+    digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+
+
+class CountMinSketch:
+    """频次估计：只会高估，高估量以 1-δ 的概率不超过 ε·N"""
+
+    def __init__(self, width: int, depth: int):
+        self.width = width
+        self.depth = depth
+        self.table = array("q", bytes(8 * width * depth))
+        self.total = 0
+
+    @classmethod
+    def from_error(cls, epsilon: float, delta: float) -> "CountMinSketch":
+        return cls(width=math.ceil(math.e / epsilon), depth=math.ceil(math.log(1 / delta)))
+
+    @property
+    def epsilon(self) -> float:
+        return math.e / self.width
+
+    @property
+    def delta(self) -> float:
+        return math.exp(-self.depth)
+
+    def _cells(self, hashed: int) -> List[int]:
+        # 双重哈希：第 i 行的位置为 h1 + i·h2 (Kirsch & Mitzenmacher)
+        h1, h2 = hashed & 0xFFFFFFFF, (hashed >> 32) | 1
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+    def add(self, hashed: int, count: int = 1) -> None:
+        """保守更新：每一行只抬高到 (当前估计 + count)，不会超过需要的值"""
+        table = self.table
+        cells = self._cells(hashed)
+        target = min(table[cell] for cell in cells) + count
+        for cell in cells:
+            if table[cell] < target:
+                table[cell] = target
+        self.total += count
+
+    def estimate(self, hashed: int) -> int:
+        table = self.table
+        return min(table[cell] for cell in self._cells(hashed))
+
+    def merge(self, other: "CountMinSketch") -> "CountMinSketch":
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("Count-Min sketches must have the same width and depth to merge")
+        table = self.table
+        for cell, value in enumerate(other.table):
+            if value:
+                table[cell] += value
+        self.total += other.total
+        return self
+
+    def memory_bytes(self) -> int:
+        return self.table.itemsize * len(self.table)
+
+
+class SpaceSaving:
+    """Top-k 高频词：最多 capacity 个计数器，计数误差不超过 N / capacity"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.total = 0
+        # (count, item) 的最小堆，计数变化后旧条目作废，弹出时跳过
+        self._heap: List[Tuple[int, str]] = []
+
+    def _min_item(self) -> Tuple[int, str]:
+        heap = self._heap
+        while heap[0][0] != self.counts.get(heap[0][1]):
+            heapq.heappop(heap)
+        return heap[0]
+
+    def _push(self, item: str, count: int) -> None:
+        heapq.heappush(self._heap, (count, item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(c, i) for i, c in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def add(self, item: str, count: int = 1) -> None:
+        self.total += count
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+        elif len(counts) < self.capacity:
+            counts[item] = count
+            self.errors[item] = 0
+        else:
+            # 替换计数最小的词：新词继承它的计数作为误差上界
+            floor, evicted = self._min_item()
+            heapq.heappop(self._heap)
+            del counts[evicted], self.errors[evicted]
+            counts[item] = floor + count
+            self.errors[item] = floor
+        self._push(item, counts[item])
+
+    def min_count(self) -> int:
+        """未被记录的词的频次上界（计数器未满时为 0）"""
+        return self._min_item()[0] if len(self.counts) >= self.capacity else 0
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """合并后仍满足 计数 ≥ 真实值 ≥ 计数 - error：缺失的词按对方的 min_count 补上"""
+        floor_self, floor_other = self.min_count(), other.min_count()
+        merged = {}
+        for item in self.counts.keys() | other.counts.keys():
+            count = self.counts.get(item, floor_self) + other.counts.get(item, floor_other)
+            error = self.errors.get(item, floor_self) + other.errors.get(item, floor_other)
+            merged[item] = (count, error)
+        kept = heapq.nlargest(self.capacity, merged.items(), key=lambda entry: entry[1][0])
+        self.counts = {item: count for item, (count, _) in kept}
+        self.errors = {item: error for item, (_, error) in kept}
+        self.total += other.total
+        self._heap = [(count, item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+        return self
+
+    def top(self, k: int) -> List[Tuple[str, int, int]]:
+        """[(词, 计数, 误差)]，按计数从高到低"""
+        items = heapq.nlargest(k, self.counts.items(), key=lambda entry: entry[1])
+        return [(item, count, self.errors[item]) for item, count in items]
+
+    def memory_bytes(self) -> int:
+        # 每个计数器：词的引用、计数、误差和堆条目（不含词本身的字符串）
+        return self.capacity * 8 * 4
+
+
+class HyperLogLog:
+    """基数估计：相对标准误差约 1.04 / √(2^p)"""
+
+    def __init__(self, precision: int = 14):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, hashed: int) -> None:
+        p = self.precision
+        index = hashed >> (64 - p)
+        rest = hashed & ((1 << (64 - p)) - 1)
+        rank = (64 - p) - rest.bit_length() + 1  # 剩余位里第一个 1 的位置
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if self.precision != other.precision:
+            raise ValueError("HyperLogLog sketches must have the same precision to merge")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def cardinality(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # 小基数时用线性计数 (linear counting)
+        return round(estimate)
+
+    def memory_bytes(self) -> int:
+        return len(self.registers)
+
+
+class FrequencySketch:
+    """词频统计的组合 sketch：Count-Min（频次）+ SpaceSaving（Top-k）+ HyperLogLog（不同词数）
+
+    Args:
+        epsilon / delta: Count-Min 的误差参数，高估量以 1-delta 的概率不超过 epsilon·N
+        capacity: SpaceSaving 的计数器个数，Top-k 计数误差不超过 N / capacity
+        precision: HyperLogLog 的寄存器位数 p（2^p 个寄存器）
+    """
+
+    def __init__(self, epsilon: float = 2e-4, delta: float = 0.01, capacity: int = 1000, precision: int = 14):
+        self.cms = CountMinSketch.from_error(epsilon, delta)
+        self.heavy = SpaceSaving(capacity)
+        self.hll = HyperLogLog(precision)
+
+    def empty_like(self) -> "FrequencySketch":
+        """参数相同的空 sketch，可以与本 sketch 合并"""
+        sketch = FrequencySketch.__new__(FrequencySketch)
+        sketch.cms = CountMinSketch(self.cms.width, self.cms.depth)
+        sketch.heavy = SpaceSaving(self.heavy.capacity)
+        sketch.hll = HyperLogLog(self.hll.precision)
+        return sketch
+
+    def add(self, item: str, count: int = 1) -> None:
+        cms_hash, hll_hash = hash128(item)
+        self.cms.add(cms_hash, count)
+        self.hll.add(hll_hash)
+        self.heavy.add(item, count)
+
+    def update(self, counts: Iterable[Tuple[str, int]]) -> None:
+        for item, count in counts:
+            self.add(item, count)
+
+    def merge(self, other: "FrequencySketch") -> "FrequencySketch":
+        """把 other 原地合并进本 sketch（other 不变）"""
+        self.cms.merge(other.cms)
+        self.heavy.merge(other.heavy)
+        self.hll.merge(other.hll)
+        return self
+
+    @property
+    def total(self) -> int:
+        return self.cms.total
+
+    def estimate(self, item: str) -> int:
+        estimate = self.cms.estimate(hash128(item)[0])
+        if item in self.heavy.counts:
+            estimate = min(estimate, self.heavy.counts[item])
+        return estimate
+
+    def top(self, k: int) -> List[Tuple[str, int]]:
+        """前 k 个高频词及其估计频次（两种估计取较小值，都只会高估）"""
+        candidates = [(item, self.estimate(item)) for item, _, _ in self.heavy.top(max(k, self.heavy.capacity))]
+        candidates.sort(key=lambda entry: entry[1], reverse=True)
+        return candidates[:k]
+
+    def cardinality(self) -> int:
+        return self.hll.cardinality()
+
+    def error_bounds(self) -> Dict[str, float]:
+        """当前数据量下各估计值的误差上界"""
+        return {
+            "count_overestimate_max": self.cms.epsilon * self.total,
+            "count_bound_probability": 1 - self.cms.delta,
+            "top_k_count_error_max": self.total / self.heavy.capacity,
+            "unique_words_relative_std": self.hll.relative_error,
+        }
+
+    def memory_bytes(self) -> int:
+        return self.cms.memory_bytes() + self.heavy.memory_bytes() + self.hll.memory_bytes()
+
+    def to_bytes(self) -> bytes:
+        """编码为 4 字节头长度 + JSON 头（参数、总数、Top-k 计数器）+ Count-Min 计数表 + HyperLogLog 寄存器"""
+        header = json.dumps({
+            "cms": [self.cms.width, self.cms.depth, self.cms.total],
+            "heavy": [self.heavy.capacity, self.heavy.total,
+                      [[item, count, self.heavy.errors[item]] for item, count in self.heavy.counts.items()]],
+            "hll": self.hll.precision,
+        }, ensure_ascii=False).encode("utf-8")
+        return struct.pack("<I", len(header)) + header + self.cms.table.tobytes() + bytes(self.hll.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "FrequencySketch":
+        """to_bytes() 的逆操作；长度与参数不符时抛出 ValueError"""
+        (header_len,) = struct.unpack_from("<I", data)
+        header = json.loads(bytes(data[4:4 + header_len]).decode("utf-8"))
+        width, depth, cms_total = header["cms"]
+        capacity, heavy_total, counters = header["heavy"]
+        precision = header["hll"]
+
+        sketch = cls.__new__(cls)
+        sketch.cms = CountMinSketch(width, depth)
+        sketch.heavy = SpaceSaving(capacity)
+        sketch.hll = HyperLogLog(precision)
+        table_start = 4 + header_len
+        table_end = table_start + 8 * width * depth
+        if len(data) != table_end + len(sketch.hll.registers):
+            raise ValueError("FrequencySketch data does not match its header")
+        sketch.cms.table = array("q")
+        sketch.cms.table.frombytes(bytes(data[table_start:table_end]))
+        sketch.cms.total = cms_total
+        sketch.hll.registers = bytearray(data[table_end:])
+        sketch.heavy.total = heavy_total
+        sketch.heavy.counts = {item: count for item, count, _ in counters}
+        sketch.heavy.errors = {item: error for item, _, error in counters}
+        sketch.heavy._heap = [(count, item) for item, count in sketch.heavy.counts.items()]
+        heapq.heapify(sketch.heavy._heap)
+        return sketch
@@ -0,0 +1,870 @@
+"""
+持久化的 SQLite 检查点存储 (WAL 模式 + 批量写入 + 增量存储 + 保留策略)
+
+MemorySaver 把所有检查点永久留在进程内存里，进程重启后全部丢失，
+需要等待数小时的人工审批流程无法使用。SQLiteSaver：
+- 使用 WAL 模式，读写互不阻塞
+- put / put_writes 只把写操作放进队列立即返回，由后台写线程按组提交
+  （队列里积压的所有写操作在同一个事务里提交），读操作会先等待自己之前的写入落盘；
+  暂时性错误（database is locked 等）会重试，整批失败时逐个重放，只丢弃出错的写操作，
+  错误在下次读取对应线程时抛出 CheckpointWriteError
+- 检查点表以 (thread_id, checkpoint_ns, checkpoint_id) 为主键，
+  get_state 取最新检查点只需一次索引查找
+- 增量存储：每个超步只写入版本发生变化的通道值 (blobs 表按通道版本存储)，
+  检查点本身只记录各通道的版本号，未变化的通道直接复用上一步的 blob
+- 保留策略：每个线程/命名空间只保留最近 keep_last 个检查点以及所有中断点，
+  由后台压缩线程定期删除更早的检查点、它们的写入记录和不再被引用的 blob
+- 待处理中断索引：中断写入时同步登记到 pending_interrupts 表，线程产生更新的检查点时清除，
+  列出所有待审批的线程只需扫描该表，耗时与待处理数量成正比，与线程总数无关
+
+示例图共用 default_saver() 返回的同一个实例；模块导入时用 LazySaver 编译图，
+导入本身不会创建数据库文件或启动后台线程。
+"""
+import asyncio
+import atexit
+import logging
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.types import INTERRUPT
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS pending_interrupts (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id)
+);
+CREATE INDEX IF NOT EXISTS idx_pending_interrupts_created ON pending_interrupts (checkpoint_ns, created_at);
+"""
+
+_STOP = object()
+
+# 写队列中的一项：一组 (sql, 参数) 语句，或在写连接上执行的函数
+WriteOp = Union[List[Tuple[str, Any]], Callable[[sqlite3.Connection], None]]
+
+# 单个事务遇到 sqlite3.OperationalError（锁超时、磁盘 I/O 等）时的重试次数和初始退避秒数
+WRITE_RETRIES = 3
+WRITE_RETRY_BACKOFF = 0.05
+
+
+def _check_keep_last(keep_last: int) -> None:
+    # keep_last=0 会删除每个线程的最新检查点，等于清空正在运行的状态
+    if keep_last < 1:
+        raise ValueError(f"keep_last 必须 >= 1，当前为 {keep_last}")
+
+
+class CheckpointWriteError(RuntimeError):
+    """已经返回的 put / put_writes 最终没有写入数据库"""
+
+
+class PendingInterrupt(NamedTuple):
+    """一条待处理的中断（例如等待人工审批的线程）"""
+
+    thread_id: str
+    checkpoint_ns: str
+    checkpoint_id: str
+    task_id: str
+    interrupts: Any  # 中断写入的值，即节点里 interrupt(...) 产生的 Interrupt 列表
+    created_at: float
+
+    @property
+    def config(self) -> RunnableConfig:
+        return {"configurable": {"thread_id": self.thread_id, "checkpoint_ns": self.checkpoint_ns}}
+
+
+class SQLiteSaver(BaseCheckpointSaver[str]):
+    """基于本地 SQLite 的检查点存储
+
+    Args:
+        db_path: 数据库文件路径
+        batch_size: 写线程单个事务最多提交的写操作数
+        keep_last: 每个线程/命名空间保留的最近检查点数，None 表示保留全部历史；
+            有中断写入的检查点（人工审批点）始终保留
+        compact_interval: 后台压缩的间隔秒数，None 表示只在调用 compact() 时压缩
+        serde: 序列化器，默认使用 LangGraph 的 JsonPlusSerializer
+    """
+
+    def __init__(
+        self,
+        db_path: str = "checkpoints.sqlite",
+        *,
+        batch_size: int = 256,
+        keep_last: Optional[int] = None,
+        compact_interval: Optional[float] = None,
+        serde: Optional[SerializerProtocol] = None,
+    ):
+        super().__init__(serde=serde)
+        if keep_last is not None:
+            _check_keep_last(keep_last)
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.keep_last = keep_last
+
+        self._write_conn = self._connect()
+        self._write_conn.executescript(SCHEMA)
+        self._write_conn.commit()
+        self._read_conn = self._connect()
+        self._read_lock = threading.Lock()
+
+        # 写入序号：enqueued 为已入队的写操作数，committed 为已处理（提交或丢弃）的写操作数
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._cond = threading.Condition()
+        self._enqueued = 0
+        self._committed = 0
+        # 写入失败：按线程记录，该线程下次读取时抛出一次；_error 为最近一次失败，
+        # 由下一次不带线程的读取抛出，之后有一批写操作完整提交时清除
+        self._failed: Dict[str, BaseException] = {}
+        self._error: Optional[BaseException] = None
+        self._writer = threading.Thread(target=self._write_loop, name="sqlite-checkpoint-writer", daemon=True)
+        self._writer.start()
+
+        # 自上次压缩以来写入过检查点的线程
+        self._dirty: Set[str] = set()
+        self._dirty_lock = threading.Lock()
+        self._stop_compactor = threading.Event()
+        self._compactor: Optional[threading.Thread] = None
+        if keep_last is not None and compact_interval:
+            self._compactor = threading.Thread(
+                target=self._compact_loop,
+                args=(compact_interval,),
+                name="sqlite-checkpoint-compactor",
+                daemon=True,
+            )
+            self._compactor.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ---------- 写线程 ----------
+
+    def _enqueue(self, op: WriteOp, thread_id: Optional[str] = None) -> None:
+        with self._cond:
+            self._enqueued += 1
+            self._queue.put((thread_id, op))
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stop = False
+            # 组提交：把队列里已经积压的写操作一次性取出，在同一个事务里提交
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            failures = self._commit_batch(batch)
+            with self._cond:
+                self._committed += len(batch)
+                if failures:
+                    for thread_id, exc in failures:
+                        if thread_id is not None:
+                            self._failed[thread_id] = exc
+                        self._error = exc
+                else:
+                    self._error = None
+                self._cond.notify_all()
+            if stop:
+                return
+
+    def _commit_batch(self, batch: List[Tuple[Optional[str], WriteOp]]) -> List[Tuple[Optional[str], BaseException]]:
+        """提交一批写操作，返回没有写入的 (thread_id, 异常)"""
+        try:
+            self._transaction([op for _, op in batch])
+            return []
+        except Exception as exc:
+            if len(batch) == 1:
+                logger.exception("SQLite 检查点写入失败")
+                return [(batch[0][0], exc)]
+            logger.warning("SQLite 检查点批量写入失败，逐个重放以隔离出错的写操作: %r", exc)
+        # 每个写操作单独一个事务，只丢弃出错的那些，其他线程已经返回的写入照常提交
+        failures = []
+        for thread_id, op in batch:
+            try:
+                self._transaction([op])
+            except Exception as exc:
+                logger.exception("SQLite 检查点写入失败 (thread_id=%s)", thread_id)
+                failures.append((thread_id, exc))
+        return failures
+
+    def _transaction(self, ops: List[WriteOp]) -> None:
+        """在一个事务里执行 ops；OperationalError（锁超时、磁盘 I/O 等）回滚后退避重试"""
+        for attempt in range(WRITE_RETRIES):
+            try:
+                with self._write_conn:
+                    for op in ops:
+                        if callable(op):
+                            op(self._write_conn)
+                            continue
+                        for sql, params in op:
+                            if isinstance(params, list):
+                                self._write_conn.executemany(sql, params)
+                            else:
+                                self._write_conn.execute(sql, params)
+                return
+            except sqlite3.OperationalError:
+                if attempt == WRITE_RETRIES - 1:
+                    raise
+                time.sleep(WRITE_RETRY_BACKOFF * 2 ** attempt)
+
+    def flush(self, thread_id: Optional[str] = None) -> None:
+        """等待调用前入队的所有写操作提交
+
+        有写操作没能写入时抛出 CheckpointWriteError（每个失败只报告一次）：
+        指定 thread_id 时只检查该线程的写入，否则检查最近一次失败。
+        """
+        with self._cond:
+            target = self._enqueued
+            while self._committed < target:
+                self._cond.wait()
+            if thread_id is not None:
+                error = self._failed.pop(thread_id, None)
+            else:
+                error, self._error = self._error, None
+        if error is not None:
+            raise CheckpointWriteError(
+                f"线程 {thread_id} 的检查点写入失败" if thread_id is not None else "SQLite 检查点写入失败"
+            ) from error
+
+    def close(self) -> None:
+        """提交剩余写操作并关闭连接"""
+        if not self._writer.is_alive():
+            return
+        self._stop_compactor.set()
+        if self._compactor is not None:
+            self._compactor.join()
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._write_conn.close()
+        with self._read_lock:
+            self._read_conn.close()
+
+    def _query(self, sql: str, params: Tuple = (), thread_id: Optional[str] = None) -> List[Tuple]:
+        self.flush(thread_id)
+        with self._read_lock:
+            return self._read_conn.execute(sql, params).fetchall()
+
+    # ---------- BaseCheckpointSaver 接口 ----------
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        # 检查点本身不含通道值，只写入本步版本发生变化的通道
+        c = checkpoint.copy()
+        values: Dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+        blob_rows = [
+            (
+                thread_id,
+                checkpoint_ns,
+                channel,
+                str(version),
+                *(self.serde.dumps_typed(values[channel]) if channel in values else ("empty", None)),
+            )
+            for channel, version in new_versions.items()
+        ]
+        type_, serialized_checkpoint = self.serde.dumps_typed(c)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+        statements: List[Tuple[str, Any]] = []
+        if blob_rows:
+            statements.append((
+                "INSERT OR IGNORE INTO blobs (thread_id, checkpoint_ns, channel, version, type, blob) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                blob_rows,
+            ))
+        statements.append((
+            "INSERT OR REPLACE INTO checkpoints "
+            "(thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                thread_id,
+                checkpoint_ns,
+                checkpoint["id"],
+                config["configurable"].get("checkpoint_id"),
+                type_,
+                serialized_checkpoint,
+                metadata_type,
+                serialized_metadata,
+            ),
+        ))
+        # 线程已经越过之前的中断点（恢复后产生了新检查点），清除对应的待处理记录
+        statements.append((
+            "DELETE FROM pending_interrupts WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+            (thread_id, checkpoint_ns, checkpoint["id"]),
+        ))
+        self._enqueue(statements, thread_id)
+        if self.keep_last is not None:
+            with self._dirty_lock:
+                self._dirty.add(thread_id)
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # 特殊通道（错误、中断、恢复等）使用固定的负数下标，允许覆盖；普通写入只写一次
+        replace = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, serialized = self.serde.dumps_typed(value)
+            rows.append((
+                thread_id,
+                checkpoint_ns,
+                checkpoint_id,
+                task_id,
+                WRITES_IDX_MAP.get(channel, idx),
+                channel,
+                type_,
+                serialized,
+                task_path,
+            ))
+        statements: List[Tuple[str, Any]] = [(
+            f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO writes "
+            "(thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, task_path) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )]
+        # 中断写入和待处理索引在同一个事务里提交
+        statements.extend(
+            (
+                "INSERT OR REPLACE INTO pending_interrupts "
+                "(thread_id, checkpoint_ns, checkpoint_id, task_id, type, value, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint_id, task_id, row[6], row[7], time.time()),
+            )
+            for row in rows
+            if row[5] == INTERRUPT
+        )
+        self._enqueue(statements, thread_id)
+
+    def list_pending_interrupts(
+        self,
+        *,
+        checkpoint_ns: str = "",
+        limit: Optional[int] = None,
+        after: Optional[float] = None,
+    ) -> List[PendingInterrupt]:
+        """按中断时间先后列出待处理的中断
+
+        Args:
+            checkpoint_ns: 命名空间，默认只列出根图上的中断（子图中断会同时记录在根图上）
+            limit: 最多返回的条数，None 表示全部
+            after: 只返回 created_at 大于该值的记录，用于分页
+        """
+        sql = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, task_id, type, value, created_at "
+            "FROM pending_interrupts WHERE checkpoint_ns = ?"
+        )
+        params: List[Any] = [checkpoint_ns]
+        if after is not None:
+            sql += " AND created_at > ?"
+            params.append(after)
+        sql += " ORDER BY created_at"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [
+            PendingInterrupt(
+                thread_id,
+                checkpoint_ns_,
+                checkpoint_id,
+                task_id,
+                self.serde.loads_typed((type_, value)),
+                created_at,
+            )
+            for thread_id, checkpoint_ns_, checkpoint_id, task_id, type_, value, created_at in self._query(sql, tuple(params))
+        ]
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        if checkpoint_id := get_checkpoint_id(config):
+            rows = self._query(
+                "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+                "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id),
+                thread_id,
+            )
+        else:
+            rows = self._query(
+                "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+                "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT 1",
+                (thread_id, checkpoint_ns),
+                thread_id,
+            )
+        return self._to_tuple(rows[0]) if rows else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        sql = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+            "FROM checkpoints"
+            + (f" WHERE {' AND '.join(where)}" if where else "")
+            + " ORDER BY checkpoint_id DESC"
+        )
+        for row in self._query(sql, tuple(params), config["configurable"]["thread_id"] if config else None):
+            if limit is not None and limit <= 0:
+                break
+            checkpoint_tuple = self._to_tuple(row)
+            if filter and not all(
+                checkpoint_tuple.metadata.get(key) == value for key, value in filter.items()
+            ):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield checkpoint_tuple
+
+    def delete_thread(self, thread_id: str) -> None:
+        self._enqueue([
+            ("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,)),
+            ("DELETE FROM writes WHERE thread_id = ?", (thread_id,)),
+            ("DELETE FROM blobs WHERE thread_id = ?", (thread_id,)),
+            ("DELETE FROM pending_interrupts WHERE thread_id = ?", (thread_id,)),
+        ], thread_id)
+
+    def prune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        """按 LangGraph 的 prune 约定清理线程：keep_latest 只保留最新检查点（及中断点），delete 删除全部"""
+        if strategy == "delete":
+            for thread_id in thread_ids:
+                self.delete_thread(thread_id)
+        elif strategy == "keep_latest":
+            self.compact(thread_ids, keep_last=1)
+        else:
+            raise ValueError(f"未知的清理策略: {strategy}")
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        if not versions:
+            return {}
+        pairs = [(channel, str(version)) for channel, version in versions.items()]
+        rows = self._query(
+            "SELECT channel, type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? "
+            f"AND (channel, version) IN (VALUES {', '.join(['(?, ?)'] * len(pairs))})",
+            (thread_id, checkpoint_ns, *(item for pair in pairs for item in pair)),
+            thread_id,
+        )
+        return {
+            channel: self.serde.loads_typed((type_, blob))
+            for channel, type_, blob in rows
+            if type_ != "empty"
+        }
+
+    def _to_tuple(self, row: Tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata_type, metadata = row
+        checkpoint_: Checkpoint = self.serde.loads_typed((type_, checkpoint))
+        # 兼容早期把完整 channel_values 写在检查点里的记录
+        channel_values = checkpoint_.get("channel_values") or {}
+        missing = {
+            channel: version
+            for channel, version in checkpoint_["channel_versions"].items()
+            if channel not in channel_values
+        }
+        checkpoint_["channel_values"] = {
+            **channel_values,
+            **self._load_blobs(thread_id, checkpoint_ns, missing),
+        }
+        writes = self._query(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+            thread_id,
+        )
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=checkpoint_,
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+        )
+
+    # ---------- 保留策略与压缩 ----------
+
+    def compact(
+        self,
+        thread_ids: Optional[Iterable[str]] = None,
+        *,
+        keep_last: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """按保留策略压缩检查点，返回删除的检查点 / 写入 / blob 数量
+
+        Args:
+            thread_ids: 需要压缩的线程，None 表示所有线程
+            keep_last: 覆盖构造时的 keep_last
+        """
+        keep_last = self.keep_last if keep_last is None else keep_last
+        if keep_last is None:
+            raise ValueError("未配置 keep_last，无法压缩")
+        _check_keep_last(keep_last)
+        stats = {"checkpoints": 0, "writes": 0, "blobs": 0}
+        self._enqueue(self._compact_op(None if thread_ids is None else list(thread_ids), keep_last, stats))
+        self.flush()
+        return stats
+
+    def _compact_loop(self, interval: float) -> None:
+        while not self._stop_compactor.wait(interval):
+            with self._dirty_lock:
+                dirty, self._dirty = self._dirty, set()
+            if dirty:
+                self._enqueue(self._compact_op(sorted(dirty), self.keep_last, {}))
+
+    def _compact_op(self, thread_ids: Optional[List[str]], keep_last: int, stats: Dict[str, int]):
+        """生成在写线程中执行的压缩操作，和普通写入串行执行，不会与新检查点产生竞争"""
+
+        def op(conn: sqlite3.Connection) -> None:
+            if thread_ids is None:
+                targets = conn.execute("SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints").fetchall()
+            else:
+                targets = [
+                    row
+                    for thread_id in thread_ids
+                    for row in conn.execute(
+                        "SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints WHERE thread_id = ?",
+                        (thread_id,),
+                    )
+                ]
+            # 事务回滚后可能重放，每次执行都重新计数
+            counts: Dict[str, int] = {}
+            for thread_id, checkpoint_ns in targets:
+                self._compact_namespace(conn, thread_id, checkpoint_ns, keep_last, counts)
+            stats.update(counts)
+
+        return op
+
+    def _compact_namespace(
+        self,
+        conn: sqlite3.Connection,
+        thread_id: str,
+        checkpoint_ns: str,
+        keep_last: int,
+        stats: Dict[str, int],
+    ) -> None:
+        rows = conn.execute(
+            "SELECT checkpoint_id, type, checkpoint FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC",
+            (thread_id, checkpoint_ns),
+        ).fetchall()
+        if len(rows) <= keep_last:
+            return
+        interrupt_points = {
+            row[0]
+            for row in conn.execute(
+                "SELECT DISTINCT checkpoint_id FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ?",
+                (thread_id, checkpoint_ns, INTERRUPT),
+            )
+        }
+        keep = rows[:keep_last] + [row for row in rows[keep_last:] if row[0] in interrupt_points]
+        drop = [row for row in rows[keep_last:] if row[0] not in interrupt_points]
+        if not drop:
+            return
+
+        def versions(row) -> Set[Tuple[str, str]]:
+            checkpoint = self.serde.loads_typed((row[1], row[2]))
+            return {(channel, str(version)) for channel, version in checkpoint["channel_versions"].items()}
+
+        # 只删除仅被待删除检查点引用的 blob；保留的检查点仍在引用的版本不动
+        kept_versions: Set[Tuple[str, str]] = set().union(*(versions(row) for row in keep))
+        dropped_versions = set().union(*(versions(row) for row in drop)) - kept_versions
+        drop_keys = [(thread_id, checkpoint_ns, row[0]) for row in drop]
+
+        stats["writes"] = stats.get("writes", 0) + sum(
+            conn.execute(
+                "SELECT COUNT(*) FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                key,
+            ).fetchone()[0]
+            for key in drop_keys
+        )
+        conn.executemany(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            drop_keys,
+        )
+        conn.executemany(
+            "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            drop_keys,
+        )
+        conn.executemany(
+            "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+            [(thread_id, checkpoint_ns, channel, version) for channel, version in dropped_versions],
+        )
+        stats["checkpoints"] = stats.get("checkpoints", 0) + len(drop_keys)
+        stats["blobs"] = stats.get("blobs", 0) + len(dropped_versions)
+
+    def storage_stats(self) -> Dict[str, int]:
+        """各表的行数和字节数，用于观察存储增长"""
+        (checkpoints, checkpoint_bytes), = self._query(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) FROM checkpoints"
+        )
+        (writes, write_bytes), = self._query("SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM writes")
+        (blobs, blob_bytes), = self._query("SELECT COUNT(*), COALESCE(SUM(LENGTH(blob)), 0) FROM blobs")
+        return {
+            "checkpoints": checkpoints,
+            "writes": writes,
+            "blobs": blobs,
+            "checkpoint_bytes": checkpoint_bytes,
+            "write_bytes": write_bytes,
+            "blob_bytes": blob_bytes,
+            "total_bytes": checkpoint_bytes + write_bytes + blob_bytes,
+        }
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # ---------- 异步接口：在线程池中执行同步实现，避免阻塞事件循环 ----------
+
+    async def _run(self, func, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(None, partial(func, *args, **kwargs))
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self._run(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await self._run(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        # 入队本身不做 I/O，可以直接在事件循环中执行
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return self.delete_thread(thread_id)
+
+    async def alist_pending_interrupts(
+        self,
+        *,
+        checkpoint_ns: str = "",
+        limit: Optional[int] = None,
+        after: Optional[float] = None,
+    ) -> List[PendingInterrupt]:
+        return await self._run(self.list_pending_interrupts, checkpoint_ns=checkpoint_ns, limit=limit, after=after)
+
+
+# ---------- 示例图共用的默认存储 ----------
+
+_default_saver: Optional[SQLiteSaver] = None
+_default_lock = threading.Lock()
+
+
+def default_saver() -> SQLiteSaver:
+    """进程内共用的默认检查点存储（CHECKPOINT_DB_PATH，默认 checkpoints.sqlite）
+
+    每个线程保留最近 20 个检查点和所有中断点，后台每分钟压缩一次。
+    首次调用时才创建数据库文件、写线程和压缩线程；同一个文件只会有一组连接和线程。
+    """
+    global _default_saver
+    with _default_lock:
+        if _default_saver is None:
+            _default_saver = SQLiteSaver(
+                os.getenv("CHECKPOINT_DB_PATH", "checkpoints.sqlite"),
+                keep_last=20,
+                compact_interval=60,
+            )
+        return _default_saver
+
+
+class LazySaver(BaseCheckpointSaver[str]):
+    """default_saver() 的代理：模块导入时可以直接用它编译图，第一次读写检查点时才创建存储
+
+    SQLiteSaver 特有的方法（list_pending_interrupts、storage_stats、compact 等）同样转发。
+    """
+
+    def __init__(self, factory: Callable[[], SQLiteSaver] = default_saver):
+        super().__init__()
+        self._factory = factory
+
+    @property
+    def saver(self) -> SQLiteSaver:
+        return self._factory()
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.saver, name)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.saver.get_tuple(config)
+
+    def list(self, config: Optional[RunnableConfig], **kwargs: Any) -> Iterator[CheckpointTuple]:
+        return self.saver.list(config, **kwargs)
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        return self.saver.put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        return self.saver.put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        return self.saver.delete_thread(thread_id)
+
+    def prune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        return self.saver.prune(thread_ids, strategy=strategy)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        return self.saver.get_next_version(current, channel)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self.saver.aget_tuple(config)
+
+    async def alist(self, config: Optional[RunnableConfig], **kwargs: Any) -> AsyncIterator[CheckpointTuple]:
+        async for item in self.saver.alist(config, **kwargs):
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        return await self.saver.aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        return await self.saver.aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await self.saver.adelete_thread(thread_id)
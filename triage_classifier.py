@@ -0,0 +1,383 @@
+"""
+本地分诊分类器：在调用 LLM 之前先用 CPU 上的小模型判断客服查询的类别和情感
+
+大部分工单一眼就能分类（"receipt"、"refund" → Billing；"wifi"、"error" → Technical），
+每个都调用一次 Qwen/Qwen3-8B 既慢又费 token。这里对每个字段训练一个
+TF-IDF + 多分类逻辑回归的线性模型（纯 Python，无额外依赖，训练在几十毫秒内完成）：
+- 置信度 (最大类别概率) 达到阈值时直接给出标签，标签与 route_query 比较的值完全一致
+- 置信度不够时返回 None，由原来的 LLM 节点处理
+- stats() 报告每个字段本地回答的比例
+
+训练数据默认是下面的种子工单；设置 TRIAGE_TRAINING_DATA 指向 JSONL 文件
+（每行 {"query": ..., "category": ..., "sentiment": ...}）即可用自己标注的工单训练。
+可以用 benchmarks/triage_cascade.py 交叉验证，选择覆盖率和准确率之间的阈值。
+"""
+import json
+import math
+import os
+import random
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+CATEGORIES = ("Technical", "Billing", "General")
+SENTIMENTS = ("Positive", "Neutral", "Negative")
+
+# (query, category, sentiment)
+SEED_TICKETS: List[Tuple[str, str, str]] = [
+    ("My internet connection keeps dropping. Can you help?", "Technical", "Neutral"),
+    ("The wifi router keeps disconnecting every few minutes", "Technical", "Neutral"),
+    ("I get an error 500 when I open the dashboard", "Technical", "Neutral"),
+    ("The app crashes every time I upload a photo", "Technical", "Negative"),
+    ("How do I reset my password?", "Technical", "Neutral"),
+    ("I can't log in to my account, it says invalid credentials", "Technical", "Neutral"),
+    ("The installation fails with a missing dll error", "Technical", "Neutral"),
+    ("Your software is garbage, it crashed and I lost all my work!", "Technical", "Negative"),
+    ("The update broke my printer driver, this is ridiculous", "Technical", "Negative"),
+    ("Bluetooth pairing does not work on my laptop", "Technical", "Neutral"),
+    ("The website is really slow and pages time out", "Technical", "Negative"),
+    ("How do I configure the VPN on my phone?", "Technical", "Neutral"),
+    ("Thanks, the new app version fixed the sync bug, works great", "Technical", "Positive"),
+    ("Great job on the update, the app is much faster now", "Technical", "Positive"),
+    ("My email is not syncing on the mobile app", "Technical", "Neutral"),
+    ("Two-factor authentication code never arrives", "Technical", "Negative"),
+    ("I need help talking to chatGPT", "Technical", "Neutral"),
+    ("The API returns a timeout error for every request", "Technical", "Neutral"),
+    ("Screen goes black after the latest firmware update", "Technical", "Negative"),
+    ("网络总是断开连接，怎么办？", "Technical", "Neutral"),
+    ("登录的时候一直提示密码错误", "Technical", "Neutral"),
+    ("软件安装失败，报错代码 0x80070005", "Technical", "Neutral"),
+    ("app 又崩溃了，太糟糕了，真的很生气", "Technical", "Negative"),
+    ("更新之后速度快多了，谢谢你们", "Technical", "Positive"),
+    ("Where can I find my receipt?", "Billing", "Neutral"),
+    ("I was charged twice for my subscription, this is unacceptable!", "Billing", "Negative"),
+    ("How do I get a refund for my last order?", "Billing", "Neutral"),
+    ("Can I get an invoice for my company?", "Billing", "Neutral"),
+    ("Why is my bill higher this month?", "Billing", "Neutral"),
+    ("Please update the credit card on my account", "Billing", "Neutral"),
+    ("My payment was declined but the money left my bank", "Billing", "Negative"),
+    ("You keep charging me after I cancelled, worst service ever", "Billing", "Negative"),
+    ("How much does the premium plan cost?", "Billing", "Neutral"),
+    ("Thanks for processing my refund so quickly!", "Billing", "Positive"),
+    ("I love the new annual pricing, great value", "Billing", "Positive"),
+    ("Can I pay with PayPal instead of a card?", "Billing", "Neutral"),
+    ("I want to cancel my subscription and get my money back", "Billing", "Negative"),
+    ("There is a charge on my statement I don't recognize", "Billing", "Negative"),
+    ("Do you offer a student discount on the plan price?", "Billing", "Neutral"),
+    ("Download the receipt for order 4417 please", "Billing", "Neutral"),
+    ("The refund arrived, thank you for the excellent help", "Billing", "Positive"),
+    ("我的发票在哪里下载？", "Billing", "Neutral"),
+    ("为什么这个月被重复扣费了？太过分了", "Billing", "Negative"),
+    ("申请退款需要多久到账？", "Billing", "Neutral"),
+    ("账单金额不对，请帮我核实一下", "Billing", "Neutral"),
+    ("退款已经收到了，非常满意，谢谢", "Billing", "Positive"),
+    ("What are your business hours?", "General", "Neutral"),
+    ("Where is your office located?", "General", "Neutral"),
+    ("Do you have a phone number I can call?", "General", "Neutral"),
+    ("Please provide some opensource project about LangGraph with frontend vue. Can you help?", "General", "Neutral"),
+    ("Can I speak to a manager? Nobody ever answers, terrible support", "General", "Negative"),
+    ("Your staff was rude to me on the phone, I am furious", "General", "Negative"),
+    ("Thank you, your team has been wonderful", "General", "Positive"),
+    ("I love your products, keep up the great work", "General", "Positive"),
+    ("Do you ship internationally?", "General", "Neutral"),
+    ("Are you hiring? I'd like to apply for a job", "General", "Neutral"),
+    ("What is your privacy policy?", "General", "Neutral"),
+    ("How can I give feedback about the service?", "General", "Neutral"),
+    ("I've waited three weeks for an answer, this is awful", "General", "Negative"),
+    ("Is there a store near Shanghai?", "General", "Neutral"),
+    ("Do you have a newsletter I can subscribe to?", "General", "Neutral"),
+    ("Excellent customer service, really appreciate it", "General", "Positive"),
+    ("Can I change the language of my profile?", "General", "Neutral"),
+    ("Who do I contact about a partnership?", "General", "Neutral"),
+    ("你们的营业时间是几点到几点？", "General", "Neutral"),
+    ("客服电话是多少？", "General", "Neutral"),
+    ("你们的服务太差了，我要投诉", "General", "Negative"),
+    ("谢谢你们的耐心解答，服务很好", "General", "Positive"),
+    ("请问你们公司在哪里？", "General", "Neutral"),
+    ("My laptop won't connect to the wifi after the update", "Technical", "Neutral"),
+    ("Getting a 404 error on the checkout page", "Technical", "Neutral"),
+    ("The password reset email never arrives", "Technical", "Negative"),
+    ("How do I install the desktop client on Linux?", "Technical", "Neutral"),
+    ("The camera doesn't work in video calls", "Technical", "Neutral"),
+    ("My account got locked after too many login attempts", "Technical", "Neutral"),
+    ("The sync keeps failing with a network error, so annoying", "Technical", "Negative"),
+    ("Is there a dark mode setting in the app?", "Technical", "Neutral"),
+    ("Router lights are blinking red and there's no internet", "Technical", "Neutral"),
+    ("Love the new feature, setup was super easy", "Technical", "Positive"),
+    ("The bug you fixed yesterday is back again, very frustrating", "Technical", "Negative"),
+    ("How do I export my data to CSV?", "Technical", "Neutral"),
+    ("手机 app 打不开，一直闪退", "Technical", "Negative"),
+    ("怎么重置路由器？", "Technical", "Neutral"),
+    ("I was billed for a plan I never signed up for", "Billing", "Negative"),
+    ("When will I be charged for the next month?", "Billing", "Neutral"),
+    ("Can you send me a copy of my invoice from March?", "Billing", "Neutral"),
+    ("How do I change my billing address?", "Billing", "Neutral"),
+    ("Is there a fee for cancelling early?", "Billing", "Neutral"),
+    ("The refund still hasn't arrived after two weeks, this is a joke", "Billing", "Negative"),
+    ("Do you accept Alipay or WeChat Pay?", "Billing", "Neutral"),
+    ("My card was charged the wrong amount", "Billing", "Negative"),
+    ("Thanks, the billing team sorted out my payment issue", "Billing", "Positive"),
+    ("What payment methods do you support?", "Billing", "Neutral"),
+    ("Please cancel the auto renewal on my subscription", "Billing", "Neutral"),
+    ("如何修改付款方式？", "Billing", "Neutral"),
+    ("订阅续费价格是多少？", "Billing", "Neutral"),
+    ("乱扣费，我要投诉你们", "Billing", "Negative"),
+    ("What time do you close on weekends?", "General", "Neutral"),
+    ("Do you have any job openings in Beijing?", "General", "Neutral"),
+    ("I just wanted to say your support team is amazing", "General", "Positive"),
+    ("Where can I read your terms of service?", "General", "Neutral"),
+    ("How do I contact the press office?", "General", "Neutral"),
+    ("Nobody replied to my email for a week, really disappointed", "General", "Negative"),
+    ("Can I visit your headquarters?", "General", "Neutral"),
+    ("Do you have a loyalty program?", "General", "Neutral"),
+    ("What languages does your support team speak?", "General", "Neutral"),
+    ("Happy new year to the whole team!", "General", "Positive"),
+    ("周末营业吗？", "General", "Neutral"),
+    ("你们有线下门店吗？", "General", "Neutral"),
+    ("等了一个星期都没人回复，太失望了", "General", "Negative"),
+    ("非常感谢，你们的服务很专业", "General", "Positive"),
+    # 否定和反讽：正面词出现在负面查询里
+    ("This is not great, the app still crashes on startup", "Technical", "Negative"),
+    ("Thanks for nothing, my internet has been down all day", "Technical", "Negative"),
+    ("Great, another outage. Just great.", "Technical", "Negative"),
+    ("I don't love paying for a plan that never works", "Billing", "Negative"),
+    ("No thanks, just cancel my subscription and refund me", "Billing", "Negative"),
+    ("Thanks a lot for charging me twice", "Billing", "Negative"),
+    ("Not happy with the support I got, nobody helped", "General", "Negative"),
+    ("Wow, thanks for ignoring my emails for a week", "General", "Negative"),
+    ("一点也不满意，退款到现在还没到", "Billing", "Negative"),
+    ("谢谢你们让我等了三天", "General", "Negative"),
+]
+
+# 高精度关键词：作为伪样本加入训练；只命中一个 KEYWORD_SHORTCUTS 标签时由规则直接回答
+KEYWORDS: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "category": {
+        "Technical": (
+            "wifi", "wi-fi", "internet", "router", "error", "crash", "crashes", "crashed", "bug", "install",
+            "login", "log in", "password", "vpn", "bluetooth", "firmware", "driver", "sync", "timeout",
+            "网络", "路由器", "报错", "崩溃", "闪退", "登录", "密码", "安装",
+        ),
+        "Billing": (
+            "receipt", "refund", "invoice", "bill", "billed", "billing", "charge", "charged", "charging",
+            "payment", "price", "pricing", "subscription", "paypal", "credit card", "fee",
+            "发票", "退款", "账单", "扣费", "付款", "续费", "价格",
+        ),
+    },
+    "sentiment": {
+        "Negative": (
+            "terrible", "awful", "worst", "unacceptable", "furious", "angry", "hate", "garbage", "ridiculous",
+            "disappointed", "frustrating", "annoying", "rude", "a joke", "thanks for nothing",
+            "糟糕", "生气", "投诉", "愤怒", "垃圾", "失望", "太差", "过分",
+        ),
+        "Positive": (
+            "thank", "thanks", "great", "love", "awesome", "excellent", "wonderful", "amazing", "appreciate", "happy",
+            "谢谢", "感谢", "满意", "很好", "喜欢",
+        ),
+    },
+}
+
+# 可以由关键词直接回答的标签。正面词常被否定或反讽翻转（"not great"、"thanks for nothing"），
+# 情感只对 Negative 走捷径：Positive 由分类器按阈值判断，把 Negative 判成其他情感会跳过转人工
+KEYWORD_SHORTCUTS: Dict[str, Tuple[str, ...]] = {"category": ("Technical", "Billing"), "sentiment": ("Negative",)}
+
+NEGATORS = ("not", "no", "never", "don't", "doesn't", "didn't", "isn't", "wasn't", "aren't")
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_CJK = re.compile(r"[一-鿿]+")
+
+
+def features(text: str) -> List[str]:
+    """英文取单词和相邻词对，中文取单字和相邻字对"""
+    text = text.lower()
+    words = _WORD.findall(text)
+    feats = [f"w:{w}" for w in words]
+    feats += [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+    for run in _CJK.findall(text):
+        feats += [f"c:{ch}" for ch in run]
+        feats += [f"c:{run[i:i + 2]}" for i in range(len(run) - 1)]
+    return feats
+
+
+class LinearTextClassifier:
+    """TF-IDF 特征 + L2 正则的多分类逻辑回归（随机梯度下降，只更新样本出现的特征）"""
+
+    def __init__(self, labels: Sequence[str], *, l2: float = 1e-4, epochs: int = 30, learning_rate: float = 0.5, seed: int = 0):
+        self.labels = list(labels)
+        self.l2 = l2
+        self.epochs = epochs
+        self.learning_rate = learning_rate
+        self.seed = seed
+        self.idf: Dict[str, float] = {}
+        self.weights: Dict[str, List[float]] = {}
+        self.bias = [0.0] * len(self.labels)
+
+    def _vectorize(self, text: str) -> Dict[str, float]:
+        counts = Counter(f for f in features(text) if f in self.idf)
+        vector = {f: (1 + math.log(n)) * self.idf[f] for f, n in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {f: v / norm for f, v in vector.items()}
+
+    def fit(self, texts: Sequence[str], labels: Sequence[str]) -> "LinearTextClassifier":
+        doc_freq = Counter(f for text in texts for f in set(features(text)))
+        n_docs = len(texts)
+        self.idf = {f: math.log((1 + n_docs) / (1 + df)) + 1 for f, df in doc_freq.items()}
+        k = len(self.labels)
+        self.weights = {f: [0.0] * k for f in self.idf}
+        self.bias = [0.0] * k
+        samples = [(self._vectorize(text), self.labels.index(label)) for text, label in zip(texts, labels)]
+
+        rng = random.Random(self.seed)
+        for epoch in range(self.epochs):
+            rng.shuffle(samples)
+            rate = self.learning_rate / (1 + epoch * 0.1)
+            for vector, target in samples:
+                probs = self._softmax(vector)
+                for c in range(k):
+                    err = probs[c] - (1.0 if c == target else 0.0)
+                    self.bias[c] -= rate * err
+                    for f, v in vector.items():
+                        row = self.weights[f]
+                        row[c] -= rate * (err * v + self.l2 * row[c])
+        return self
+
+    def _softmax(self, vector: Dict[str, float]) -> List[float]:
+        scores = list(self.bias)
+        for f, v in vector.items():
+            row = self.weights.get(f)
+            if row:
+                for c, w in enumerate(row):
+                    scores[c] += w * v
+        top = max(scores)
+        exps = [math.exp(s - top) for s in scores]
+        total = sum(exps)
+        return [e / total for e in exps]
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        vector = self._vectorize(text)
+        if not vector:  # 没有一个见过的特征，不做判断
+            return {label: 1 / len(self.labels) for label in self.labels}
+        return dict(zip(self.labels, self._softmax(vector)))
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        probs = self.predict_proba(text)
+        label = max(probs, key=probs.get)
+        return label, probs[label]
+
+
+def _keyword_pattern(words: Sequence[str]) -> "re.Pattern[str]":
+    ascii_words = [re.escape(w) for w in words if w.isascii()]
+    other_words = [re.escape(w) for w in words if not w.isascii()]
+    parts = ([rf"\b(?:{'|'.join(ascii_words)})\b"] if ascii_words else []) + other_words
+    return re.compile("|".join(parts))
+
+
+_KEYWORD_PATTERNS = {
+    field: {label: _keyword_pattern(words) for label, words in labels.items()}
+    for field, labels in KEYWORDS.items()
+}
+
+# 被否定的正面词按 Negative 计："not great"、"do not love"、"no thanks"、"不满意"（不含"不好意思"）
+_POSITIVE_ASCII = "|".join(re.escape(w) for w in KEYWORDS["sentiment"]["Positive"] if w.isascii())
+_NEGATED_POSITIVE = re.compile(
+    rf"\b(?:{'|'.join(NEGATORS)})\s+(?:[a-z']+\s+)?(?:{_POSITIVE_ASCII})\b"
+    r"|(?:不|没有?)(?:太|很|怎么)?(?:满意|喜欢|好(?!意思))"
+)
+
+
+def keyword_label(field: str, text: str) -> Optional[str]:
+    """命中且只命中一个可直接回答的标签 (KEYWORD_SHORTCUTS) 时返回该标签"""
+    text = text.lower()
+    hits = {label for label, pattern in _KEYWORD_PATTERNS[field].items() if pattern.search(text)}
+    if field == "sentiment" and _NEGATED_POSITIVE.search(text):
+        hits.add("Negative")
+    hits &= set(KEYWORD_SHORTCUTS[field])
+    return hits.pop() if len(hits) == 1 else None
+
+
+def load_tickets(path: Optional[str] = None) -> List[Tuple[str, str, str]]:
+    """读取标注工单 JSONL；未指定路径时使用种子工单"""
+    path = path or os.getenv("TRIAGE_TRAINING_DATA")
+    if not path:
+        return list(SEED_TICKETS)
+    tickets = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                tickets.append((row["query"], row["category"], row["sentiment"]))
+    return tickets
+
+
+def train_field(field: str, tickets: Sequence[Tuple[str, str, str]]) -> LinearTextClassifier:
+    """用工单和关键词伪样本训练一个字段的分类器"""
+    column = 1 if field == "category" else 2
+    labels = CATEGORIES if field == "category" else SENTIMENTS
+    texts = [t[0] for t in tickets]
+    targets = [t[column] for t in tickets]
+    for label, words in KEYWORDS[field].items():
+        texts += list(words)
+        targets += [label] * len(words)
+    return LinearTextClassifier(labels).fit(texts, targets)
+
+
+class TriageCascade:
+    """每个字段先查关键词（情感只有 Negative 走关键词），再用本地分类器；置信时直接回答，否则返回 None 交给 LLM
+
+    Args:
+        thresholds: 每个字段的置信度阈值（最大类别概率）
+        tickets: 训练数据，默认 load_tickets()
+    """
+
+    FIELDS = {"category": CATEGORIES, "sentiment": SENTIMENTS}
+
+    def __init__(self, thresholds: Optional[Dict[str, float]] = None, tickets: Optional[Iterable[Tuple[str, str, str]]] = None):
+        # 默认值来自 benchmarks/triage_cascade.py 在种子工单上的交叉验证：
+        # sentiment 更保守，因为把 Negative 判成其他情感会跳过转人工
+        self.thresholds = {"category": 0.7, "sentiment": 0.8, **(thresholds or {})}
+        self._tickets = tickets
+        self._models: Optional[Dict[str, LinearTextClassifier]] = None
+        self._lock = threading.Lock()
+        self._counts = {field: {"local": 0, "llm": 0} for field in self.FIELDS}
+
+    @property
+    def loaded(self) -> bool:
+        return self._models is not None
+
+    def load(self) -> Dict[str, LinearTextClassifier]:
+        """训练（只训练一次）并返回各字段的分类器，预热时可以提前调用"""
+        if self._models is None:
+            with self._lock:
+                if self._models is None:
+                    tickets = list(self._tickets) if self._tickets is not None else load_tickets()
+                    self._models = {
+                        field: train_field(field, tickets) for field in self.FIELDS
+                    }
+        return self._models
+
+    def classify(self, field: str, text: str) -> Optional[str]:
+        """返回置信的标签，或 None（需要交给 LLM）"""
+        label = keyword_label(field, text)
+        if label is None:
+            label, confidence = self.load()[field].predict(text)
+            if confidence < self.thresholds[field]:
+                label = None
+        with self._lock:
+            self._counts[field]["local" if label is not None else "llm"] += 1
+        return label
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            result = {}
+            for field, counts in self._counts.items():
+                total = counts["local"] + counts["llm"]
+                result[field] = {**counts, "local_rate": counts["local"] / total if total else 0.0}
+            return result
+
+
+if __name__ == "__main__":
+    cascade = TriageCascade()
+    for query in ["Where can I find my receipt?", "wifi keeps failing with an error", "我想了解一下你们的新产品",
+                  "You charged me twice, I'm furious", "Thanks a lot!", "This is not great, I want my money back"]:
+        print(f"{query!r:45} category={cascade.classify('category', query)} sentiment={cascade.classify('sentiment', query)}")
+    print(cascade.stats())
@@ -1,11 +1,18 @@
-from langgraph.checkpoint.memory import MemorySaver
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, MessagesState, START, END
 from typing import TypedDict
 from dotenv import load_dotenv
 
+from node_cache import make_node_cache, node_cache_policy
+from sqlite_checkpointer import LazySaver
+
 load_dotenv()
 
+# 主图和子图共用一个持久化的 SQLite 检查点存储 (default_saver()，第一次运行时才打开)，每个线程保留最近 20 个检查点
+checkpointer = LazySaver()
+# 子任务处理节点的结果缓存（主图和单独运行的子图共用；挂载的子图继承主图的缓存）
+node_cache = make_node_cache("update_subgraph_state")
+
 # 首先，让我们创建一个包含更多状态字段的增强版子图
 from typing import TypedDict
 
@@ -38,12 +45,14 @@ def enhanced_subtask_formatter(state: EnhancedSubtaskState):
 
 # 构建增强版子图
 enhanced_subgraph = StateGraph(EnhancedSubtaskState)
-enhanced_subgraph.add_node("process", enhanced_subtask_processor)
+enhanced_subgraph.add_node(
+    "process", enhanced_subtask_processor, cache_policy=node_cache_policy("subtask_input", "city", "temperature")
+)
 enhanced_subgraph.add_node("format", enhanced_subtask_formatter)
 enhanced_subgraph.add_edge(START, "process")
 enhanced_subgraph.add_edge("process", "format")
 enhanced_subgraph.add_edge("format", END)
-compiled_enhanced_subgraph = enhanced_subgraph.compile(checkpointer=MemorySaver())
+compiled_enhanced_subgraph = enhanced_subgraph.compile(checkpointer=checkpointer, cache=node_cache)
 
 # 增强版主图节点函数
 def enhanced_prepare_data(state: EnhancedMainState):
@@ -54,7 +63,12 @@ def enhanced_prepare_data(state: EnhancedMainState):
     }
 
 def enhanced_call_subgraph_node(state: EnhancedMainState):
-    """调用增强版子图的节点"""
+    """在节点内部调用增强版子图（嵌套 invoke 写法）
+
+    子图使用独立的线程 (由 main_topic 生成)，每次运行都要额外走一遍子图的执行循环和检查点写入，
+    并且两个相同主题的并发运行会落到同一个子图线程上。主图默认改用下面挂载的子图节点，
+    这个函数保留用于对比 (见 benchmarks/subgraph_bench.py)。
+    """
     subgraph_config = {"configurable": {"thread_id": f"enhanced_sub_{state['main_topic']}"}}
     
     # 调用子图处理，传递更多参数
@@ -75,77 +89,141 @@ def enhanced_finalize_output(state: EnhancedMainState):
         "final_output": f"最终结果: {state['processed_data']} (用户位置: {state.get('user_location', '未知')})"
     }
 
-# 构建增强版主图
-enhanced_main_graph = StateGraph(EnhancedMainState)
-enhanced_main_graph.add_node("prepare", enhanced_prepare_data)
-enhanced_main_graph.add_node("subgraph_call", enhanced_call_subgraph_node)
-enhanced_main_graph.add_node("finalize", enhanced_finalize_output)
+# 直接挂载到主图的子图：通过输入/输出 schema 限定与主图共享的键，
+# 键映射折叠进子图首尾两个节点，不额外增加超步
+class MountedSubtaskIO(TypedDict):
+    processed_data: str  # 与主图共享的状态键
+
+class MountedSubtaskState(EnhancedSubtaskState, MountedSubtaskIO):
+    pass
+
+def with_state_mapping(node, *, inputs=None, outputs=None, defaults=None):
+    """包装子图节点，完成主图键与子图键之间的映射
+
+    Args:
+        node: 原始子图节点函数
+        inputs: {主图键: 子图键}，调用前把主图传入的值写到子图键上
+        outputs: {子图键: 主图键}，返回时把子图结果同时写回主图键
+        defaults: 子图键的默认值（状态中没有该键时使用）
+    """
+    inputs, outputs, defaults = inputs or {}, outputs or {}, defaults or {}
+
+    def mapped_node(state):
+        mapped = {key: state.get(key, value) for key, value in defaults.items()}
+        mapped.update({child: state[parent] for parent, child in inputs.items() if parent in state})
+        update = dict(node({**state, **mapped}) or {})
+        update = {**mapped, **update}
+        update.update({parent: update[child] for child, parent in outputs.items() if child in update})
+        return update
+
+    return mapped_node
+
+mounted_subgraph = StateGraph(MountedSubtaskState, input_schema=MountedSubtaskIO, output_schema=MountedSubtaskIO)
+mounted_subgraph.add_node("process", with_state_mapping(
+    enhanced_subtask_processor,
+    inputs={"processed_data": "subtask_input"},
+    defaults={"city": "beijing", "temperature": 25},  # 默认城市和温度
+), cache_policy=node_cache_policy("processed_data", "city", "temperature"))
+mounted_subgraph.add_node("format", with_state_mapping(
+    enhanced_subtask_formatter,
+    outputs={"subtask_result": "processed_data"},
+))
+mounted_subgraph.add_edge(START, "process")
+mounted_subgraph.add_edge("process", "format")
+mounted_subgraph.add_edge("format", END)
+# 不单独指定检查点：作为节点运行时继承主图的检查点，检查点写在主图线程的 "subgraph_call:<task_id>" 命名空间下
+compiled_mounted_subgraph = mounted_subgraph.compile()
+
+def build_enhanced_main_graph(subgraph_node=compiled_mounted_subgraph) -> StateGraph:
+    """构建增强版主图，subgraph_node 可以是挂载的子图，也可以是嵌套 invoke 的节点函数"""
+    builder = StateGraph(EnhancedMainState)
+    builder.add_node("prepare", enhanced_prepare_data)
+    builder.add_node("subgraph_call", subgraph_node)
+    builder.add_node("finalize", enhanced_finalize_output)
+
+    builder.add_edge(START, "prepare")
+    builder.add_edge("prepare", "subgraph_call")
+    builder.add_edge("subgraph_call", "finalize")
+    builder.add_edge("finalize", END)
+    return builder
 
-enhanced_main_graph.add_edge(START, "prepare")
-enhanced_main_graph.add_edge("prepare", "subgraph_call")
-enhanced_main_graph.add_edge("subgraph_call", "finalize")
-enhanced_main_graph.add_edge("finalize", END)
+# 构建增强版主图
+enhanced_main_graph = build_enhanced_main_graph()
 
 # 编译增强版主图
-enhanced_hierarchical_graph = enhanced_main_graph.compile(checkpointer=MemorySaver())
-
-# 运行增强版智能体并演示状态更新
-print("=== 步骤 1: 运行增强版层次化智能体 ===")
-enhanced_config = {"configurable": {"thread_id": "enhanced_hierarchical_thread"}}
-
-# 初始运行
-initial_result = enhanced_hierarchical_graph.invoke(
-    {"main_topic": "天气分析任务", "user_location": "shanghai"}, 
-    enhanced_config
-)
-print("初始执行结果：", initial_result)
-
-print("\n" + "="*60)
-print("=== 步骤 2: 获取当前状态 ===")
-
-# 获取主图状态
-main_state = enhanced_hierarchical_graph.get_state(enhanced_config)
-print("主图当前状态：", main_state.values)
-
-# 获取子图状态
-subgraph_config = {"configurable": {"thread_id": "enhanced_sub_天气分析任务"}}
-subgraph_state = compiled_enhanced_subgraph.get_state(subgraph_config)
-print("子图当前状态：", subgraph_state.values)
-
-print("\n" + "="*60)
-print("=== 步骤 3: 更新主图状态 ===")
-
-# 更新主图状态中的 user_location 字段
-print("更新主图状态: user_location 从 'shanghai' 改为 'guangzhou'")
-updated_main_config = enhanced_hierarchical_graph.update_state(
-    enhanced_config,
-    {"user_location": "guangzhou"}
-)
-print("主图状态更新完成，新配置：", updated_main_config)
-
-# 查看更新后的主图状态
-updated_main_state = enhanced_hierarchical_graph.get_state(updated_main_config)
-print("更新后的主图状态：", updated_main_state.values)
-
-print("\n" + "="*60)
-print("=== 步骤 4: 更新子图状态 ===")
-
-# 更新子图状态中的 city 字段（按照你的要求）
-print("更新子图状态: city 从 'beijing' 改为 'la', temperature 从 25 改为 18")
-updated_subgraph_config = compiled_enhanced_subgraph.update_state(
-    subgraph_config,  # 将子图状态的 config 作为第一个参数传入
-    {"city": "la", "temperature": 18}  # updates 参数指定要更新的状态键值对
-)
-print("子图状态更新完成，新配置：", updated_subgraph_config)
-
-# 查看更新后的子图状态
-updated_subgraph_state = compiled_enhanced_subgraph.get_state(updated_subgraph_config)
-print("更新后的子图状态：", updated_subgraph_state.values)
-
-print("\n" + "="*60)
-print("=== 步骤 5: 从更新的状态继续执行 ===")
-
-# 从更新的子图状态继续执行（重新处理）
-print("从更新的子图状态继续执行:")
-for chunk in compiled_enhanced_subgraph.stream(None, updated_subgraph_config, stream_mode="values"):
-    print("子图执行结果：", chunk)
\ No newline at end of file
+enhanced_hierarchical_graph = enhanced_main_graph.compile(checkpointer=checkpointer, cache=node_cache)
+
+if __name__ == "__main__":
+    # 运行增强版智能体并演示状态更新
+    print("=== 步骤 1: 运行增强版层次化智能体 ===")
+    enhanced_config = {"configurable": {"thread_id": "enhanced_hierarchical_thread"}}
+
+    # 初始运行
+    initial_result = enhanced_hierarchical_graph.invoke(
+        {"main_topic": "天气分析任务", "user_location": "shanghai"}, 
+        enhanced_config
+    )
+    print("初始执行结果：", initial_result)
+
+    print("\n" + "="*60)
+    print("=== 步骤 2: 获取当前状态 ===")
+
+    # 获取主图状态
+    main_state = enhanced_hierarchical_graph.get_state(enhanced_config)
+    print("主图当前状态：", main_state.values)
+
+    # 获取子图状态：挂载的子图检查点位于主图线程下的 "subgraph_call:<task_id>" 命名空间
+    subgraph_checkpoints = [
+        checkpoint_tuple
+        for checkpoint_tuple in checkpointer.list(enhanced_config)
+        if checkpoint_tuple.config["configurable"]["checkpoint_ns"].startswith("subgraph_call:")
+    ]
+    if subgraph_checkpoints:
+        latest_subgraph = subgraph_checkpoints[0]
+        print("子图命名空间：", latest_subgraph.config["configurable"]["checkpoint_ns"])
+        print("子图当前状态：", latest_subgraph.checkpoint["channel_values"])
+
+    print("\n" + "="*60)
+    print("=== 步骤 3: 更新主图状态 ===")
+
+    # 更新主图状态中的 user_location 字段
+    print("更新主图状态: user_location 从 'shanghai' 改为 'guangzhou'")
+    updated_main_config = enhanced_hierarchical_graph.update_state(
+        enhanced_config,
+        {"user_location": "guangzhou"}
+    )
+    print("主图状态更新完成，新配置：", updated_main_config)
+
+    # 查看更新后的主图状态
+    updated_main_state = enhanced_hierarchical_graph.get_state(updated_main_config)
+    print("更新后的主图状态：", updated_main_state.values)
+
+    print("\n" + "="*60)
+    print("=== 步骤 4: 更新子图状态 ===")
+
+    # 单独运行的子图使用自己的线程，可以直接更新它的状态
+    subgraph_config = {"configurable": {"thread_id": "enhanced_sub_天气分析任务"}}
+    compiled_enhanced_subgraph.invoke(
+        {"subtask_input": f"预处理: {main_state.values['main_topic']}", "city": "beijing", "temperature": 25},
+        subgraph_config
+    )
+
+    # 更新子图状态中的 city 字段（按照你的要求）
+    print("更新子图状态: city 从 'beijing' 改为 'la', temperature 从 25 改为 18")
+    updated_subgraph_config = compiled_enhanced_subgraph.update_state(
+        subgraph_config,  # 将子图状态的 config 作为第一个参数传入
+        {"city": "la", "temperature": 18}  # updates 参数指定要更新的状态键值对
+    )
+    print("子图状态更新完成，新配置：", updated_subgraph_config)
+
+    # 查看更新后的子图状态
+    updated_subgraph_state = compiled_enhanced_subgraph.get_state(updated_subgraph_config)
+    print("更新后的子图状态：", updated_subgraph_state.values)
+
+    print("\n" + "="*60)
+    print("=== 步骤 5: 从更新的状态继续执行 ===")
+
+    # 从更新的子图状态继续执行（重新处理）
+    print("从更新的子图状态继续执行:")
+    for chunk in compiled_enhanced_subgraph.stream(None, updated_subgraph_config, stream_mode="values"):
+        print("子图执行结果：", chunk)
\ No newline at end of file